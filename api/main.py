@@ -1,14 +1,23 @@
 from fastapi import FastAPI, HTTPException, UploadFile, File
+from fastapi.responses import StreamingResponse, JSONResponse, PlainTextResponse
 from pydantic import BaseModel
-from typing import List, Dict
-import shutil
+from typing import List, Dict, Optional, Union
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import json
+import threading
+import time
 
 # Assuming src is in the PYTHONPATH or relative path is handled
 import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
 
-from rag_pipeline import RAGPipeline
+from rag_pipeline import RAGPipeline, check_retrieval_mode
+from vector_store import build_where, DEFAULT_PERSIST_DIRECTORIES
+from ingestion_jobs import IngestionJobManager, JobQueueFullError
+from snapshot import read_manifest, VECTOR_DTYPES
+from metrics import REGISTRY
 
 app = FastAPI(title="RAG Pipeline API",
               description="API for Retrieval-Augmented Generation using Open Food Facts documents.",
@@ -18,98 +27,462 @@ app = FastAPI(title="RAG Pipeline API",
 UPLOADS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'uploads'))
 os.makedirs(UPLOADS_DIR, exist_ok=True)
 
+# Snapshots of the vector store (export/import, see src/snapshot.py), shared between nodes
+SNAPSHOTS_DIR = os.path.abspath(os.getenv("RAG_SNAPSHOTS_DIR",
+                                          os.path.join(os.path.dirname(__file__), '..', 'snapshots')))
+
+
+# Bounded thread pool for the CPU-bound stages of /query (embedding, Chroma search, CrossEncoder)
+QUERY_EXECUTOR_WORKERS = int(os.getenv("RAG_QUERY_WORKERS", "4"))
+# Admission control: /query requests beyond this number in flight are rejected with a 429
+MAX_IN_FLIGHT_QUERIES = int(os.getenv("RAG_MAX_IN_FLIGHT_QUERIES", "16"))
+
+# Micro-batching of the CrossEncoder: concurrent queries are scored together if they arrive
+# within this window (ms), up to RAG_RERANK_MAX_BATCH_SIZE pairs per forward pass
+RERANK_MAX_WAIT_MS = float(os.getenv("RAG_RERANK_MAX_WAIT_MS", "2"))
+RERANK_MAX_BATCH_SIZE = int(os.getenv("RAG_RERANK_MAX_BATCH_SIZE", "64"))
+
+# Maximum number of questions accepted by /query/batch
+MAX_BATCH_QUERIES = int(os.getenv("RAG_MAX_BATCH_QUERIES", "1000"))
+
+# Semantic answer cache: cosine similarity needed to reuse the answer of a previous query, and its TTL
+ANSWER_CACHE_THRESHOLD = float(os.getenv("RAG_ANSWER_CACHE_THRESHOLD", "0.95"))
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("RAG_ANSWER_CACHE_TTL_SECONDS", "3600"))
+
+# Incremental sync of 'data/' at startup (only new/changed files are embedded, removed ones are deleted).
+# When disabled, 'data/' is only loaded into an empty vector store.
+SYNC_DATA_DIR = os.getenv("RAG_SYNC_DATA_DIR", "1") == "1"
+
+# Token budget of the context sent to the LLM (overlapping chunks are merged before packing)
+CONTEXT_MAX_TOKENS = int(os.getenv("RAG_CONTEXT_MAX_TOKENS", "2000"))
+
+# Vector store backend: "chroma" (chroma_db/) or "numpy" (numpy_db/, exact search over a memory-mapped
+# matrix shared between processes), and the storage type of the numpy backend ("float32" or "float16")
+VECTOR_BACKEND = os.getenv("RAG_VECTOR_BACKEND", "chroma")
+NUMPY_DTYPE = os.getenv("RAG_NUMPY_DTYPE", "float32")
+
+# Role of this process (see serve.py): "all" (single process: serves queries and writes to the store),
+# "reader" (query worker: uploads are queued for the writer, which also syncs data/) or "writer"
+RAG_ROLE = os.getenv("RAG_ROLE", "all")
+
+# Background ingestion of uploads: worker threads, and queued jobs beyond which uploads get a 429
+INGEST_JOB_WORKERS = int(os.getenv("RAG_INGEST_JOB_WORKERS", "1"))
+MAX_QUEUED_INGEST_JOBS = int(os.getenv("RAG_MAX_QUEUED_INGEST_JOBS", "32"))
+
+# Maximum page size of /documents
+MAX_DOCUMENTS_PAGE_SIZE = int(os.getenv("RAG_MAX_DOCUMENTS_PAGE_SIZE", "1000"))
+
+query_executor = ThreadPoolExecutor(max_workers=QUERY_EXECUTOR_WORKERS, thread_name_prefix="rag-query")
+query_slots = asyncio.Semaphore(MAX_IN_FLIGHT_QUERIES)
+
 
 # Initialize the RAG pipeline globally to avoid re-initialization on each request
 # For API, these paths should be absolute or relative to where the API is run
-rag_pipeline = RAGPipeline(chroma_db_path=os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'chroma_db')))
+rag_pipeline = RAGPipeline(chroma_db_path=os.path.abspath(os.path.join(os.path.dirname(__file__), '..',
+                                                                       DEFAULT_PERSIST_DIRECTORIES[VECTOR_BACKEND])),
+                           vector_backend=VECTOR_BACKEND,
+                           numpy_dtype=NUMPY_DTYPE,
+                           rerank_max_wait_ms=RERANK_MAX_WAIT_MS,
+                           rerank_max_batch_size=RERANK_MAX_BATCH_SIZE,
+                           answer_cache_threshold=ANSWER_CACHE_THRESHOLD,
+                           answer_cache_ttl_seconds=ANSWER_CACHE_TTL_SECONDS,
+                           context_max_tokens=CONTEXT_MAX_TOKENS,
+                           lazy_load=True) # Les modèles sont chargés en arrière-plan (voir startup_event)
 
-@app.on_event("startup")
-async def startup_event():
+# Jobs d'ingestion des fichiers uploadés (file d'attente persistante dans uploads/jobs.sqlite3)
+ingestion_jobs = IngestionJobManager(rag_pipeline,
+                                     db_path=os.path.join(UPLOADS_DIR, "jobs.sqlite3"),
+                                     files_dir=os.path.join(UPLOADS_DIR, "jobs"),
+                                     num_workers=INGEST_JOB_WORKERS,
+                                     max_queued_jobs=MAX_QUEUED_INGEST_JOBS)
+
+def load_pipeline():
     """
-    Initializes the RAG pipeline when the FastAPI application starts up.
+    Loads and warms up the models, then initializes the RAG pipeline. Runs in a background
+    thread so the server binds immediately: /health answers right away and /ready reports
+    progress until everything is loaded.
     """
-    print("Starting up RAG Pipeline API...")
+    start = time.perf_counter()
     try:
+        if RAG_ROLE != "writer":
+            rag_pipeline.warm_up() # The writer only needs the embedding model, loaded on first use
         # Initial documents from 'data' directory (if exists)
         initial_data_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data'))
-        if os.path.exists(initial_data_path) and os.path.isdir(initial_data_path):
-            rag_pipeline.initialize(initial_data_dir=initial_data_path)
+        if RAG_ROLE == "reader":
+            rag_pipeline.initialize() # data/ is synced by the writer process
+        elif os.path.exists(initial_data_path) and os.path.isdir(initial_data_path):
+            rag_pipeline.initialize(initial_data_dir=initial_data_path, sync=SYNC_DATA_DIR)
         else:
             rag_pipeline.initialize() # Initialize without initial data if directory doesn't exist
-        print("RAG Pipeline API started successfully.")
+        if RAG_ROLE != "reader":
+            # Jobs interrupted by a restart are resumed once the pipeline is ready
+            ingestion_jobs.start(resume=True)
+        rag_pipeline.startup_timings["total"] = round(time.perf_counter() - start, 3)
+        print(f"RAG Pipeline API ready in {rag_pipeline.startup_timings['total']:.2f}s: {rag_pipeline.startup_timings}")
     except Exception as e:
         print(f"Failed to initialize RAG Pipeline: {e}")
         # Depending on desired behavior, might raise HTTPException or handle differently
         # For now, allowing startup even if RAG init fails, but requests will fail.
 
+@app.on_event("startup")
+async def startup_event():
+    """
+    Starts loading the RAG pipeline in the background when the FastAPI application starts up.
+    """
+    print("Starting up RAG Pipeline API...")
+    threading.Thread(target=load_pipeline, name="rag-pipeline-loader", daemon=True).start()
+    print("RAG Pipeline API started, models are loading in the background.")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    query_executor.shutdown(wait=False)
+    ingestion_jobs.stop(timeout=5)
+
+# Metadata filters, e.g. {"brand": "Ferrero", "nutriscore": ["a", "b"]} (see vector_store.FILTER_FIELDS)
+Filters = Optional[Dict[str, Union[str, List[str]]]]
+
 class QueryRequest(BaseModel):
     query: str
     top_k: int = 3
+    include_timings: bool = False # Ajoute le temps passé dans chaque étape à la réponse
+    filters: Filters = None
+    mode: str = "vector" # "hybrid" : fusion recherche vectorielle + BM25 avant le rerank
+    include_facets: bool = False # Ajoute le nombre de chunks par valeur de filtre (voir /facets)
+
+class BatchQueryRequest(BaseModel):
+    queries: List[str]
+    top_k: int = 3
+    max_concurrency: int = 4
+    filters: Filters = None
+    mode: str = "vector"
+
+class FacetsRequest(BaseModel):
+    filters: Dict[str, Union[str, List[str]]]
+
+class SnapshotRequest(BaseModel):
+    name: Optional[str] = None # Par défaut : horodatage
+    dtype: str = "float16" # "float32", "float16" ou "int8"
+
+def check_filters(filters, mode: str = "vector"):
+    # Invalid filters or retrieval mode are a client error, not a 500
+    try:
+        build_where(filters)
+        check_retrieval_mode(mode)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @app.post("/query", response_model=Dict)
 async def query_rag(request: QueryRequest):
     """
     Processes a natural language query using the RAG pipeline.
     """
+    if not rag_pipeline.initialized:
+        raise HTTPException(status_code=503, detail="RAG Pipeline not initialized.")
+    check_filters(request.filters, request.mode)
+    if query_slots.locked():
+        raise HTTPException(status_code=429, detail="Too many queries in progress. Please retry later.")
+    async with query_slots:
+        try:
+            # result contient maintenant {"answer": ..., "sources": ...}
+            result = await rag_pipeline.aquery(request.query, request.top_k, executor=query_executor,
+                                               filters=request.filters, mode=request.mode,
+                                               include_facets=request.include_facets)
+
+            response = {
+                "query": request.query,
+                "response": result["answer"], # La réponse textuelle du LLM
+                "sources": result["sources"], # La liste des documents utilisés (top k)
+                "cached": result["cached"],   # Réponse servie par le cache sémantique
+                # Contexte envoyé au LLM : passages, tokens estimés et tokens économisés par la fusion des chunks
+                "context_stats": result.get("context_stats", {})
+            }
+            if "facets" in result:
+                # Chunks matching each filter value: lets clients narrow the query before retrieval
+                response["facets"] = result["facets"]
+            if request.include_timings:
+                response["timings"] = result["timings"]
+            return response
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/query/batch", response_model=Dict)
+async def query_rag_batch(request: BatchQueryRequest):
+    """
+    Processes many queries at once: embedding, retrieval and reranking are batched, generation
+    runs with bounded concurrency. Results are returned in input order.
+    """
+    if not rag_pipeline.initialized:
+        raise HTTPException(status_code=503, detail="RAG Pipeline not initialized.")
+    if len(request.queries) > MAX_BATCH_QUERIES:
+        raise HTTPException(status_code=413, detail=f"Too many queries in batch (max {MAX_BATCH_QUERIES}).")
+    check_filters(request.filters, request.mode)
+    if query_slots.locked():
+        raise HTTPException(status_code=429, detail="Too many queries in progress. Please retry later.")
+    async with query_slots:
+        try:
+            results = await rag_pipeline.aquery_batch(request.queries, request.top_k,
+                                                      max_concurrency=request.max_concurrency,
+                                                      executor=query_executor,
+                                                      filters=request.filters,
+                                                      mode=request.mode)
+            return {
+                "results": [
+                    {"query": result["query"], "response": result["answer"], "sources": result["sources"],
+                     "cached": result["cached"]}
+                    for result in results
+                ]
+            }
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/query/stream")
+async def query_rag_stream(request: QueryRequest):
+    """
+    Streaming version of /query using server-sent events: a `sources` event is sent as soon as
+    retrieval and reranking are done, then one `token` event per generated token, then `done`
+    (with the stage timings if `include_timings`).
+    """
+    if not rag_pipeline.initialized:
+        raise HTTPException(status_code=503, detail="RAG Pipeline not initialized.")
+    check_filters(request.filters, request.mode)
+    if query_slots.locked():
+        raise HTTPException(status_code=429, detail="Too many queries in progress. Please retry later.")
+
+    async def event_stream():
+        # The slot is held until the last token has been sent
+        async with query_slots:
+            try:
+                async for event, data in rag_pipeline.astream_query(request.query, request.top_k,
+                                                                    executor=query_executor,
+                                                                    filters=request.filters,
+                                                                    mode=request.mode):
+                    if event == "done" and not request.include_timings:
+                        data = None
+                    yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+            except Exception as e:
+                yield f"event: error\ndata: {json.dumps(str(e))}\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.post("/facets", response_model=Dict)
+async def facets(request: FacetsRequest):
+    """
+    Counts the chunks matching each filter value and all the filters together, from the
+    aggregate counts of the metadata index (no embedding, search or rerank), to narrow a
+    query before running it.
+    """
+    if not rag_pipeline.initialized:
+        raise HTTPException(status_code=503, detail="RAG Pipeline not initialized.")
+    check_filters(request.filters)
+    loop = asyncio.get_running_loop()
+    return {"facets": await loop.run_in_executor(query_executor, rag_pipeline.get_facets, request.filters)}
+
+async def submit_ingestion_job(files: List[UploadFile]):
+    """
+    Stores the uploaded files and queues an ingestion job. Returns a 202 response with the job.
+    """
     if not rag_pipeline.initialized:
         raise HTTPException(status_code=503, detail="RAG Pipeline not initialized.")
     try:
-        # result contient maintenant {"answer": ..., "sources": ...}
-        result = rag_pipeline.query(request.query, request.top_k)
-        
-        return {
-            "query": request.query,
-            "response": result["answer"], # La réponse textuelle du LLM
-            "sources": result["sources"]  # La liste des documents utilisés (top k)
-        }
+        # Copying the uploads to disk is blocking I/O
+        loop = asyncio.get_running_loop()
+        job = await loop.run_in_executor(None, ingestion_jobs.submit, [(file.filename, file.file) for file in files])
+    except JobQueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise HTTPException(status_code=500, detail=f"Error uploading file: {str(e)}")
+    return JSONResponse(status_code=202, content={
+        "message": f"{len(files)} document(s) queued for ingestion.",
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "status_url": f"/jobs/{job['job_id']}"
+    })
 
 @app.post("/upload_document")
 async def upload_document(file: UploadFile = File(...)):
     """
-    Uploads a document, processes it, and adds it to the RAG pipeline's vector store.
+    Uploads a document and queues its ingestion in the background. Returns the job id
+    right away; follow the progress with GET /jobs/{job_id}.
+    """
+    return await submit_ingestion_job([file])
+
+@app.post("/upload_documents")
+async def upload_documents(files: List[UploadFile] = File(...)):
+    """
+    Uploads several documents as one background ingestion job (see /upload_document).
+    """
+    return await submit_ingestion_job(files)
+
+@app.get("/jobs/{job_id}", response_model=Dict)
+async def get_job(job_id: str):
+    """
+    Status of an ingestion job: progress (rows read, chunks embedded), throughput, and the
+    status and error of each file.
+    """
+    loop = asyncio.get_running_loop()
+    job = await loop.run_in_executor(None, ingestion_jobs.get_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found.")
+    return job
+
+@app.get("/jobs", response_model=Dict)
+async def list_jobs(limit: int = 50, status: Optional[str] = None):
+    """
+    Most recent ingestion jobs, optionally filtered by status (queued, running, completed,
+    completed_with_errors, failed).
+    """
+    loop = asyncio.get_running_loop()
+    return {"jobs": await loop.run_in_executor(None, ingestion_jobs.list_jobs, limit, status)}
+
+@app.get("/documents", response_model=Dict)
+async def get_documents(limit: int = 100, cursor: Optional[str] = None, fields: str = "content,metadata"):
+    """
+    Lists the documents indexed in the RAG pipeline's vector store, one page at a time.
+    Pass the returned `next_cursor` as `cursor` to get the next page (null after the last one).
+    Use `fields=metadata` to skip the content of the chunks.
     """
     if not rag_pipeline.initialized:
         raise HTTPException(status_code=503, detail="RAG Pipeline not initialized.")
-    
-    # Save the uploaded file temporarily
-    file_path = os.path.join(UPLOADS_DIR, file.filename)
+    if not 1 <= limit <= MAX_DOCUMENTS_PAGE_SIZE:
+        raise HTTPException(status_code=422, detail=f"limit must be between 1 and {MAX_DOCUMENTS_PAGE_SIZE}.")
+    include_content = "content" in fields.split(",")
     try:
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
-        # Process and add to RAG pipeline
-        success = rag_pipeline.add_document_from_file(file_path)
-        
-        if success:
-            return {"message": f"Document '{file.filename}' uploaded and processed successfully."}
-        else:
-            raise HTTPException(status_code=500, detail=f"Failed to process document '{file.filename}'.")
+        loop = asyncio.get_running_loop()
+        indexed_docs, next_cursor = await loop.run_in_executor(
+            None, rag_pipeline.get_indexed_documents_page, limit, cursor, include_content)
+        return {"documents": indexed_docs, "next_cursor": next_cursor}
+    except ValueError as e:
+        # Cursor not returned by this endpoint
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error uploading or processing file: {str(e)}")
-    finally:
-        # Clean up the temporary file
-        if os.path.exists(file_path):
-            os.remove(file_path)
+        raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/documents", response_model=Dict)
-async def get_documents():
+@app.get("/documents/export")
+async def export_documents(fields: str = "content,metadata"):
+    """
+    Streams every indexed document as NDJSON (one JSON object per line), reading the
+    vector store page by page, so the full collection is never held in memory.
+    """
+    if not rag_pipeline.initialized:
+        raise HTTPException(status_code=503, detail="RAG Pipeline not initialized.")
+    include_content = "content" in fields.split(",")
+
+    def ndjson_lines():
+        for record in rag_pipeline.iter_indexed_documents(include_content=include_content):
+            yield json.dumps(record) + "\n"
+
+    # Sync iterator: Starlette runs it in a thread pool, the event loop is not blocked
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
+def snapshot_path(name: str) -> str:
+    # Snapshots are only read and written under SNAPSHOTS_DIR
+    if not name or os.path.basename(name) != name or name.startswith("."):
+        raise HTTPException(status_code=400, detail=f"Invalid snapshot name '{name}'.")
+    return os.path.join(SNAPSHOTS_DIR, name)
+
+@app.post("/snapshots", response_model=Dict)
+async def create_snapshot(request: SnapshotRequest):
     """
-    Retrieves basic information about all documents currently indexed in the RAG pipeline's vector store.
+    Exports the vector store (ids, documents, metadata and embeddings) to a compact snapshot
+    in SNAPSHOTS_DIR, which another node can import without running the embedding model.
+    Returns the snapshot manifest.
     """
     if not rag_pipeline.initialized:
         raise HTTPException(status_code=503, detail="RAG Pipeline not initialized.")
+    if request.dtype not in VECTOR_DTYPES:
+        raise HTTPException(status_code=400, detail=f"dtype must be one of: {', '.join(VECTOR_DTYPES)}.")
+    name = request.name or time.strftime("%Y%m%d-%H%M%S")
+    path = snapshot_path(name)
+    if os.path.exists(path):
+        raise HTTPException(status_code=409, detail=f"Snapshot '{name}' already exists.")
+    os.makedirs(SNAPSHOTS_DIR, exist_ok=True)
     try:
-        indexed_docs = rag_pipeline.get_all_indexed_documents()
-        return {"documents": indexed_docs}
+        loop = asyncio.get_running_loop()
+        manifest = await loop.run_in_executor(None, rag_pipeline.export_snapshot, path, request.dtype)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise HTTPException(status_code=500, detail=f"Error exporting snapshot: {str(e)}")
+    return {"name": name, "manifest": manifest}
+
+@app.get("/snapshots", response_model=Dict)
+async def list_snapshots():
+    """
+    Lists the snapshots of SNAPSHOTS_DIR with their embedding model, size and vector type.
+    """
+    snapshots = []
+    if os.path.isdir(SNAPSHOTS_DIR):
+        for name in sorted(os.listdir(SNAPSHOTS_DIR)):
+            try:
+                manifest = read_manifest(os.path.join(SNAPSHOTS_DIR, name), verify=False)
+            except (ValueError, OSError):
+                continue # Export en cours ou répertoire étranger
+            snapshots.append({"name": name, "created_at": manifest["created_at"],
+                              "embedding_model": manifest["embedding_model"], "count": manifest["count"],
+                              "dimension": manifest["dimension"], "dtype": manifest["dtype"]})
+    return {"snapshots": snapshots}
+
+@app.post("/snapshots/{name}/import", response_model=Dict)
+async def import_snapshot(name: str, verify: bool = True):
+    """
+    Bulk-loads a snapshot of SNAPSHOTS_DIR into the vector store, without embedding anything.
+    The snapshot must come from the same embedding model (400 otherwise).
+    """
+    if not rag_pipeline.initialized:
+        raise HTTPException(status_code=503, detail="RAG Pipeline not initialized.")
+    if RAG_ROLE == "reader":
+        # Only the writer process writes to the store
+        raise HTTPException(status_code=409, detail="This worker is read-only: import the snapshot with "
+                                                    "index_snapshot.py (the workers reload the store afterwards).")
+    path = snapshot_path(name)
+    if not os.path.isdir(path):
+        raise HTTPException(status_code=404, detail=f"Snapshot '{name}' not found.")
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, rag_pipeline.import_snapshot, path, verify)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error importing snapshot: {str(e)}")
+
+def collect_stats() -> dict:
+    return dict(rag_pipeline.get_stats(), ingestion_jobs=ingestion_jobs.stats())
+
+@app.get("/stats", response_model=Dict)
+async def get_stats():
+    """
+    Returns runtime statistics of the RAG pipeline (embedding and answer cache hits and misses,
+    reranker batch sizes and queueing delays).
+    """
+    loop = asyncio.get_running_loop()
+    # The job counts are read from SQLite: off the event loop
+    stats = await loop.run_in_executor(None, collect_stats)
+    return dict(stats, role=RAG_ROLE, pid=os.getpid())
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Prometheus-style metrics: per-stage latency histograms, query/document/chunk/token counters,
+    and cache, reranker and startup gauges.
+    """
+    loop = asyncio.get_running_loop()
+    gauges = dict(await loop.run_in_executor(None, collect_stats), startup_seconds=rag_pipeline.startup_timings)
+    return PlainTextResponse(REGISTRY.render(gauges=gauges), media_type="text/plain; version=0.0.4")
 
 @app.get("/health")
 async def health_check():
     """
-    Health check endpoint to verify API status and RAG pipeline initialization.
+    Liveness endpoint: answers as soon as the server is up, even while models are loading.
     """
     status = "initialized" if rag_pipeline.initialized else "not_initialized"
-    return {"status": "ok", "rag_pipeline_status": status}
\ No newline at end of file
+    return {"status": "ok", "rag_pipeline_status": status}
+
+@app.get("/ready")
+async def readiness_check():
+    """
+    Readiness endpoint: 200 once all components are loaded and the pipeline is initialized,
+    503 before. Reports which components are loaded/warmed and the startup time of each.
+    """
+    readiness = rag_pipeline.readiness()
+    return JSONResponse(status_code=200 if readiness["ready"] else 503, content=readiness)
\ No newline at end of file
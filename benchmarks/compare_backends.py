@@ -0,0 +1,139 @@
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from run_benchmarks import ROOT_DIR, peak_rss_mb, percentiles, git_revision, make_pipeline
+from synthetic_off import generate, make_queries
+
+BACKENDS = ("chroma", "numpy")
+
+
+def child_build(args):
+    # Ingests the synthetic CSV into a fresh store of the backend
+    pipeline = make_pipeline(args, args.db_dir, llm_base_url=None)
+    pipeline.initialize()
+    start = time.perf_counter()
+    chunks = pipeline.ingest_file_streaming(args.csv)
+    elapsed = time.perf_counter() - start
+    return {"chunks": chunks, "seconds": round(elapsed, 3), "chunks_per_second": round(chunks / elapsed, 1),
+            "peak_rss_mb": peak_rss_mb()}
+
+
+def child_serve(args):
+    # Opens the store built by child_build in a fresh process and times the vector search alone
+    pipeline = make_pipeline(args, args.db_dir, llm_base_url=None)
+    pipeline.embeddings_model # Loaded first: only the opening of the store is timed
+    start = time.perf_counter()
+    vector_store = pipeline.vector_store
+    open_seconds = time.perf_counter() - start
+
+    queries = make_queries(args.queries, seed=args.seed)
+    embeddings = pipeline.embeddings_model.embed_documents(queries)
+    vector_store.similarity_search_by_vectors(embeddings[:1], k=args.top_k) # Warm-up (pages, caches)
+
+    latencies = []
+    results = []
+    for embedding in embeddings:
+        start = time.perf_counter()
+        docs = vector_store.similarity_search_by_vector(embedding, k=args.top_k)
+        latencies.append(time.perf_counter() - start)
+        results.append([doc.id for doc in docs])
+
+    filtered = []
+    where = {"nutriscore": {"$in": ["a", "b"]}}
+    for embedding in embeddings:
+        start = time.perf_counter()
+        vector_store.similarity_search_by_vector(embedding, k=args.top_k, where=where)
+        filtered.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    vector_store.similarity_search_by_vectors(embeddings, k=args.top_k)
+    batch_seconds = time.perf_counter() - start
+
+    return {"documents": vector_store.collection_count, "open_seconds": round(open_seconds, 3),
+            "search": percentiles(latencies), "filtered_search": percentiles(filtered),
+            "batch_queries_per_second": round(len(embeddings) / batch_seconds, 1),
+            "peak_rss_mb": peak_rss_mb(), "results": results}
+
+
+def run_child(args, mode: str, backend: str, db_dir: str, csv_path: str) -> dict:
+    command = [sys.executable, os.path.abspath(__file__), "--child", mode, "--backend", backend,
+               "--db-dir", db_dir, "--csv", csv_path, "--queries", str(args.queries), "--top-k", str(args.top_k),
+               "--seed", str(args.seed), "--batch-size", str(args.batch_size)]
+    if args.stub_models:
+        command.append("--stub-models")
+    output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def overlap(results: list, reference: list) -> float:
+    # Mean share of the reference top-k found by the other backend
+    shares = [len(set(ids) & set(ref)) / len(ref) for ids, ref in zip(results, reference) if ref]
+    return round(sum(shares) / len(shares), 4) if shares else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the Chroma and numpy vector store backends: ingestion, "
+                                                 "search latency, memory and result overlap.")
+    parser.add_argument("--rows", type=int, default=20000, help="Rows of the synthetic CSV.")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=256, help="Ingestion batch size.")
+    parser.add_argument("--stub-models", action="store_true",
+                        help="Use small deterministic embeddings instead of the HF model.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/backends-<commit>-<time>.json).")
+    parser.add_argument("--child", choices=["build", "serve"], help=argparse.SUPPRESS)
+    parser.add_argument("--backend", choices=BACKENDS, help=argparse.SUPPRESS)
+    parser.add_argument("--db-dir", help=argparse.SUPPRESS)
+    parser.add_argument("--csv", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        # Options read by make_pipeline
+        args.answer_cache, args.rerank_max_wait_ms = False, None
+        print(json.dumps(child_build(args) if args.child == "build" else child_serve(args)))
+        return
+
+    work_dir = tempfile.mkdtemp(prefix="rag-bench-backends-")
+    report = {"git": git_revision(), "started_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+              "config": {key: value for key, value in vars(args).items()
+                         if key in ("rows", "queries", "top_k", "batch_size", "stub_models", "seed")}}
+    try:
+        csv_path = generate(os.path.join(work_dir, "synthetic_openfoodfacts.csv"), args.rows, seed=args.seed)
+        results = {}
+        for backend in BACKENDS:
+            # Store and embedding cache of the backend (its own cache: both builds embed every chunk)
+            db_dir = os.path.join(work_dir, backend)
+            os.makedirs(db_dir)
+            report[backend] = {"build": run_child(args, "build", backend, db_dir, csv_path)}
+            serve = run_child(args, "serve", backend, db_dir, csv_path)
+            results[backend] = serve.pop("results")
+            report[backend]["serve"] = serve
+            print(f"[{backend}] {report[backend]}")
+        # The numpy backend is exact: the overlap is the recall of Chroma's approximate (HNSW) search
+        report["chroma_recall_at_k"] = overlap(results["chroma"], results["numpy"])
+        print(f"[recall] Chroma top-{args.top_k} vs exact search: {report['chroma_recall_at_k']}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    output = args.output
+    if output is None:
+        commit = (report["git"]["commit"] or "unknown")[:12]
+        output = os.path.join(ROOT_DIR, "benchmarks", "results",
+                              f"backends-{commit}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
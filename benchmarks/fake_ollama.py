@@ -0,0 +1,99 @@
+import hashlib
+import json
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    """
+    Deterministic stand-in for the Ollama HTTP API (/api/chat, /api/tags), so that the real
+    ChatOllama client and Generator code paths are exercised without a model server.
+    The answer only depends on the prompt; tokens are emitted every `token_delay` seconds.
+    """
+    protocol_version = "HTTP/1.1"
+    answer_tokens = 64
+    token_delay = 0.0
+    prompt_eval_delay = 0.0
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            self._send_json({"models": [{"name": "mistral:latest", "model": "mistral:latest"}]})
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        if self.path != "/api/chat":
+            self.send_error(404)
+            return
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        prompt = "\n".join(str(message.get("content", "")) for message in body.get("messages", []))
+        tokens = self._answer_tokens(prompt)
+        # Stand-in for the prompt prefill, proportional to the prompt size
+        time.sleep(self.prompt_eval_delay * len(prompt.split()))
+
+        model = body.get("model", "mistral")
+        final = {
+            "model": model, "created_at": self._now(), "message": {"role": "assistant", "content": ""},
+            "done": True, "done_reason": "stop", "total_duration": 0, "load_duration": 0,
+            "prompt_eval_count": len(prompt.split()), "prompt_eval_duration": 0,
+            "eval_count": len(tokens), "eval_duration": 0,
+        }
+        if not body.get("stream", True):
+            time.sleep(self.token_delay * len(tokens))
+            final["message"]["content"] = "".join(tokens)
+            self._send_json(final)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for token in tokens:
+            time.sleep(self.token_delay)
+            self._write_chunk({"model": model, "created_at": self._now(),
+                               "message": {"role": "assistant", "content": token}, "done": False})
+        self._write_chunk(final)
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _answer_tokens(self, prompt: str):
+        digest = hashlib.md5(prompt.encode("utf-8")).hexdigest()
+        words = ["The", " product", " contains", " sugar", " according", " to", " source", f" {digest[:8]}", "."]
+        return [words[i % len(words)] for i in range(self.answer_tokens)]
+
+    def _write_chunk(self, payload: dict):
+        data = (json.dumps(payload) + "\n").encode("utf-8")
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _send_json(self, payload: dict):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    @staticmethod
+    def _now():
+        return datetime.now(timezone.utc).isoformat()
+
+
+def start_fake_ollama(host: str = "127.0.0.1", port: int = 0, answer_tokens: int = 64,
+                      token_delay_ms: float = 0.0, prompt_eval_delay_ms: float = 0.0):
+    """
+    Starts the fake Ollama server in a background thread. Returns `(server, base_url)`.
+    """
+    handler = type("ConfiguredFakeOllamaHandler", (FakeOllamaHandler,), {
+        "answer_tokens": answer_tokens,
+        "token_delay": token_delay_ms / 1000.0,
+        "prompt_eval_delay": prompt_eval_delay_ms / 1000.0,
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fake-ollama", daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
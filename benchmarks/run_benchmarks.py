@@ -0,0 +1,247 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Racine du projet (pour api.main) et src (imports du pipeline), comme ingest.py/clean_db.py
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT_DIR)
+sys.path.append(os.path.join(ROOT_DIR, 'src'))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic_off import generate, make_queries
+from fake_ollama import start_fake_ollama
+
+# Threshold above any cosine similarity: disables the semantic answer cache
+ANSWER_CACHE_DISABLED = 2.0
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux (bytes on macOS)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def percentiles(latencies: list) -> dict:
+    if not latencies:
+        return {}
+    ordered = sorted(latencies)
+
+    def pick(q):
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 2)
+
+    return {"p50_ms": pick(0.50), "p95_ms": pick(0.95), "p99_ms": pick(0.99),
+            "mean_ms": round(sum(ordered) / len(ordered) * 1000, 2), "max_ms": round(ordered[-1] * 1000, 2)}
+
+
+def git_revision() -> dict:
+    def run(*args):
+        try:
+            return subprocess.run(["git", *args], cwd=ROOT_DIR, capture_output=True, text=True,
+                                  check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+    status = run("status", "--porcelain", "--untracked-files=no")
+    return {"commit": run("rev-parse", "HEAD"), "dirty": bool(status) if status is not None else None}
+
+
+def make_pipeline(args, db_dir: str, llm_base_url: str, **kwargs):
+    options = dict(
+        chroma_db_path=os.path.join(db_dir, "chroma_db"),
+        ingest_batch_size=args.batch_size,
+        answer_cache_threshold=ANSWER_CACHE_DISABLED if not args.answer_cache else 0.95,
+        llm_base_url=llm_base_url,
+        vector_backend=args.backend,
+        lazy_load=True,
+        **kwargs
+    )
+    if args.stub_models:
+        from stub_models import StubModelsPipeline
+        return StubModelsPipeline(**options)
+    from rag_pipeline import RAGPipeline
+    return RAGPipeline(rerank_max_wait_ms=args.rerank_max_wait_ms, **options)
+
+
+def bench_startup(args, llm_base_url: str) -> dict:
+    """
+    Cold startup (imports, model loading, warm-up) measured in a fresh interpreter.
+    """
+    command = [sys.executable, os.path.abspath(__file__), "--startup-probe", "--llm-base-url", llm_base_url]
+    if args.stub_models:
+        command.append("--stub-models")
+    command += ["--backend", args.backend]
+    output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def startup_probe(args):
+    # Runs in the child process started by bench_startup
+    start = time.perf_counter()
+    db_dir = tempfile.mkdtemp(prefix="rag-bench-startup-")
+    try:
+        pipeline = make_pipeline(args, db_dir, args.llm_base_url)
+        pipeline.warm_up()
+        pipeline.initialize()
+        result = {"total_seconds": round(time.perf_counter() - start, 3),
+                  "components": dict(pipeline.startup_timings), "peak_rss_mb": peak_rss_mb()}
+    finally:
+        shutil.rmtree(db_dir, ignore_errors=True)
+    print(json.dumps(result))
+
+
+def bench_ingestion(pipeline, csv_path: str, rows: int) -> dict:
+    start = time.perf_counter()
+    chunks = pipeline.ingest_file_streaming(csv_path)
+    elapsed = time.perf_counter() - start
+    return {"rows": rows, "chunks": chunks, "seconds": round(elapsed, 3),
+            "rows_per_second": round(rows / elapsed, 1), "chunks_per_second": round(chunks / elapsed, 1),
+            "peak_rss_mb": peak_rss_mb()}
+
+
+async def run_concurrently(call, queries: list, concurrency: int):
+    """
+    Runs `call(query)` for every query with at most `concurrency` in flight.
+    Returns (latencies of the successful calls, number of errors, wall time).
+    """
+    slots = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def one(query):
+        nonlocal errors
+        async with slots:
+            start = time.perf_counter()
+            try:
+                await call(query)
+            except Exception:
+                errors += 1
+            else:
+                latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(query) for query in queries))
+    return latencies, errors, time.perf_counter() - start
+
+
+def summarize(latencies, errors, wall_time, concurrency) -> dict:
+    return {"concurrency": concurrency, "requests": len(latencies) + errors, "errors": errors,
+            "throughput_rps": round(len(latencies) / wall_time, 2), **percentiles(latencies)}
+
+
+async def bench_pipeline_queries(pipeline, queries: list, levels: list, top_k: int, mode: str) -> list:
+    results = []
+    for concurrency in levels:
+        executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="bench-query")
+        try:
+            async def call(query):
+                await pipeline.aquery(query, top_k=top_k, executor=executor, mode=mode)
+            latencies, errors, wall_time = await run_concurrently(call, queries, concurrency)
+        finally:
+            executor.shutdown(wait=True)
+        results.append(summarize(latencies, errors, wall_time, concurrency))
+        print(f"[pipeline] concurrency {concurrency}: {results[-1]}")
+    return results
+
+
+async def bench_api_queries(pipeline, queries: list, levels: list, top_k: int, mode: str) -> list:
+    # The admission control of the API must not reject the benchmark's own requests
+    os.environ.setdefault("RAG_MAX_IN_FLIGHT_QUERIES", str(max(levels)))
+    import httpx
+    import api.main as api_main
+
+    # The already initialized pipeline replaces the one of the module (startup events are not run)
+    api_main.rag_pipeline = pipeline
+    transport = httpx.ASGITransport(app=api_main.app)
+    results = []
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+        for concurrency in levels:
+            async def call(query):
+                response = await client.post("/query", json={"query": query, "top_k": top_k, "mode": mode})
+                response.raise_for_status()
+            latencies, errors, wall_time = await run_concurrently(call, queries, concurrency)
+            results.append(summarize(latencies, errors, wall_time, concurrency))
+            print(f"[api] concurrency {concurrency}: {results[-1]}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark of the RAG pipeline and API.")
+    parser.add_argument("--rows", type=int, default=5000, help="Rows of the synthetic CSV.")
+    parser.add_argument("--queries", type=int, default=100, help="Queries per concurrency level.")
+    parser.add_argument("--concurrency", default="1,4,16", help="Comma-separated concurrency levels.")
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--mode", default="vector", choices=["vector", "hybrid"], help="Retrieval mode.")
+    parser.add_argument("--backend", default="chroma", choices=["chroma", "numpy"], help="Vector store backend.")
+    parser.add_argument("--batch-size", type=int, default=256, help="Ingestion batch size.")
+    parser.add_argument("--stub-models", action="store_true",
+                        help="Use small deterministic embeddings/reranker instead of the HF models.")
+    parser.add_argument("--answer-tokens", type=int, default=64, help="Tokens per fake Ollama answer.")
+    parser.add_argument("--token-delay-ms", type=float, default=0.0, help="Fake Ollama delay per token.")
+    parser.add_argument("--answer-cache", action="store_true", help="Keep the semantic answer cache enabled.")
+    parser.add_argument("--rerank-max-wait-ms", type=float, default=2.0)
+    parser.add_argument("--skip-api", action="store_true")
+    parser.add_argument("--skip-startup", action="store_true")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/<commit>-<time>.json).")
+    parser.add_argument("--startup-probe", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--llm-base-url", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.startup_probe:
+        startup_probe(args)
+        return
+
+    levels = [int(level) for level in args.concurrency.split(",")]
+    server, llm_base_url = start_fake_ollama(answer_tokens=args.answer_tokens, token_delay_ms=args.token_delay_ms)
+    work_dir = tempfile.mkdtemp(prefix="rag-bench-")
+    report = {
+        "git": git_revision(),
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": {"python": platform.python_version(), "platform": platform.platform(),
+                        "cpu_count": os.cpu_count()},
+        "config": {key: value for key, value in vars(args).items()
+                   if key not in ("startup_probe", "llm_base_url", "output")},
+    }
+    try:
+        if not args.skip_startup:
+            report["startup"] = bench_startup(args, llm_base_url)
+            print(f"[startup] {report['startup']}")
+
+        csv_path = generate(os.path.join(work_dir, "data", "synthetic_openfoodfacts.csv"), args.rows, seed=args.seed)
+        pipeline = make_pipeline(args, work_dir, llm_base_url)
+        pipeline.warm_up()
+        pipeline.initialize()
+
+        report["ingestion"] = bench_ingestion(pipeline, csv_path, args.rows)
+        print(f"[ingestion] {report['ingestion']}")
+
+        queries = make_queries(args.queries, seed=args.seed)
+        report["pipeline_queries"] = asyncio.run(bench_pipeline_queries(pipeline, queries, levels, args.top_k, args.mode))
+        if not args.skip_api:
+            report["api_queries"] = asyncio.run(bench_api_queries(pipeline, queries, levels, args.top_k, args.mode))
+        report["peak_rss_mb"] = peak_rss_mb()
+    finally:
+        server.shutdown()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    output = args.output
+    if output is None:
+        commit = (report["git"]["commit"] or "unknown")[:12]
+        output = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results",
+                              f"{commit}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import hashlib
+import re
+from typing import List
+import numpy as np
+from langchain_core.documents import Document as LangchainDocument
+from langchain_core.embeddings import Embeddings
+from rag_pipeline import RAGPipeline
+from embedding_cache import CachedEmbeddings
+
+_WORD = re.compile(r"\w+")
+
+
+class StubEmbeddings(Embeddings):
+    """
+    Small deterministic embeddings (hashed bag of words, normalized): texts sharing words get
+    close vectors, so retrieval still returns meaningful neighbours. No model to download.
+    """
+
+    def __init__(self, dimension: int = 384):
+        self.dimension = dimension
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for word in _WORD.findall(text.lower()):
+            bucket = int.from_bytes(hashlib.md5(word.encode("utf-8")).digest()[:4], "little")
+            vector[bucket % self.dimension] += 1.0
+        norm = np.linalg.norm(vector)
+        if norm:
+            vector /= norm
+        return vector.tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+class StubReranker:
+    """
+    Same interface as reranker.Reranker, scoring pairs by word overlap instead of a CrossEncoder.
+    """
+
+    def score_pairs(self, sentence_pairs: List[List[str]]) -> List[float]:
+        scores = []
+        for query, content in sentence_pairs:
+            query_words = set(_WORD.findall(query.lower()))
+            content_words = set(_WORD.findall(content.lower()))
+            scores.append(len(query_words & content_words) / (len(query_words) or 1))
+        return scores
+
+    @staticmethod
+    def apply_scores(documents: List[LangchainDocument], scores: List[float]) -> List[LangchainDocument]:
+        for doc, score in zip(documents, scores):
+            doc.metadata['rerank_score'] = score
+        documents.sort(key=lambda x: x.metadata['rerank_score'], reverse=True)
+        return documents
+
+    def rerank(self, query: str, documents: List[LangchainDocument]) -> List[LangchainDocument]:
+        return self.apply_scores(documents, self.score_pairs([[query, doc.page_content] for doc in documents]))
+
+    def rerank_batch(self, queries: List[str], documents_lists: List[List[LangchainDocument]]):
+        return [self.rerank(query, documents) for query, documents in zip(queries, documents_lists)]
+
+
+class StubModelsPipeline(RAGPipeline):
+    """
+    RAGPipeline with the stub embeddings and reranker: everything else (embedding cache,
+    Chroma, answer cache, Generator/ChatOllama) is the real code.
+    """
+
+    def _load_embedding_weights(self):
+        return StubEmbeddings()
+
+    def _load_reranker_weights(self):
+        return StubReranker()
+
+    def _build_embeddings_model(self):
+        return CachedEmbeddings(
+            self._preloaded_models.get("embeddings") or self._load_embedding_weights(),
+            model_name="stub-embeddings",
+            cache_path=self.embedding_cache_path,
+            max_entries=self.embedding_cache_max_entries
+        )
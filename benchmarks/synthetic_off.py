@@ -0,0 +1,95 @@
+import argparse
+import csv
+import os
+import random
+
+# Columns that carry data in the synthetic rows, named as in the Open Food Facts dump
+DATA_COLUMNS = [
+    "code", "product_name", "brands", "categories_en", "main_category_en", "countries_en", "ingredients_text",
+    "allergens", "nutriscore_grade", "nova_group", "energy-kcal_100g", "fat_100g",
+    "saturated-fat_100g", "sugars_100g", "proteins_100g", "salt_100g",
+]
+# The real dump has ~200 columns, most of them empty for a given product
+EMPTY_COLUMNS = [f"unused_field_{i}" for i in range(60)]
+
+BRANDS = ["Ferrero", "Danone", "Nestle", "Carrefour", "Lu", "Bonne Maman", "Lindt", "Barilla",
+          "Heinz", "Kellogg's", "Lactalis", "Andros", "Panzani", "Herta", "Fleury Michon"]
+CATEGORIES = ["Spreads", "Yogurts", "Breakfast cereals", "Biscuits", "Chocolates", "Pasta",
+              "Sauces", "Cheeses", "Fruit juices", "Hams", "Jams", "Sodas", "Soups", "Snacks"]
+ADJECTIVES = ["Organic", "Classic", "Light", "Crunchy", "Creamy", "Dark", "Whole grain",
+              "Sugar free", "Extra", "Traditional", "Mini", "Family size"]
+INGREDIENTS = ["sugar", "palm oil", "hazelnuts", "skimmed milk", "cocoa", "wheat flour",
+               "salt", "water", "tomato", "olive oil", "strawberries", "butter", "eggs",
+               "rice", "soy lecithin", "vanillin", "pork", "cream", "oats", "honey"]
+COUNTRIES = ["France", "Germany", "Spain", "Italy", "Belgium", "United Kingdom", "Switzerland"]
+
+
+def make_row(rng: random.Random, index: int) -> dict:
+    brand = rng.choice(BRANDS)
+    category = rng.choice(CATEGORIES)
+    return {
+        "code": f"{3000000000000 + index:013d}",
+        "product_name": f"{rng.choice(ADJECTIVES)} {category.lower()} {brand} {index % 997}",
+        "brands": brand,
+        "categories_en": f"Groceries,{category}",
+        "main_category_en": category,
+        "countries_en": ",".join(rng.sample(COUNTRIES, rng.randint(1, 3))),
+        "ingredients_text": ", ".join(rng.sample(INGREDIENTS, rng.randint(3, 9))),
+        "allergens": rng.choice(["", "en:milk", "en:nuts", "en:gluten", "en:soybeans"]),
+        "nutriscore_grade": rng.choice("abcde"),
+        "nova_group": str(rng.randint(1, 4)),
+        "energy-kcal_100g": f"{rng.uniform(20, 600):.1f}",
+        "fat_100g": f"{rng.uniform(0, 60):.1f}",
+        "saturated-fat_100g": f"{rng.uniform(0, 20):.1f}",
+        "sugars_100g": f"{rng.uniform(0, 70):.1f}",
+        "proteins_100g": f"{rng.uniform(0, 30):.1f}",
+        "salt_100g": f"{rng.uniform(0, 3):.2f}",
+    }
+
+
+def generate(path: str, rows: int, seed: int = 42, delimiter: str = ","):
+    """
+    Writes a deterministic Open Food Facts-like CSV of `rows` products (same seed, same file).
+    Like data/sample_openfoodfacts.csv produced by create_sample_csv.py, it is comma-separated
+    by default; use delimiter='\\t' to mimic the raw dump.
+    """
+    rng = random.Random(seed)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=DATA_COLUMNS + EMPTY_COLUMNS, delimiter=delimiter)
+        writer.writeheader()
+        for index in range(rows):
+            writer.writerow(make_row(rng, index))
+    return path
+
+
+def make_queries(count: int, seed: int = 7) -> list:
+    """
+    Deterministic questions in the style of the production traffic.
+    """
+    rng = random.Random(seed)
+    templates = [
+        "Is {brand} {category} vegan?",
+        "Which {category} from {brand} have the lowest sugar?",
+        "What is the nutriscore of {adjective} {category} {brand}?",
+        "Does {brand} {category} contain {ingredient}?",
+        "List {category} sold in {country} without {ingredient}.",
+    ]
+    return [
+        rng.choice(templates).format(
+            brand=rng.choice(BRANDS), category=rng.choice(CATEGORIES).lower(),
+            adjective=rng.choice(ADJECTIVES), ingredient=rng.choice(INGREDIENTS),
+            country=rng.choice(COUNTRIES))
+        for _ in range(count)
+    ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic Open Food Facts-style CSV.")
+    parser.add_argument("path", nargs="?", default=os.path.join("data", "synthetic_openfoodfacts.csv"))
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--tsv", action="store_true", help="Tab-separated, like the raw dump.")
+    args = parser.parse_args()
+    generate(args.path, args.rows, seed=args.seed, delimiter="\t" if args.tsv else ",")
+    print(f"Wrote {args.rows} rows to {args.path}")
@@ -1,20 +1,60 @@
 import sys
 import os
+import argparse
 
 # 1. Ajouter le dossier 'src' au chemin de recherche (PYTHONPATH)
-# Cela permet à Python de trouver 'rag_pipeline', 'document_processor', etc.
+# Cela permet à Python de trouver 'vector_store', 'document_processor', etc.
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
-# 2. Importer depuis 'rag_pipeline' (maintenant accessible directement)
-from rag_pipeline import RAGPipeline
+# 2. Importer depuis 'vector_store' (maintenant accessible directement)
+# Le nettoyage n'a besoin d'aucun modèle : pas besoin de construire tout le RAGPipeline.
+from vector_store import VectorStore, VECTOR_BACKENDS, DEFAULT_PERSIST_DIRECTORIES, bump_store_generation
 
-def clean():
-    print("Initialisation du pipeline...")
+def clean(dry_run: bool = False, batch_size: int = 5000, delete_batch_size: int = 1000,
+          rebuild_lexical_index: bool = False, backend: str = "chroma", compact: bool = False,
+          rebuild_metadata_index: bool = False):
+    print("Ouverture de la base vectorielle...")
     # On s'assure d'utiliser le chemin relatif correct pour la DB depuis la racine
-    pipeline = RAGPipeline(chroma_db_path="chroma_db")
+    vector_store = VectorStore(persist_directory=DEFAULT_PERSIST_DIRECTORIES[backend], backend=backend)
     
+    if rebuild_metadata_index and not dry_run:
+        # Ids et champs filtrables utilisés pour parcourir la base (avant le dédoublonnage, qui s'en sert)
+        print("Reconstruction de l'index des métadonnées...")
+        indexed = vector_store.rebuild_metadata_index(batch_size=batch_size)
+        print(f"Index des métadonnées : {indexed} documents indexés.")
+
     print("Lancement du nettoyage...")
-    pipeline.vector_store.remove_duplicates()
+    report = vector_store.remove_duplicates(batch_size=batch_size, delete_batch_size=delete_batch_size,
+                                            dry_run=dry_run)
+    print(f"Rapport : {report}")
+
+    if rebuild_lexical_index and not dry_run:
+        # Index BM25 d'une base créée avant son introduction (recherche hybride / code-barres)
+        print("Reconstruction de l'index lexical...")
+        indexed = vector_store.rebuild_lexical_index(batch_size=batch_size)
+        print(f"Index lexical : {indexed} documents indexés.")
+
+    if compact and not dry_run:
+        # Backend numpy : les lignes supprimées restent dans la matrice jusqu'au compactage
+        vector_store.compact()
+
+    if not dry_run:
+        # Les workers de serve.py rechargent la base (et vident leur cache de réponses)
+        bump_store_generation(vector_store.persist_directory)
 
 if __name__ == "__main__":
-    clean()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Remove duplicate documents from the vector store.")
+    parser.add_argument("--dry-run", action="store_true", help="Only report the duplicates, do not delete them.")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Documents read per page.")
+    parser.add_argument("--delete-batch-size", type=int, default=1000, help="Duplicates deleted per call.")
+    parser.add_argument("--rebuild-lexical-index", action="store_true",
+                        help="Also rebuild the BM25 index used by hybrid and barcode search.")
+    parser.add_argument("--rebuild-metadata-index", action="store_true",
+                        help="Also rebuild the index of ids and filter fields used to page through the store.")
+    parser.add_argument("--backend", default="chroma", choices=VECTOR_BACKENDS,
+                        help="Vector store backend (chroma_db/ or numpy_db/).")
+    parser.add_argument("--compact", action="store_true",
+                        help="Reclaim the space of deleted documents (numpy backend).")
+    args = parser.parse_args()
+    clean(args.dry_run, args.batch_size, args.delete_batch_size, args.rebuild_lexical_index,
+          backend=args.backend, compact=args.compact, rebuild_metadata_index=args.rebuild_metadata_index)
@@ -0,0 +1,53 @@
+import sys
+import os
+import argparse
+
+# Ajouter le dossier 'src' au chemin de recherche (PYTHONPATH)
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+# Ni l'export ni l'import n'ont besoin du modèle d'embedding : pas de RAGPipeline complet.
+from vector_store import VectorStore, VECTOR_BACKENDS, DEFAULT_PERSIST_DIRECTORIES, bump_store_generation
+from snapshot import export_snapshot, import_snapshot, VECTOR_DTYPES
+
+DEFAULT_EMBEDDING_MODEL = "BAAI/bge-small-en-v1.5"
+
+def export(output_dir: str, dtype: str, embedding_model: str, db_path: str, backend: str = "chroma"):
+    print("Ouverture de la base vectorielle...")
+    vector_store = VectorStore(persist_directory=db_path, backend=backend)
+    manifest = export_snapshot(vector_store, output_dir, embedding_model, dtype=dtype)
+    print(f"Snapshot : {manifest['count']} documents, dimension {manifest['dimension']}, {manifest['dtype']}.")
+
+def load(snapshot_dir: str, embedding_model: str, db_path: str, verify: bool, backend: str = "chroma"):
+    print("Ouverture de la base vectorielle...")
+    vector_store = VectorStore(persist_directory=db_path, backend=backend)
+    if vector_store.collection_count:
+        # Les documents existants sont conservés ; ceux du snapshot (mêmes ids) sont écrasés
+        print(f"Attention : la base contient déjà {vector_store.collection_count} documents.")
+    report = import_snapshot(vector_store, snapshot_dir, embedding_model, verify=verify)
+    # Les workers de serve.py rechargent la base (et vident leur cache de réponses)
+    bump_store_generation(db_path)
+    print(f"Rapport : {report}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the vector store to a compact snapshot, or load one "
+                                                 "into a (fresh) vector store without re-embedding.")
+    parser.add_argument("--backend", default="chroma", choices=VECTOR_BACKENDS,
+                        help="Vector store backend (a Chroma snapshot can be imported into the numpy backend).")
+    parser.add_argument("--db-path", default=None, help="Vector store directory (default: chroma_db or numpy_db).")
+    parser.add_argument("--embedding-model", default=DEFAULT_EMBEDDING_MODEL,
+                        help="Embedding model of the vector store (recorded on export, checked on import).")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export_parser = subparsers.add_parser("export", help="Write a snapshot of the vector store.")
+    export_parser.add_argument("output_dir", help="Snapshot directory (must not exist).")
+    export_parser.add_argument("--dtype", default="float16", choices=VECTOR_DTYPES,
+                               help="Storage type of the vectors (int8: 4x smaller than float32).")
+    import_parser = subparsers.add_parser("import", help="Bulk-load a snapshot into the vector store.")
+    import_parser.add_argument("snapshot_dir", help="Snapshot directory written by 'export'.")
+    import_parser.add_argument("--no-verify", action="store_true", help="Skip the sha256 checks of the files.")
+    args = parser.parse_args()
+    db_path = args.db_path or DEFAULT_PERSIST_DIRECTORIES[args.backend]
+
+    if args.command == "export":
+        export(args.output_dir, args.dtype, args.embedding_model, db_path, backend=args.backend)
+    else:
+        load(args.snapshot_dir, args.embedding_model, db_path, verify=not args.no_verify, backend=args.backend)
@@ -0,0 +1,38 @@
+import sys
+import os
+import argparse
+
+# Ajouter le dossier 'src' au chemin de recherche (PYTHONPATH)
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from rag_pipeline import RAGPipeline
+from vector_store import VECTOR_BACKENDS, DEFAULT_PERSIST_DIRECTORIES
+
+def ingest(path: str, batch_size: int, workers: int, off_columns: list = None, backend: str = "chroma"):
+    print("Initialisation du pipeline...")
+    pipeline = RAGPipeline(chroma_db_path=DEFAULT_PERSIST_DIRECTORIES[backend], ingest_batch_size=batch_size,
+                           ingest_workers=workers, off_columns=off_columns, vector_backend=backend)
+    pipeline.initialize()
+
+    if os.path.isdir(path):
+        # Dossier : chargement/découpage en parallèle, embedding en parallèle de l'analyse
+        total_chunks = pipeline.ingest_directory(path)
+    else:
+        # Ingestion en streaming : la mémoire reste stable quelle que soit la taille du fichier
+        # (ex. en.openfoodfacts.org.products.csv, 11 Go).
+        total_chunks = pipeline.ingest_file_streaming(path)
+    print(f"Ingestion terminée : {total_chunks} chunks ajoutés.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest a (large) document or a directory into the vector store.")
+    parser.add_argument("path", help="File (.csv, .pdf or .txt) or directory to ingest.")
+    parser.add_argument("--batch-size", type=int, default=256, help="Chunks embedded and written per batch.")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Processes loading and chunking files of a directory (default: cores - 1).")
+    parser.add_argument("--columns", default=None,
+                        help="Comma-separated columns kept from Open Food Facts CSVs (default: see src/off_loader.py).")
+    parser.add_argument("--backend", default="chroma", choices=VECTOR_BACKENDS,
+                        help="Vector store backend (chroma_db/ or numpy_db/).")
+    args = parser.parse_args()
+    ingest(args.path, args.batch_size, args.workers,
+           off_columns=args.columns.split(",") if args.columns else None, backend=args.backend)
@@ -0,0 +1,159 @@
+import sys
+import os
+import argparse
+import signal
+import socket
+import time
+
+# Racine du projet (pour api.main) et src (imports du pipeline)
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(ROOT_DIR)
+sys.path.append(os.path.join(ROOT_DIR, 'src'))
+
+# Un worker qui plante est relancé (après une pause s'il plante juste après son démarrage)
+RESTART_BACKOFF_SECONDS = 1.0
+
+
+def set_torch_threads(threads: int):
+    # Each worker gets its share of the cores instead of one torch thread per core each
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        torch.set_num_threads(threads)
+
+
+def run_reader(api_main, sock: socket.socket, threads: int, log_level: str):
+    import uvicorn
+
+    set_torch_threads(threads)
+    config = uvicorn.Config(api_main.app, log_level=log_level)
+    # The socket is bound by the parent: the kernel spreads the connections between the workers
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def run_writer(api_main, threads: int):
+    set_torch_threads(threads)
+    api_main.RAG_ROLE = "writer"
+    stopping = []
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopping.append(signum))
+    signal.signal(signal.SIGINT, lambda signum, frame: stopping.append(signum))
+    # Syncs data/, then runs the ingestion jobs queued by the readers until it is stopped
+    api_main.load_pipeline()
+    while not stopping:
+        time.sleep(0.5)
+    api_main.ingestion_jobs.stop(timeout=30)
+
+
+def spawn(role: str, target, *args) -> int:
+    pid = os.fork()
+    if pid:
+        return pid
+    # Child: the parent's signal handlers do not apply here
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    code = 0
+    try:
+        target(*args)
+    except Exception as e:
+        print(f"[{role} {os.getpid()}] crashed: {e}")
+        code = 1
+    finally:
+        sys.stdout.flush()
+        os._exit(code)
+
+
+def serve(host: str, port: int, workers: int, threads: int, writer: bool, log_level: str):
+    if not hasattr(os, "fork"):
+        sys.exit("serve.py needs fork (Linux/macOS). On Windows, run: uvicorn api.main:app")
+
+    # Chroma does not support several processes opening its directory while one of them writes:
+    # the workers share the memory-mapped numpy store instead (readers remap it after each write)
+    os.environ.setdefault("RAG_VECTOR_BACKEND", "numpy")
+    if os.environ["RAG_VECTOR_BACKEND"] != "numpy":
+        sys.exit("serve.py needs the numpy vector backend (RAG_VECTOR_BACKEND=numpy). To convert a Chroma store:\n"
+                 "  python index_snapshot.py export snapshots/store\n"
+                 "  python index_snapshot.py --backend numpy import snapshots/store\n"
+                 "or serve Chroma from a single process: uvicorn api.main:app")
+
+    # Must be set before the models are loaded: the Rust tokenizers must not start threads before the fork
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+    os.environ["RAG_ROLE"] = "reader"
+    import api.main as api_main
+
+    # 1. Model weights loaded once, shared copy-on-write by every worker. The caches, the vector
+    #    store, the job store (SQLite connections) and the threads are created after the fork,
+    #    in each worker.
+    print(f"Preloading models before starting {workers} workers...")
+    api_main.rag_pipeline.preload_models()
+    loaded = [name for name, ready in api_main.rag_pipeline.readiness()["components"].items() if ready]
+    if loaded:
+        sys.exit(f"Components opened before the fork ({', '.join(loaded)}): their files and SQLite "
+                 f"connections must not be shared by the workers.")
+
+    # 2. One listening socket for all the workers
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    # 3. N query workers and a single writer (ingestion jobs, sync of data/)
+    roles = {f"reader-{i}": (run_reader, api_main, sock, threads, log_level) for i in range(workers)}
+    if writer:
+        roles["writer"] = (run_writer, api_main, threads)
+    children = {}
+    started_at = {}
+    for role, (target, *args) in roles.items():
+        children[spawn(role, target, *args)] = role
+        started_at[role] = time.monotonic()
+    print(f"Serving on http://{host}:{port} with {workers} workers"
+          f"{' and 1 writer' if writer else ''} ({threads} torch threads each), pids {sorted(children)}.")
+
+    stopping = []
+
+    def stop(signum, frame):
+        stopping.append(signum)
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    # 4. Supervision: restarts a worker that exits while the server is running
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        role = children.pop(pid, None)
+        if role is None or stopping:
+            continue
+        print(f"[{role} {pid}] exited with status {os.waitstatus_to_exitcode(status)}, restarting.")
+        if time.monotonic() - started_at[role] < RESTART_BACKOFF_SECONDS:
+            time.sleep(RESTART_BACKOFF_SECONDS)
+        target, *args = roles[role]
+        children[spawn(role, target, *args)] = role
+        started_at[role] = time.monotonic()
+    sock.close()
+    print("Server stopped.")
+
+
+if __name__ == "__main__":
+    cores = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description="Serve the RAG API with several worker processes sharing the "
+                                                 "models, and a single writer process for ingestion.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=max(1, cores // 2), help="Query worker processes.")
+    parser.add_argument("--threads", type=int, default=None,
+                        help="Torch threads per process (default: cores / workers).")
+    parser.add_argument("--no-writer", action="store_true",
+                        help="No writer process: uploads stay queued (e.g. a read-only replica).")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+    serve(args.host, args.port, args.workers, args.threads or max(1, cores // args.workers),
+          writer=not args.no_writer, log_level=args.log_level)
@@ -0,0 +1,138 @@
+import math
+from typing import List
+
+# Rough size of a token for the Mistral/Llama tokenizers on English text
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _overlap(left: str, right: str, min_overlap: int, max_overlap: int) -> int:
+    # Length of the longest suffix of `left` that is also a prefix of `right` (0 if < min_overlap)
+    for size in range(min(len(left), len(right), max_overlap), min_overlap - 1, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+class ContextBuilder:
+    """
+    Builds the prompt context from reranked documents (dicts with 'content' and 'metadata').
+    Chunks of the same source that overlap (the text splitter repeats up to `chunk_overlap`
+    characters between consecutive chunks) or come from the same row/page are merged into one
+    passage, chunks already contained in another passage are dropped, and passages are packed
+    in rerank order until `max_tokens` is reached. Token counts are estimated from the length.
+    """
+
+    def __init__(self, max_tokens: int = 2000, min_overlap: int = 20, max_overlap: int = 400):
+        self.max_tokens = max_tokens
+        self.min_overlap = min_overlap
+        self.max_overlap = max_overlap
+
+    @staticmethod
+    def format_passage(source: str, content: str) -> str:
+        return f"Source: {source}\nContent: {content}\n\n"
+
+    def merge(self, documents: List[dict]) -> List[dict]:
+        """
+        Merges the documents into passages `{"source", "content", "documents"}`, ordered by
+        the rank of their best document.
+        """
+        passages = []
+        for doc in documents:
+            content = doc["content"].strip()
+            if not content:
+                continue
+            # Repeated span: already sent in a passage (of any source)
+            if any(content in passage["content"] for passage in passages):
+                continue
+
+            source = doc["metadata"].get("source", "N/A")
+            locator = doc["metadata"].get("row", doc["metadata"].get("page"))
+            for passage in passages:
+                if passage["source"] != source:
+                    continue
+                merged = self._merge_text(passage["content"], content)
+                if merged is None and locator is not None and locator == passage["locator"]:
+                    # Pieces of the same row/page without a detectable overlap
+                    merged = passage["content"] + "\n" + content
+                if merged is not None:
+                    passage["content"] = merged
+                    passage["documents"] += 1
+                    self._absorb(passage, passages)
+                    break
+            else:
+                passages.append({"source": source, "locator": locator, "content": content, "documents": 1})
+        return passages
+
+    def _absorb(self, passage: dict, passages: List[dict]):
+        # A grown passage may now bridge other passages of its source (chunks 1 and 3, then 2)
+        for other in list(passages):
+            if other is passage or other["source"] != passage["source"]:
+                continue
+            merged = self._merge_text(passage["content"], other["content"])
+            if merged is None and other["content"] in passage["content"]:
+                merged = passage["content"]
+            if merged is not None:
+                passage["content"] = merged
+                passage["documents"] += other["documents"]
+                passages.remove(other)
+
+    def _merge_text(self, passage: str, content: str):
+        if passage in content:
+            return content
+        size = _overlap(passage, content, self.min_overlap, self.max_overlap)
+        if size:
+            return passage + content[size:]
+        size = _overlap(content, passage, self.min_overlap, self.max_overlap)
+        if size:
+            return content + passage[size:]
+        return None
+
+    def build(self, documents: List[dict]):
+        """
+        Returns `(context, stats)`. In `stats`, 'estimated_tokens_saved' is what merging and
+        deduplication saved on the documents concatenated as they are, and
+        'estimated_tokens_dropped' what the token budget then cut from the merged passages.
+        """
+        naive_tokens = sum(
+            estimate_tokens(self.format_passage(doc["metadata"].get("source", "N/A"), doc["content"]))
+            for doc in documents
+        )
+        passages = self.merge(documents)
+        merged_tokens = sum(estimate_tokens(self.format_passage(passage["source"], passage["content"]))
+                            for passage in passages)
+
+        blocks = []
+        used_tokens = 0
+        truncated = False
+        for passage in passages:
+            block = self.format_passage(passage["source"], passage["content"])
+            tokens = estimate_tokens(block)
+            if used_tokens + tokens > self.max_tokens:
+                remaining_chars = (self.max_tokens - used_tokens) * CHARS_PER_TOKEN
+                header = self.format_passage(passage["source"], "")
+                # Only worth keeping if a meaningful part of the passage fits (or nothing else does)
+                if not blocks or remaining_chars - len(header) >= 200:
+                    content = passage["content"][:max(remaining_chars - len(header) - 1, 200)]
+                    content = content[:content.rfind(" ")] if " " in content else content
+                    block = self.format_passage(passage["source"], content + "…")
+                    blocks.append(block)
+                    used_tokens += estimate_tokens(block)
+                truncated = True
+                break
+            blocks.append(block)
+            used_tokens += tokens
+
+        context = "".join(blocks)
+        stats = {
+            "documents": len(documents),
+            "passages": len(blocks),
+            "estimated_tokens": used_tokens,
+            "estimated_tokens_saved": max(0, naive_tokens - merged_tokens),
+            "estimated_tokens_dropped": max(0, merged_tokens - used_tokens),
+            "truncated": truncated,
+        }
+        return context, stats
@@ -1,10 +1,16 @@
 from langchain_community.document_loaders import TextLoader, PyPDFLoader, DirectoryLoader, CSVLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document as LangchainDocument
+from off_loader import OpenFoodFactsLoader, is_open_food_facts_csv
 import os
 
+# Extensions for which a loader exists (extend as more loaders are added)
+SUPPORTED_EXTENSIONS = ('.txt', '.pdf', '.csv')
+
 class DocumentProcessor:
-    def __init__(self, chunk_size=1000, chunk_overlap=200):
+    def __init__(self, chunk_size=1000, chunk_overlap=200, off_columns=None):
+        # Column allow-list of Open Food Facts CSVs (None = off_loader.DEFAULT_COLUMNS)
+        self.off_columns = off_columns
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=chunk_size,
             chunk_overlap=chunk_overlap,
@@ -12,10 +18,9 @@ class DocumentProcessor:
             is_separator_regex=False,
         )
 
-    def load_and_chunk_file(self, file_path: str):
+    def _get_loader(self, file_path: str):
         """
-        Loads a single file and splits it into chunks using Langchain.
-        Automatically detects loader based on file extension.
+        Returns the Langchain loader matching the file extension, or None if unsupported.
         """
         _, file_extension = os.path.splitext(file_path)
         loader = None
@@ -23,12 +28,22 @@ class DocumentProcessor:
             loader = TextLoader(file_path)
         elif file_extension.lower() == ".pdf":
             loader = PyPDFLoader(file_path)
+        elif file_extension.lower() == ".csv" and is_open_food_facts_csv(file_path):
+            # One compact document per product instead of a dump of every column
+            loader = OpenFoodFactsLoader(file_path, columns=self.off_columns)
         elif file_extension.lower() == ".csv":
             loader = CSVLoader(file_path, encoding='utf-8', csv_args={'delimiter': ','})
         # Add more loaders for other file types as needed
         # elif file_extension.lower() == ".docx":
         #     loader = Docx2txtLoader(file_path)
-        
+        return loader
+
+    def load_and_chunk_file(self, file_path: str):
+        """
+        Loads a single file and splits it into chunks using Langchain.
+        Automatically detects loader based on file extension.
+        """
+        loader = self._get_loader(file_path)
         if loader:
             documents = loader.load()
             chunks = self.text_splitter.split_documents(documents)
@@ -37,6 +52,42 @@ class DocumentProcessor:
             print(f"No suitable loader found for file: {file_path}")
             return []
 
+    def iter_chunk_batches(self, file_path: str, batch_size: int = 256):
+        """
+        Lazily loads a file and yields its chunks in lists of at most `batch_size`.
+        Rows (CSV) or pages (PDF) are read one at a time, so memory is bounded by the
+        batch size instead of the file size.
+        Yields `(chunks, rows_read)` tuples, `rows_read` being the running count of rows/pages consumed.
+        """
+        loader = self._get_loader(file_path)
+        if not loader:
+            print(f"No suitable loader found for file: {file_path}")
+            return
+
+        batch = []
+        rows_read = 0
+        for document in loader.lazy_load():
+            rows_read += 1
+            batch.extend(self.text_splitter.split_documents([document]))
+            while len(batch) >= batch_size:
+                yield batch[:batch_size], rows_read
+                batch = batch[batch_size:]
+        if batch:
+            yield batch, rows_read
+
+    def iter_supported_files(self, directory_path: str):
+        """
+        Walks a directory and yields the paths of the files a loader exists for.
+        """
+        for root, _, files in os.walk(directory_path):
+            for file in files:
+                file_path = os.path.join(root, file)
+                # Filter for supported types
+                if file.lower().endswith(SUPPORTED_EXTENSIONS):
+                    yield file_path
+                else:
+                    print(f"Skipping unsupported file type: {file_path}")
+
     def load_and_chunk_directory(self, directory_path: str):
         """
         Loads all supported files from a directory and splits them into chunks.
@@ -52,16 +103,10 @@ class DocumentProcessor:
         
         # Using a more generic approach to find files and load them individually
         all_chunks = []
-        for root, _, files in os.walk(directory_path):
-            for file in files:
-                file_path = os.path.join(root, file)
-                # Filter for supported types
-                if file.lower().endswith(('.txt', '.pdf', '.csv')): # Extend as more loaders are added
-                    print(f"Loading and chunking file: {file_path}")
-                    chunks = self.load_and_chunk_file(file_path)
-                    all_chunks.extend(chunks)
-                else:
-                    print(f"Skipping unsupported file type: {file_path}")
+        for file_path in self.iter_supported_files(directory_path):
+            print(f"Loading and chunking file: {file_path}")
+            chunks = self.load_and_chunk_file(file_path)
+            all_chunks.extend(chunks)
         return all_chunks
 
 if __name__ == "__main__":
@@ -0,0 +1,125 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from typing import List
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+# SQLite limits the number of '?' placeholders per statement
+_SQL_BATCH = 500
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps an embeddings model with a persistent, content-addressed cache (SQLite).
+    Entries are keyed by the embedding model name and the md5 of the text, i.e. the same
+    hash VectorStore.add_documents uses as document id, so re-ingesting known chunks
+    never runs the model again. The cache is bounded: least recently used entries are
+    evicted once `max_entries` is exceeded.
+    """
+
+    def __init__(self, embeddings_model: Embeddings, model_name: str,
+                 cache_path: str = "embedding_cache.sqlite3", max_entries: int = 1_000_000):
+        self.embeddings_model = embeddings_model
+        self.model_name = model_name
+        self.cache_path = cache_path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(cache_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model TEXT NOT NULL, content_hash TEXT NOT NULL, vector BLOB NOT NULL, last_used REAL NOT NULL,"
+            " PRIMARY KEY (model, content_hash))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings (last_used)")
+        self._conn.commit()
+        self._entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        hashes = [hashlib.md5(text.encode('utf-8')).hexdigest() for text in texts]
+        cached = self._lookup(set(hashes))
+
+        # Only the texts that are not cached go through the model (each distinct text once)
+        missing = {}
+        for content_hash, text in zip(hashes, texts):
+            if content_hash not in cached:
+                missing.setdefault(content_hash, text)
+        if missing:
+            vectors = self.embeddings_model.embed_documents(list(missing.values()))
+            new_entries = dict(zip(missing.keys(), vectors))
+            self._store(new_entries)
+            cached.update(new_entries)
+
+        with self._lock:
+            self.misses += len(missing)
+            self.hits += len(texts) - len(missing)
+        return [list(cached[content_hash]) for content_hash in hashes]
+
+    def embed_query(self, text: str) -> List[float]:
+        # Queries are rarely repeated verbatim: they are not cached here
+        return self.embeddings_model.embed_query(text)
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embeds several queries in one model call, bypassing the cache.
+        """
+        return self.embeddings_model.embed_documents(texts)
+
+    def _lookup(self, hashes) -> dict:
+        found = {}
+        hashes = list(hashes)
+        now = time.time()
+        with self._lock:
+            for i in range(0, len(hashes), _SQL_BATCH):
+                part = hashes[i:i + _SQL_BATCH]
+                placeholders = ",".join("?" * len(part))
+                rows = self._conn.execute(
+                    f"SELECT content_hash, vector FROM embeddings WHERE model = ? AND content_hash IN ({placeholders})",
+                    [self.model_name, *part]
+                ).fetchall()
+                for content_hash, blob in rows:
+                    found[content_hash] = np.frombuffer(blob, dtype=np.float32).tolist()
+                # Touch the hits so that eviction is least-recently-used
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND content_hash = ?",
+                    [(now, self.model_name, content_hash) for content_hash, _ in rows]
+                )
+            self._conn.commit()
+        return found
+
+    def _store(self, entries: dict):
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (model, content_hash, vector, last_used) VALUES (?, ?, ?, ?)",
+                [(self.model_name, content_hash, np.asarray(vector, dtype=np.float32).tobytes(), now)
+                 for content_hash, vector in entries.items()]
+            )
+            self._entries += max(cursor.rowcount, 0)
+            if self._entries > self.max_entries:
+                # Evict down to 90% of the capacity so that eviction does not run on every insert
+                to_evict = self._entries - int(self.max_entries * 0.9)
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE rowid IN ("
+                    " SELECT rowid FROM embeddings ORDER BY last_used LIMIT ?)",
+                    (to_evict,)
+                )
+                self._entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "model": self.model_name,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "entries": self._entries,
+                "max_entries": self.max_entries,
+            }
@@ -1,13 +1,19 @@
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from langchain_ollama import ChatOllama
+from context_builder import ContextBuilder
+from metrics import PROMPT_TOKENS, GENERATED_TOKENS, CONTEXT_TOKENS_SAVED, CONTEXT_TOKENS_DROPPED
+
+# Prefix of the responses returned when the LLM call fails
+GENERATION_ERROR_PREFIX = "An error occurred while generating response"
 
 class Generator:
-    def __init__(self, llm_model_name="mistral"):
+    def __init__(self, llm_model_name="mistral", base_url: str = None, context_max_tokens: int = 2000):
         # Initialize a Langchain LLM using Ollama.
         # This can be replaced with any Ollama-compatible model.
         # Ensure you have Ollama running locally with the specified model pulled (e.g., `ollama pull mistral`).
-        self.llm = ChatOllama(model=llm_model_name, temperature=0.0)
+        # base_url: Ollama server URL (None = OLLAMA_HOST or the local default)
+        self.llm = ChatOllama(model=llm_model_name, temperature=0.0, base_url=base_url)
 
         # Define a prompt template for RAG
         self.prompt = ChatPromptTemplate.from_template(
@@ -21,16 +27,29 @@ class Generator:
             Answer:
             """
         )
+        # Merges overlapping chunks and packs the context under a token budget
+        self.context_builder = ContextBuilder(max_tokens=context_max_tokens)
         self.output_parser = StrOutputParser()
         self.chain = self.prompt | self.llm | self.output_parser
+        # Same chain without the parser: the LLM messages carry the token usage reported by Ollama
+        self.llm_chain = self.prompt | self.llm
+
+    @staticmethod
+    def _record_usage(message):
+        usage = getattr(message, "usage_metadata", None)
+        if usage:
+            PROMPT_TOKENS.inc(usage.get("input_tokens", 0))
+            GENERATED_TOKENS.inc(usage.get("output_tokens", 0))
 
-    def generate_response(self, query: str, documents: list):
+    def _prepare(self, documents: list, stats: dict = None):
         """
-        Generates a response based on the query and retrieved/reranked documents using an LLM.
-        If any document lacks a source, returns a message listing the top-k documents.
+        Builds the prompt context from the retrieved/reranked documents.
+        Returns `(context, None)` when the LLM must be called, or `(None, response)` when the
+        response is known without it (no documents, or documents lacking a source).
+        If a `stats` dict is given, it is filled with the context statistics (see ContextBuilder.build).
         """
         if not documents:
-            return "I couldn't find any relevant information in the knowledge base for your query."
+            return None, "I couldn't find any relevant information in the knowledge base for your query."
 
         # Check if all documents have a source
         all_docs_have_source = True
@@ -46,16 +65,64 @@ class Generator:
             for i, doc in enumerate(documents):
                 source_info = doc['metadata'].get('source', 'Source not available')
                 formatted_docs.append(f"Document {i+1} (Source: {source_info}):\nContent: {doc['content']}\n")
-            return "Some sources were not found for the retrieved documents. Here are the top documents:\n\n" + "\n".join(formatted_docs)
+            return None, "Some sources were not found for the retrieved documents. Here are the top documents:\n\n" + "\n".join(formatted_docs)
 
         # If all documents have sources, proceed with LLM generation
-        context = ""
-        for doc in documents:
-            context += f"Source: {doc['metadata'].get('source', 'N/A')}\n"
-            context += f"Content: {doc['content']}\n\n"
-        
+        context, context_stats = self.context_builder.build(documents)
+        CONTEXT_TOKENS_SAVED.inc(context_stats["estimated_tokens_saved"])
+        CONTEXT_TOKENS_DROPPED.inc(context_stats["estimated_tokens_dropped"])
+        if stats is not None:
+            stats.update(context_stats)
+        return context, None
+
+    def generate_response(self, query: str, documents: list, stats: dict = None):
+        """
+        Generates a response based on the query and retrieved/reranked documents using an LLM.
+        If any document lacks a source, returns a message listing the top-k documents.
+        """
+        context, response = self._prepare(documents, stats)
+        if response is not None:
+            return response
+
         try:
-            response = self.chain.invoke({"context": context, "question": query})
+            message = self.llm_chain.invoke({"context": context, "question": query})
+            self._record_usage(message)
+            return self.output_parser.invoke(message)
+        except Exception as e:
+            return f"{GENERATION_ERROR_PREFIX}: {str(e)}"
+
+    async def agenerate_response(self, query: str, documents: list, stats: dict = None):
+        """
+        Async version of generate_response: awaits the LLM through the chain's async interface,
+        so the event loop is free while Ollama generates.
+        """
+        context, response = self._prepare(documents, stats)
+        if response is not None:
             return response
+
+        try:
+            message = await self.llm_chain.ainvoke({"context": context, "question": query})
+            self._record_usage(message)
+            return self.output_parser.invoke(message)
+        except Exception as e:
+            return f"{GENERATION_ERROR_PREFIX}: {str(e)}"
+
+    async def astream_response(self, query: str, documents: list, stats: dict = None):
+        """
+        Streams the response: yields the LLM tokens as they are produced by the chain.
+        Responses that do not need the LLM are yielded in one piece.
+        """
+        context, response = self._prepare(documents, stats)
+        if response is not None:
+            yield response
+            return
+
+        try:
+            async for chunk in self.llm_chain.astream({"context": context, "question": query}):
+                # Ollama reports the token usage with the last chunk
+                self._record_usage(chunk)
+                token = self.output_parser.invoke(chunk)
+                if token:
+                    yield token
         except Exception as e:
-            return f"An error occurred while generating response: {str(e)}"
\ No newline at end of file
+            yield f"{GENERATION_ERROR_PREFIX}: {str(e)}"
@@ -0,0 +1,183 @@
+import os
+import queue
+import threading
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from document_processor import DocumentProcessor
+from metrics import DOCUMENTS_INGESTED
+
+# Files bigger than this are not sent to the process pool (a worker would return all their
+# chunks at once). They are streamed in bounded batches from the main process instead.
+DEFAULT_STREAM_THRESHOLD_BYTES = 256 * 1024 * 1024
+
+# DocumentProcessor instance of each worker process, created once by _init_worker
+_worker_processor = None
+
+
+def _init_worker(chunk_size: int, chunk_overlap: int, off_columns=None):
+    global _worker_processor
+    _worker_processor = DocumentProcessor(chunk_size=chunk_size, chunk_overlap=chunk_overlap,
+                                          off_columns=off_columns)
+
+
+def _load_and_chunk(file_path: str):
+    # Runs in a worker process: loading/parsing (PDF, CSV...) and splitting happen here.
+    return file_path, _worker_processor.load_and_chunk_file(file_path)
+
+
+class IngestionEngine:
+    """
+    Pipelined ingestion: files are loaded and chunked in a process pool while a writer
+    thread embeds and writes the resulting batches to the vector store.
+    Both stages are connected by a bounded queue, so parsing, splitting and embedding
+    run at the same time and a slow embedder applies backpressure to the parsers.
+    """
+
+    def __init__(self, vector_store, num_workers: int = None, batch_size: int = 256,
+                 queue_size: int = 8, chunk_size: int = 1000, chunk_overlap: int = 200,
+                 stream_threshold_bytes: int = DEFAULT_STREAM_THRESHOLD_BYTES, off_columns=None):
+        self.vector_store = vector_store
+        self.num_workers = num_workers or max(1, (os.cpu_count() or 2) - 1)
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.stream_threshold_bytes = stream_threshold_bytes
+        self.off_columns = off_columns
+        self.document_processor = DocumentProcessor(chunk_size=chunk_size, chunk_overlap=chunk_overlap,
+                                                    off_columns=off_columns)
+
+    def ingest_directory(self, directory_path: str) -> int:
+        """
+        Ingests every supported file of a directory. Returns the number of chunks added.
+        """
+        if not os.path.isdir(directory_path):
+            print(f"Directory not found: {directory_path}")
+            return 0
+        chunks, _ = self.ingest_files(list(self.document_processor.iter_supported_files(directory_path)))
+        return chunks
+
+    def ingest_files(self, file_paths):
+        """
+        Ingests a list of files through the parse -> chunk -> embed -> write pipeline.
+        Returns `(chunks_added, ingested_paths)`: files that failed to load are logged and
+        left out of `ingested_paths`.
+        """
+        if not file_paths:
+            return 0, []
+
+        pooled_files = []
+        streamed_files = []
+        for file_path in file_paths:
+            if os.path.getsize(file_path) > self.stream_threshold_bytes:
+                streamed_files.append(file_path)
+            else:
+                pooled_files.append(file_path)
+
+        print(f"Ingesting {len(file_paths)} files with {self.num_workers} workers "
+              f"(batch size: {self.batch_size}, {len(streamed_files)} large files streamed)...")
+        start = time.perf_counter()
+
+        batch_queue = queue.Queue(maxsize=self.queue_size)
+        state = {"chunks": 0, "error": None, "ingested": []}
+        writer = threading.Thread(target=self._writer_loop, args=(batch_queue, state), daemon=True)
+        writer.start()
+
+        try:
+            if pooled_files:
+                self._parse_in_pool(pooled_files, batch_queue, state)
+            for file_path in streamed_files:
+                if state["error"]:
+                    break
+                print(f"Streaming large file: {file_path}")
+                try:
+                    for chunks, _ in self.document_processor.iter_chunk_batches(file_path, self.batch_size):
+                        if not self._put(batch_queue, chunks, state):
+                            break
+                except Exception as e:
+                    print(f"Failed to load and chunk file {file_path}: {e}")
+                    continue
+                state["ingested"].append(file_path)
+                DOCUMENTS_INGESTED.inc()
+        finally:
+            # Sentinel: the writer flushes what is left and stops
+            self._put(batch_queue, None, state)
+            writer.join()
+
+        if state["error"]:
+            raise RuntimeError(f"Ingestion failed while writing to the vector store: {state['error']}")
+
+        elapsed = time.perf_counter() - start
+        print(f"Ingested {state['chunks']} chunks from {len(file_paths)} files in {elapsed:.1f}s "
+              f"({state['chunks'] / max(elapsed, 1e-9):.1f} chunks/s).")
+        return state["chunks"], state["ingested"]
+
+    def _parse_in_pool(self, file_paths, batch_queue, state):
+        # 'spawn' avoids forking a parent that already holds model threads and DB connections
+        context = multiprocessing.get_context("spawn")
+        max_pending = self.num_workers * 2
+        files = iter(file_paths)
+        with ProcessPoolExecutor(max_workers=self.num_workers, mp_context=context,
+                                 initializer=_init_worker,
+                                 initargs=(self.chunk_size, self.chunk_overlap, self.off_columns)) as pool:
+            # future -> path of the file it loads
+            pending = {}
+            for file_path in files:
+                pending[pool.submit(_load_and_chunk, file_path)] = file_path
+                if len(pending) >= max_pending:
+                    break
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    file_path = pending.pop(future)
+                    try:
+                        _, chunks = future.result()
+                    except Exception as e:
+                        print(f"Failed to load and chunk file {file_path}: {e}")
+                        chunks = []
+                    else:
+                        print(f"Loaded and chunked file: {file_path} ({len(chunks)} chunks)")
+                        state["ingested"].append(file_path)
+                        DOCUMENTS_INGESTED.inc()
+
+                    for i in range(0, len(chunks), self.batch_size):
+                        if not self._put(batch_queue, chunks[i:i + self.batch_size], state):
+                            break
+
+                    # Keep at most `max_pending` files in flight to bound memory
+                    next_file = next(files, None)
+                    if next_file is not None and not state["error"]:
+                        pending[pool.submit(_load_and_chunk, next_file)] = next_file
+
+                if state["error"]:
+                    for future in pending:
+                        future.cancel()
+                    break
+
+    def _put(self, batch_queue, item, state) -> bool:
+        # Blocks while the queue is full, unless the writer died (nobody would drain it)
+        while True:
+            if state["error"] and item is not None:
+                return False
+            try:
+                batch_queue.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                if state["error"]:
+                    return False
+
+    def _writer_loop(self, batch_queue, state):
+        while True:
+            chunks = batch_queue.get()
+            if chunks is None:
+                return
+            if state["error"]:
+                continue
+            try:
+                # Embeds and writes with the md5 content ids computed by VectorStore.add_documents
+                self.vector_store.add_documents(chunks)
+                state["chunks"] += len(chunks)
+            except Exception as e:
+                state["error"] = e
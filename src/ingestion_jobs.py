@@ -0,0 +1,290 @@
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from typing import BinaryIO, List, Tuple
+
+
+class JobQueueFullError(Exception):
+    """
+    Raised by IngestionJobManager.submit when `max_queued_jobs` jobs are already waiting.
+    """
+
+
+class IngestionJobManager:
+    """
+    Background ingestion jobs. Uploaded files are stored under `files_dir/<job_id>/` and the
+    jobs in SQLite, which is also the queue: a bounded pool of worker threads claims queued
+    jobs and streams their files into the vector store (RAGPipeline.ingest_file_streaming),
+    recording progress (rows read, chunks embedded) and errors per file. Chunks are cited by
+    the original file name (their 'source'), not by the temporary path of the upload, and a
+    new upload of the same name replaces the chunks of the previous one.
+    Jobs survive a restart: running jobs are queued again by start(), and files already
+    ingested are skipped (their chunks are content-addressed, so a partly ingested file is
+    simply written again, with the embeddings served by the embedding cache).
+    """
+
+    def __init__(self, pipeline, db_path: str, files_dir: str, num_workers: int = 1,
+                 max_queued_jobs: int = 32, poll_interval: float = 1.0):
+        self.pipeline = pipeline
+        self.db_path = db_path
+        self.files_dir = files_dir
+        self.num_workers = num_workers
+        self.max_queued_jobs = max_queued_jobs
+        self.poll_interval = poll_interval
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._workers = []
+
+        os.makedirs(files_dir, exist_ok=True)
+        # SQLite connection of each process, opened on first use (see _conn)
+        self._connections = {}
+        self._connect_lock = threading.Lock()
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        # serve.py creates the manager (import of api.main) before forking its workers, and a
+        # SQLite connection must never be used across fork(): each process opens its own.
+        # A connection inherited from the parent is kept as is: closing it could release the
+        # parent's locks.
+        pid = os.getpid()
+        conn = self._connections.get(pid)
+        if conn is None:
+            with self._connect_lock:
+                conn = self._connections.get(pid)
+                if conn is None:
+                    conn = self._connections[pid] = self._connect()
+        return conn
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " job_id TEXT PRIMARY KEY, status TEXT NOT NULL, created_at REAL NOT NULL,"
+            " started_at REAL, finished_at REAL, files_total INTEGER NOT NULL,"
+            " files_done INTEGER NOT NULL DEFAULT 0, files_failed INTEGER NOT NULL DEFAULT 0,"
+            " rows_read INTEGER NOT NULL DEFAULT 0, chunks_embedded INTEGER NOT NULL DEFAULT 0)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS job_files ("
+            " job_id TEXT NOT NULL, position INTEGER NOT NULL, file_name TEXT NOT NULL,"
+            " file_path TEXT NOT NULL, status TEXT NOT NULL, rows_read INTEGER NOT NULL DEFAULT 0,"
+            " chunks INTEGER NOT NULL DEFAULT 0, error TEXT, PRIMARY KEY (job_id, position))"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at)")
+        conn.commit()
+        return conn
+
+    def start(self, resume: bool = True):
+        """
+        Starts the worker threads. With `resume`, jobs left running by a previous process are
+        queued again (only one process must run the workers of a given job store).
+        """
+        if resume:
+            with self._lock, self._conn:
+                resumed = self._conn.execute(
+                    "UPDATE jobs SET status = 'queued' WHERE status = 'running'").rowcount
+                self._conn.execute("UPDATE job_files SET status = 'queued' WHERE status = 'running'")
+            if resumed:
+                print(f"Resuming {resumed} interrupted ingestion jobs.")
+        self._stopping.clear()
+        for i in range(self.num_workers):
+            worker = threading.Thread(target=self._worker_loop, name=f"rag-ingest-job-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def stop(self, timeout: float = None):
+        # The file being ingested is finished first; remaining jobs stay queued for the next start
+        self._stopping.set()
+        self._wakeup.set()
+        for worker in self._workers:
+            worker.join(timeout)
+        self._workers = []
+
+    def submit(self, files: List[Tuple[str, BinaryIO]]) -> dict:
+        """
+        Stores the uploaded files `(file_name, file_object)` and queues a job to ingest them.
+        Returns the job. Raises JobQueueFullError when too many jobs are already queued.
+        """
+        if not files:
+            raise ValueError("No files to ingest.")
+        # Early rejection, before copying the files (the check that counts is at the insert)
+        if self.queued_jobs() >= self.max_queued_jobs:
+            raise JobQueueFullError(f"Too many ingestion jobs queued (max {self.max_queued_jobs}).")
+
+        job_id = uuid.uuid4().hex
+        job_dir = os.path.join(self.files_dir, job_id)
+        os.makedirs(job_dir)
+        rows = []
+        try:
+            for position, (file_name, file_object) in enumerate(files):
+                # Only the base name: the client controls file_name
+                file_name = os.path.basename(file_name or "") or f"file_{position}"
+                file_path = os.path.join(job_dir, f"{position}_{file_name}")
+                with open(file_path, "wb") as buffer:
+                    shutil.copyfileobj(file_object, buffer)
+                rows.append((job_id, position, file_name, file_path, "queued"))
+        except Exception:
+            shutil.rmtree(job_dir, ignore_errors=True)
+            raise
+
+        try:
+            # Count and insert in one write transaction: concurrent uploads (threads, or the
+            # processes of serve.py) cannot all pass the check and overfill the queue
+            with self._lock, self._conn:
+                self._conn.execute("BEGIN IMMEDIATE")
+                queued = self._conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+                if queued >= self.max_queued_jobs:
+                    raise JobQueueFullError(f"Too many ingestion jobs queued (max {self.max_queued_jobs}).")
+                self._conn.execute("INSERT INTO jobs (job_id, status, created_at, files_total) VALUES (?, 'queued', ?, ?)",
+                                   (job_id, time.time(), len(rows)))
+                self._conn.executemany(
+                    "INSERT INTO job_files (job_id, position, file_name, file_path, status) VALUES (?, ?, ?, ?, ?)",
+                    rows)
+        except Exception:
+            shutil.rmtree(job_dir, ignore_errors=True)
+            raise
+        self._wakeup.set()
+        return self.get_job(job_id)
+
+    def get_job(self, job_id: str):
+        """
+        Returns the job (status, progress, throughput, per-file status and errors) or None.
+        """
+        with self._lock:
+            job = self._conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if job is None:
+                return None
+            files = self._conn.execute(
+                "SELECT file_name, status, rows_read, chunks, error FROM job_files WHERE job_id = ? ORDER BY position",
+                (job_id,)).fetchall()
+        return dict(self._job_dict(job), files=[dict(row) for row in files])
+
+    def list_jobs(self, limit: int = 50, status: str = None) -> list:
+        """
+        Most recent jobs first (without the per-file details).
+        """
+        query = "SELECT * FROM jobs"
+        params = []
+        if status:
+            query += " WHERE status = ?"
+            params.append(status)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            return [self._job_dict(job) for job in self._conn.execute(query, params).fetchall()]
+
+    def queued_jobs(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        return {"workers": len(self._workers), "max_queued_jobs": self.max_queued_jobs, **counts}
+
+    @staticmethod
+    def _job_dict(job) -> dict:
+        job = dict(job)
+        if job["started_at"]:
+            elapsed = (job["finished_at"] or time.time()) - job["started_at"]
+            job["chunks_per_second"] = round(job["chunks_embedded"] / elapsed, 1) if elapsed > 0 else None
+        else:
+            job["chunks_per_second"] = None
+        return job
+
+    def _claim_next(self):
+        # Oldest queued job; the status check makes the claim atomic between workers
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT job_id FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1").fetchone()
+            if row is None:
+                return None
+            claimed = self._conn.execute(
+                "UPDATE jobs SET status = 'running', started_at = COALESCE(started_at, ?)"
+                " WHERE job_id = ? AND status = 'queued'", (time.time(), row["job_id"])).rowcount
+            return row["job_id"] if claimed else None
+
+    def _worker_loop(self):
+        while not self._stopping.is_set():
+            job_id = self._claim_next()
+            if job_id is None:
+                # Woken up by submit(), or polls the store (jobs queued by another process)
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+            try:
+                self._run_job(job_id)
+            except Exception as e:
+                print(f"Ingestion job {job_id} crashed: {e}")
+                self._execute("UPDATE jobs SET status = 'failed', finished_at = ? WHERE job_id = ?",
+                              (time.time(), job_id))
+
+    def _run_job(self, job_id: str):
+        with self._lock:
+            files = self._conn.execute(
+                "SELECT position, file_name, file_path FROM job_files WHERE job_id = ? AND status = 'queued'"
+                " ORDER BY position", (job_id,)).fetchall()
+            # Progress of the files already ingested before a restart
+            done_rows, done_chunks = self._conn.execute(
+                "SELECT COALESCE(SUM(rows_read), 0), COALESCE(SUM(chunks), 0) FROM job_files"
+                " WHERE job_id = ? AND status = 'done'", (job_id,)).fetchone()
+        self._execute("UPDATE jobs SET rows_read = ?, chunks_embedded = ? WHERE job_id = ?",
+                      (done_rows, done_chunks, job_id))
+        print(f"Running ingestion job {job_id} ({len(files)} files).")
+
+        for position, file_name, file_path in files:
+            if self._stopping.is_set():
+                # Back to the queue, the remaining files are ingested after the restart
+                self._execute("UPDATE jobs SET status = 'queued' WHERE job_id = ?", (job_id,))
+                return
+            self._execute("UPDATE job_files SET status = 'running' WHERE job_id = ? AND position = ?",
+                          (job_id, position))
+
+            def on_progress(rows_read, chunks):
+                self._execute("UPDATE jobs SET rows_read = ?, chunks_embedded = ? WHERE job_id = ?",
+                              (done_rows + rows_read, done_chunks + chunks, job_id))
+                self._execute("UPDATE job_files SET rows_read = ?, chunks = ? WHERE job_id = ? AND position = ?",
+                              (rows_read, chunks, job_id, position))
+
+            try:
+                chunks = self.pipeline.ingest_file_streaming(file_path, progress_callback=on_progress,
+                                                             source=file_name)
+            except Exception as e:
+                print(f"Ingestion job {job_id}: failed to ingest '{file_name}': {e}")
+                self._execute("UPDATE job_files SET status = 'failed', error = ? WHERE job_id = ? AND position = ?",
+                              (str(e), job_id, position))
+                self._execute("UPDATE jobs SET files_failed = files_failed + 1 WHERE job_id = ?", (job_id,))
+            else:
+                error = None if chunks else "No chunks extracted (unsupported or empty file)."
+                self._execute("UPDATE job_files SET status = ?, chunks = ?, error = ? WHERE job_id = ? AND position = ?",
+                              ("done" if chunks else "failed", chunks, error, job_id, position))
+                column = "files_done" if chunks else "files_failed"
+                self._execute(f"UPDATE jobs SET {column} = {column} + 1 WHERE job_id = ?", (job_id,))
+            # The next file's progress is counted on top of this one
+            done_rows, done_chunks = self._execute(
+                "SELECT rows_read, chunks_embedded FROM jobs WHERE job_id = ?", (job_id,), fetch=True)
+            if os.path.exists(file_path):
+                os.remove(file_path)
+
+        job = self.get_job(job_id)
+        if job["files_failed"] == 0:
+            status = "completed"
+        elif job["files_done"] == 0:
+            status = "failed"
+        else:
+            status = "completed_with_errors"
+        self._execute("UPDATE jobs SET status = ?, finished_at = ? WHERE job_id = ?", (status, time.time(), job_id))
+        shutil.rmtree(os.path.join(self.files_dir, job_id), ignore_errors=True)
+        print(f"Ingestion job {job_id} {status}: {job['chunks_embedded']} chunks from {job['files_done']} files.")
+
+    def _execute(self, query: str, params: tuple, fetch: bool = False):
+        with self._lock, self._conn:
+            cursor = self._conn.execute(query, params)
+            return tuple(cursor.fetchone()) if fetch else None
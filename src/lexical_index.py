@@ -0,0 +1,161 @@
+import math
+import re
+import sqlite3
+import threading
+from collections import Counter
+from typing import List, Tuple
+
+# SQLite limits the number of '?' placeholders per statement
+_SQL_BATCH = 500
+
+_TOKEN = re.compile(r"\w+")
+STOPWORDS = frozenset(
+    "a an and are as at be by does for from has have how i in is it its of on or that the this "
+    "to was what which who why with without contain contains".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    # Lowercased words and numbers (barcodes, quantities...), without stopwords
+    return [token for token in _TOKEN.findall(text.lower()) if token not in STOPWORDS]
+
+
+class LexicalIndex:
+    """
+    Persistent BM25 inverted index (SQLite) of the chunks of the vector store, kept in sync by
+    VectorStore.add_documents and VectorStore._delete_ids. Exact product names, brands or
+    barcodes, which dense embeddings match poorly, are found by their terms.
+    Documents are keyed by the vector store ids (md5 of the content): a known id is never
+    indexed twice.
+    """
+
+    def __init__(self, index_path: str, k1: float = 1.2, b: float = 0.75, max_postings: int = 50000):
+        self.index_path = index_path
+        self.k1 = k1
+        self.b = b
+        # Terms matching more documents than this are skipped at query time: their idf is close
+        # to zero and reading their postings would dominate the search time
+        self.max_postings = max_postings
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(index_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS docs (doc_id TEXT PRIMARY KEY, length INTEGER NOT NULL)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS postings ("
+            " term TEXT NOT NULL, doc_id TEXT NOT NULL, tf INTEGER NOT NULL,"
+            " PRIMARY KEY (term, doc_id)) WITHOUT ROWID"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_postings_doc_id ON postings (doc_id)")
+        # Collection statistics of BM25 (number of documents, total length), updated incrementally
+        self._conn.execute("CREATE TABLE IF NOT EXISTS stats (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        self._conn.execute("INSERT OR IGNORE INTO stats VALUES ('documents', 0), ('total_length', 0)")
+        self._conn.commit()
+
+    def add(self, ids: List[str], texts: List[str]) -> int:
+        """
+        Indexes the documents whose id is not indexed yet. Returns the number indexed.
+        """
+        with self._lock:
+            known = self._known_ids(ids)
+            new_docs = {doc_id: text for doc_id, text in zip(ids, texts) if doc_id not in known}
+            if not new_docs:
+                return 0
+
+            doc_rows = []
+            posting_rows = []
+            for doc_id, text in new_docs.items():
+                terms = tokenize(text)
+                doc_rows.append((doc_id, len(terms)))
+                posting_rows.extend((term, doc_id, tf) for term, tf in Counter(terms).items())
+
+            with self._conn:
+                self._conn.executemany("INSERT INTO docs VALUES (?, ?)", doc_rows)
+                self._conn.executemany("INSERT INTO postings VALUES (?, ?, ?)", posting_rows)
+                self._update_stats(len(doc_rows), sum(length for _, length in doc_rows))
+            return len(doc_rows)
+
+    def delete(self, ids: List[str]) -> int:
+        """
+        Removes documents from the index. Returns the number removed.
+        """
+        removed = 0
+        with self._lock, self._conn:
+            for i in range(0, len(ids), _SQL_BATCH):
+                batch = ids[i:i + _SQL_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                documents, total_length = self._conn.execute(
+                    f"SELECT COUNT(*), COALESCE(SUM(length), 0) FROM docs WHERE doc_id IN ({placeholders})",
+                    batch).fetchone()
+                self._conn.execute(f"DELETE FROM postings WHERE doc_id IN ({placeholders})", batch)
+                self._conn.execute(f"DELETE FROM docs WHERE doc_id IN ({placeholders})", batch)
+                self._update_stats(-documents, -total_length)
+                removed += documents
+        return removed
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[str, float]]:
+        """
+        Returns the k best `(doc_id, bm25 score)` for the query, best first.
+        """
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+
+        with self._lock:
+            documents, total_length = self._stats()
+            if not documents:
+                return []
+            avg_length = total_length / documents
+            scores = {}
+            for term in terms:
+                df = self._conn.execute("SELECT COUNT(*) FROM postings WHERE term = ?", (term,)).fetchone()[0]
+                if not df or df > self.max_postings:
+                    continue
+                idf = math.log(1 + (documents - df + 0.5) / (df + 0.5))
+                rows = self._conn.execute(
+                    "SELECT p.doc_id, p.tf, d.length FROM postings p JOIN docs d ON d.doc_id = p.doc_id"
+                    " WHERE p.term = ?", (term,))
+                for doc_id, tf, length in rows:
+                    norm = tf + self.k1 * (1 - self.b + self.b * length / avg_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / norm
+
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+    def page_ids(self, after: str = None, limit: int = 1000) -> List[str]:
+        """
+        Indexed ids greater than `after` (all from the start if None), in id order.
+        """
+        with self._lock:
+            if after is None:
+                rows = self._conn.execute("SELECT doc_id FROM docs ORDER BY doc_id LIMIT ?", (limit,))
+            else:
+                rows = self._conn.execute("SELECT doc_id FROM docs WHERE doc_id > ? ORDER BY doc_id LIMIT ?",
+                                          (after, limit))
+            return [row[0] for row in rows]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._stats()[0]
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM postings")
+            self._conn.execute("DELETE FROM docs")
+            self._conn.execute("UPDATE stats SET value = 0")
+
+    def _known_ids(self, ids: List[str]) -> set:
+        known = set()
+        for i in range(0, len(ids), _SQL_BATCH):
+            batch = ids[i:i + _SQL_BATCH]
+            rows = self._conn.execute(
+                f"SELECT doc_id FROM docs WHERE doc_id IN ({','.join('?' * len(batch))})", batch)
+            known.update(row[0] for row in rows)
+        return known
+
+    def _stats(self):
+        values = dict(self._conn.execute("SELECT key, value FROM stats"))
+        return values["documents"], values["total_length"]
+
+    def _update_stats(self, documents: int, total_length: int):
+        self._conn.execute("UPDATE stats SET value = value + ? WHERE key = 'documents'", (documents,))
+        self._conn.execute("UPDATE stats SET value = value + ? WHERE key = 'total_length'", (total_length,))
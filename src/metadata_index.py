@@ -0,0 +1,193 @@
+import base64
+import binascii
+import sqlite3
+import threading
+from collections import Counter
+from typing import List
+
+# SQLite limits the number of '?' placeholders per statement
+_SQL_BATCH = 500
+
+
+def encode_cursor(doc_id: str) -> str:
+    # Opaque for the callers: the id of the last record of the page
+    return base64.urlsafe_b64encode(doc_id.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> str:
+    """
+    Returns the id encoded in a cursor of encode_cursor. Raises ValueError on anything else.
+    """
+    try:
+        doc_id = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+    except (UnicodeError, binascii.Error, ValueError):
+        doc_id = ""
+    if not doc_id:
+        raise ValueError(f"Invalid cursor '{cursor}'.")
+    return doc_id
+
+
+class MetadataIndex:
+    """
+    Catalog (SQLite) of the ids of the vector store with their filterable metadata fields,
+    kept in sync by VectorStore.upsert_embeddings and VectorStore._delete_ids.
+    Records are ordered by id: a page starts after the last id of the previous one (keyset
+    pagination), so a page costs one index seek whatever its position, and concurrent writes
+    or deletes never make a scan skip or repeat the records that were already there.
+    The number of documents of each (field, value) is kept in an aggregate table, updated
+    with every write: a facet count is one lookup.
+    """
+
+    def __init__(self, index_path: str, fields):
+        self.index_path = index_path
+        self.fields = tuple(fields)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(index_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        columns = "".join(f", {field} TEXT" for field in self.fields)
+        self._conn.execute(f"CREATE TABLE IF NOT EXISTS docs (doc_id TEXT PRIMARY KEY{columns}) WITHOUT ROWID")
+        for field in self.fields:
+            # Counts of several filters combined (COUNT over the most selective index)
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_docs_{field} ON docs ({field})")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS facets ("
+            " field TEXT NOT NULL, value TEXT NOT NULL, count INTEGER NOT NULL,"
+            " PRIMARY KEY (field, value)) WITHOUT ROWID"
+        )
+        if not self._conn.execute("SELECT 1 FROM facets LIMIT 1").fetchone():
+            # Index written before the aggregate existed (no-op on an empty index)
+            self._rebuild_facets()
+        self._conn.commit()
+
+    def add(self, ids: List[str], metadatas: List[dict], merge: bool = False):
+        """
+        Records (or overwrites) the filterable fields of the documents. With `merge`, the fields
+        missing from the new metadata of a known document keep their value (Chroma's upsert
+        merges the metadata keys).
+        """
+        rows = [
+            (doc_id, *(self._value(metadata, field) for field in self.fields))
+            for doc_id, metadata in zip(ids, metadatas)
+        ]
+        placeholders = ",".join("?" * (len(self.fields) + 1))
+        with self._lock, self._conn:
+            previous = self._rows(ids)
+            if merge and previous:
+                known = {row[0]: row for row in previous}
+                rows = [
+                    tuple(new if new is not None else old for new, old in zip(row, known[row[0]]))
+                    if row[0] in known else row
+                    for row in rows
+                ]
+            # Overwritten documents no longer count for their previous values
+            changes = self._facet_counts(previous, -1)
+            changes.update(self._facet_counts(rows, 1))
+            self._conn.executemany(f"INSERT OR REPLACE INTO docs VALUES ({placeholders})", rows)
+            self._update_facets(changes)
+
+    def delete(self, ids: List[str]):
+        with self._lock, self._conn:
+            self._update_facets(self._facet_counts(self._rows(ids), -1))
+            for i in range(0, len(ids), _SQL_BATCH):
+                batch = ids[i:i + _SQL_BATCH]
+                self._conn.execute(f"DELETE FROM docs WHERE doc_id IN ({','.join('?' * len(batch))})", batch)
+
+    def page_ids(self, after: str = None, limit: int = 1000, where: dict = None) -> List[str]:
+        """
+        Ids greater than `after` (all from the start if None) matching `where`, in id order.
+        """
+        conditions, params = [], []
+        if after is not None:
+            conditions.append("doc_id > ?")
+            params.append(after)
+        if where:
+            sql, where_params = self._where_sql(where)
+            conditions.append(sql)
+            params.extend(where_params)
+        query = "SELECT doc_id FROM docs"
+        if conditions:
+            query += " WHERE " + " AND ".join(f"({condition})" for condition in conditions)
+        query += " ORDER BY doc_id LIMIT ?"
+        with self._lock:
+            return [row[0] for row in self._conn.execute(query, params + [limit])]
+
+    def count(self, where: dict = None) -> int:
+        """
+        Number of documents matching `where` (all without it), counted on the field indexes.
+        """
+        query, params = "SELECT COUNT(*) FROM docs", []
+        if where:
+            sql, params = self._where_sql(where)
+            query += f" WHERE {sql}"
+        with self._lock:
+            return self._conn.execute(query, params).fetchone()[0]
+
+    def value_count(self, field: str, value: str) -> int:
+        """
+        Number of documents whose `field` is `value`, read from the aggregate table.
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT count FROM facets WHERE field = ? AND value = ?",
+                                     (field, value)).fetchone()
+        return row[0] if row else 0
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM docs")
+            self._conn.execute("DELETE FROM facets")
+
+    def _rows(self, ids: List[str]) -> list:
+        # Current rows of the known ids among `ids`
+        rows = []
+        for i in range(0, len(ids), _SQL_BATCH):
+            batch = ids[i:i + _SQL_BATCH]
+            rows.extend(self._conn.execute(
+                f"SELECT * FROM docs WHERE doc_id IN ({','.join('?' * len(batch))})", batch))
+        return rows
+
+    def _facet_counts(self, rows, sign: int) -> Counter:
+        counts = Counter()
+        for row in rows:
+            for field, value in zip(self.fields, row[1:]):
+                if value is not None:
+                    counts[(field, value)] += sign
+        return counts
+
+    def _update_facets(self, changes: Counter):
+        self._conn.executemany(
+            "INSERT INTO facets VALUES (?, ?, ?)"
+            " ON CONFLICT (field, value) DO UPDATE SET count = count + excluded.count",
+            [(field, value, change) for (field, value), change in changes.items() if change])
+        self._conn.executemany("DELETE FROM facets WHERE field = ? AND value = ? AND count <= 0",
+                               [key for key, change in changes.items() if change < 0])
+
+    def _rebuild_facets(self):
+        self._conn.execute("DELETE FROM facets")
+        for field in self.fields:
+            self._conn.execute(f"INSERT INTO facets SELECT ?, {field}, COUNT(*) FROM docs"
+                               f" WHERE {field} IS NOT NULL GROUP BY {field}", (field,))
+
+    @staticmethod
+    def _value(metadata: dict, field: str):
+        value = (metadata or {}).get(field)
+        return None if value is None else str(value)
+
+    def _where_sql(self, where: dict):
+        # Clauses written by build_where: {field: {"$eq": v}}, {field: {"$in": [...]}} and "$and"
+        if len(where) != 1:
+            return self._where_sql({"$and": [{field: condition} for field, condition in where.items()]})
+        (field, condition), = where.items()
+        if field == "$and":
+            parts = [self._where_sql(clause) for clause in condition]
+            return " AND ".join(f"({sql})" for sql, _ in parts), [param for _, params in parts for param in params]
+        if field not in self.fields:
+            raise ValueError(f"Field '{field}' is not in the metadata index.")
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        (operator, value), = condition.items()
+        if operator == "$eq":
+            return f"{field} = ?", [str(value)]
+        if operator == "$in":
+            return f"{field} IN ({','.join('?' * len(value))})", [str(v) for v in value]
+        raise ValueError(f"Unsupported where operator '{operator}' for the metadata index.")
@@ -0,0 +1,194 @@
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+# Latency buckets (seconds), from a cached answer to a long Ollama generation
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _format_labels(label_names, label_values) -> str:
+    if not label_names:
+        return ""
+    pairs = []
+    for name, value in zip(label_names, label_values):
+        if isinstance(value, bool):
+            value = "true" if value else "false"
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(labels.get(name, "") for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.label_names, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, label_names=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [bucket counts, sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels.get(name, "") for name in self.label_names)
+        with self._lock:
+            series = self._series.setdefault(key, [[0] * len(self.buckets), 0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (bucket_counts, total, count) in sorted(self._series.items()):
+                for bound, bucket_count in zip(self.buckets, bucket_counts):
+                    labels = _format_labels(self.label_names + ("le",), key + (bound,))
+                    lines.append(f"{self.name}_bucket{labels} {bucket_count}")
+                labels = _format_labels(self.label_names + ("le",), key + ("+Inf",))
+                lines.append(f"{self.name}_bucket{labels} {count}")
+                labels = _format_labels(self.label_names, key)
+                lines.append(f"{self.name}_sum{labels} {total}")
+                lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Minimal Prometheus-style registry (counters and histograms) rendered in the text
+    exposition format.
+    """
+
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name: str, documentation: str, label_names=()) -> Counter:
+        metric = Counter(name, documentation, label_names)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, label_names=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, documentation, label_names, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self, gauges: dict = None) -> str:
+        """
+        Renders all the metrics, plus `gauges`: a nested dict of values read at scrape time
+        (e.g. RAGPipeline.get_stats()), flattened into `rag_<path>` gauges.
+        """
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for name, value in sorted(_flatten("rag", gauges or {}).items()):
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _flatten(prefix: str, values: dict) -> dict:
+    flat = {}
+    for key, value in values.items():
+        name = f"{prefix}_{key}"
+        if isinstance(value, dict):
+            flat.update(_flatten(name, value))
+        elif isinstance(value, bool):
+            flat[name] = int(value)
+        elif isinstance(value, (int, float)):
+            flat[name] = value
+    return flat
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_LATENCY = REGISTRY.histogram(
+    "rag_stage_latency_seconds", "Latency of each pipeline stage.", label_names=("stage",))
+QUERIES = REGISTRY.counter(
+    "rag_queries_total", "Queries processed, by kind (single, stream, batch) and cache outcome.",
+    label_names=("kind", "cached"))
+DOCUMENTS_INGESTED = REGISTRY.counter(
+    "rag_documents_ingested_total", "Files ingested into the vector store.")
+CHUNKS_INGESTED = REGISTRY.counter(
+    "rag_chunks_ingested_total", "Chunks embedded and written to the vector store.")
+PROMPT_TOKENS = REGISTRY.counter(
+    "rag_prompt_tokens_total", "Prompt tokens sent to the LLM (as reported by Ollama).")
+GENERATED_TOKENS = REGISTRY.counter(
+    "rag_generated_tokens_total", "Tokens generated by the LLM (as reported by Ollama).")
+CONTEXT_TOKENS_SAVED = REGISTRY.counter(
+    "rag_context_tokens_saved_total", "Estimated prompt tokens saved by merging and deduplicating chunks.")
+CONTEXT_TOKENS_DROPPED = REGISTRY.counter(
+    "rag_context_tokens_dropped_total", "Estimated tokens of merged passages cut by the context token budget.")
+
+
+class Trace:
+    """
+    Per-request timing breakdown: seconds spent in each stage.
+    """
+
+    def __init__(self):
+        self.timings = {}
+
+    def add(self, stage: str, seconds: float):
+        self.timings[stage] = round(self.timings.get(stage, 0.0) + seconds, 6)
+
+
+_current_trace = contextvars.ContextVar("rag_trace", default=None)
+
+
+@contextmanager
+def trace():
+    """
+    Starts a request trace: spans opened in this context (including executor threads started
+    with run_in_executor below) are added to it.
+    """
+    request_trace = Trace()
+    token = _current_trace.set(request_trace)
+    start = time.perf_counter()
+    try:
+        yield request_trace
+    finally:
+        request_trace.add("total", time.perf_counter() - start)
+        _current_trace.reset(token)
+
+
+@contextmanager
+def span(stage: str):
+    """
+    Times a stage: feeds the latency histogram and the current request trace, if any.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_LATENCY.observe(elapsed, stage=stage)
+        request_trace = _current_trace.get()
+        if request_trace is not None:
+            request_trace.add(stage, elapsed)
+
+
+def run_in_executor(loop, executor, func, *args):
+    # loop.run_in_executor does not propagate context variables: the trace would be lost
+    context = contextvars.copy_context()
+    return loop.run_in_executor(executor, context.run, func, *args)
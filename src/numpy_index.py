@@ -0,0 +1,420 @@
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from typing import Iterable, List
+
+import numpy as np
+from langchain_core.documents import Document as LangchainDocument
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore as LangchainVectorStore
+
+NUMPY_DTYPES = ("float32", "float16")
+
+# SQLite limits the number of '?' placeholders per statement
+_SQL_BATCH = 500
+# Rows scored per matrix product: bounds the float32 copy of float16 rows and the score buffer
+_SEARCH_BLOCK_ROWS = 65536
+# The vectors file grows by at least this many rows (and at least doubles)
+_MIN_GROWTH_ROWS = 4096
+
+_COMPARISONS = {"$eq": "=", "$ne": "!=", "$gt": ">", "$gte": ">=", "$lt": "<", "$lte": "<="}
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _where_sql(where: dict):
+    """
+    Translates a Chroma `where` clause ($eq, $ne, $gt, $gte, $lt, $lte, $in, $nin, $and, $or,
+    or {field: value}) into a SQL condition on docs.row. Returns `(sql, params)`.
+    """
+    if len(where) != 1:
+        # Chroma semantics: several fields in one dict must all match
+        return _where_sql({"$and": [{field: condition} for field, condition in where.items()]})
+    (field, condition), = where.items()
+    if field in ("$and", "$or"):
+        parts = [_where_sql(clause) for clause in condition]
+        sql = f" {field[1:].upper()} ".join(f"({part})" for part, _ in parts)
+        return sql, [param for _, params in parts for param in params]
+
+    if not isinstance(condition, dict):
+        condition = {"$eq": condition}
+    (operator, value), = condition.items()
+    subquery = "SELECT row FROM doc_metadata WHERE key = ? AND value {}"
+    if operator in ("$in", "$nin"):
+        placeholders = ",".join("?" * len(value))
+        sql = f"row {'NOT IN' if operator == '$nin' else 'IN'} ({subquery.format(f'IN ({placeholders})')})"
+        return sql, [field, *value]
+    if operator == "$ne":
+        return f"row NOT IN ({subquery.format('= ?')})", [field, value]
+    if operator not in _COMPARISONS:
+        raise ValueError(f"Unsupported where operator '{operator}'.")
+    return f"row IN ({subquery.format(_COMPARISONS[operator] + ' ?')})", [field, value]
+
+
+class NumpyIndex:
+    """
+    Exact vector index kept in a memory-mapped matrix of normalized embeddings (float32 or
+    float16), with ids, documents and metadata in SQLite. Implements the part of the Chroma
+    collection API used by VectorStore (upsert, query, get, delete, count), so it can replace
+    Chroma for a read-heavy, mostly static corpus: a query is one matrix product and an
+    argpartition, and processes opening the same directory share the pages of the matrix.
+    Deleted rows are tombstones until compact(). Similarity is cosine (reported as the L2
+    distance between normalized vectors, like Chroma's default space).
+    Writes may come from one process at a time; readers in other processes pick them up
+    through the `generation` counter.
+    """
+
+    def __init__(self, directory: str, dtype: str = "float32"):
+        if dtype not in NUMPY_DTYPES:
+            raise ValueError(f"Unknown dtype '{dtype}' (expected one of: {', '.join(NUMPY_DTYPES)}).")
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.metadata = {"backend": "numpy", "space": "cosine"}
+
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(os.path.join(directory, "numpy_index.sqlite3"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS docs ("
+            " row INTEGER PRIMARY KEY, doc_id TEXT NOT NULL UNIQUE, document TEXT, metadata TEXT)"
+        )
+        # Metadata values keep their type (str, int, float, bool), as in Chroma filters
+        self._conn.execute("CREATE TABLE IF NOT EXISTS doc_metadata (row INTEGER NOT NULL, key TEXT NOT NULL, value)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_doc_metadata_key_value ON doc_metadata (key, value)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_doc_metadata_row ON doc_metadata (row)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS info (key TEXT PRIMARY KEY, value)")
+        # The dtype of an existing index wins over the argument
+        self._conn.execute("INSERT OR IGNORE INTO info VALUES ('dtype', ?), ('dimension', 0), ('rows', 0), "
+                           "('generation', 0)", (dtype,))
+        self._conn.commit()
+
+        self.dtype = self._info("dtype")
+        self.vectors_path = os.path.join(directory, f"vectors.{self.dtype}")
+        self._generation = None
+        self._matrix = None
+        self._live = np.zeros(0, dtype=bool)
+        self._count = 0
+        self._refresh()
+
+    # --- State shared with other processes ---
+
+    def _info(self, key: str):
+        return self._conn.execute("SELECT value FROM info WHERE key = ?", (key,)).fetchone()[0]
+
+    def _refresh(self):
+        # Reloads the row mask and remaps the matrix if another process wrote to the index
+        with self._lock:
+            generation = self._info("generation")
+            if generation == self._generation:
+                return
+            self.dimension = self._info("dimension")
+            self._rows = self._info("rows")
+            # Remapped from scratch: compact() may have replaced the file
+            self._matrix = None
+            self._map(self._rows)
+            live = np.zeros(self._capacity, dtype=bool)
+            rows = np.fromiter((row for row, in self._conn.execute("SELECT row FROM docs")), dtype=np.int64)
+            live[rows] = True
+            self._live = live
+            self._count = len(rows)
+            self._generation = generation
+
+    def _map(self, rows: int):
+        # (Re)maps the vectors file, growing it (sparse) to hold at least `rows` rows
+        if not self.dimension:
+            self._matrix, self._capacity = None, 0
+            return
+        row_bytes = self.dimension * np.dtype(self.dtype).itemsize
+        size = os.path.getsize(self.vectors_path) if os.path.exists(self.vectors_path) else 0
+        if size < rows * row_bytes or not size:
+            self._matrix = None # Released before the file grows (required on Windows)
+            capacity = max(rows, 2 * (size // row_bytes), _MIN_GROWTH_ROWS)
+            with open(self.vectors_path, "ab") as f:
+                f.truncate(capacity * row_bytes)
+            size = capacity * row_bytes
+        if self._matrix is None or size // row_bytes != self._capacity:
+            self._capacity = size // row_bytes
+            self._matrix = np.memmap(self.vectors_path, dtype=self.dtype, mode="r+",
+                                     shape=(self._capacity, self.dimension))
+
+    def _commit_write(self, rows: int):
+        generation = self._info("generation") + 1
+        self._conn.execute("UPDATE info SET value = ? WHERE key = 'rows'", (rows,))
+        self._conn.execute("UPDATE info SET value = ? WHERE key = 'generation'", (generation,))
+        self._generation = generation
+
+    # --- Chroma collection API ---
+
+    def count(self) -> int:
+        self._refresh()
+        return self._count
+
+    def upsert(self, ids: List[str], embeddings, documents: List[str] = None, metadatas: List[dict] = None):
+        vectors = _normalize(np.asarray(embeddings, dtype=np.float32))
+        documents = documents or [None] * len(ids)
+        metadatas = metadatas or [None] * len(ids)
+        with self._lock:
+            self._refresh()
+            if not self.dimension:
+                self.dimension = vectors.shape[1]
+                self._conn.execute("UPDATE info SET value = ? WHERE key = 'dimension'", (self.dimension,))
+            elif vectors.shape[1] != self.dimension:
+                raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match the index ({self.dimension}).")
+
+            # Existing ids are overwritten in place, new ones are appended
+            existing = self._rows_by_id(ids)
+            rows = []
+            next_row = self._rows
+            for doc_id in ids:
+                if doc_id not in existing:
+                    existing[doc_id] = next_row
+                    next_row += 1
+                rows.append(existing[doc_id])
+            self._map(next_row)
+            # Vectors are written before the SQLite commit: readers never see rows without them
+            self._matrix[rows] = vectors.astype(self.dtype)
+            self._matrix.flush()
+
+            with self._conn:
+                self._delete_metadata(rows)
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO docs VALUES (?, ?, ?, ?)",
+                    [(row, doc_id, document, json.dumps(metadata) if metadata else None)
+                     for row, doc_id, document, metadata in zip(rows, ids, documents, metadatas)])
+                self._conn.executemany(
+                    "INSERT INTO doc_metadata VALUES (?, ?, ?)",
+                    [(row, key, value) for row, metadata in zip(rows, metadatas)
+                     for key, value in (metadata or {}).items()])
+                self._commit_write(next_row)
+            self._count += next_row - self._rows
+            self._rows = next_row
+            if len(self._live) < self._capacity:
+                self._live = np.concatenate([self._live, np.zeros(self._capacity - len(self._live), dtype=bool)])
+            self._live[rows] = True
+
+    def delete(self, ids: List[str] = None):
+        with self._lock:
+            self._refresh()
+            rows = list(self._rows_by_id(ids or []).values())
+            if not rows:
+                return
+            with self._conn:
+                self._delete_metadata(rows)
+                for i in range(0, len(rows), _SQL_BATCH):
+                    batch = rows[i:i + _SQL_BATCH]
+                    self._conn.execute(f"DELETE FROM docs WHERE row IN ({','.join('?' * len(batch))})", batch)
+                self._commit_write(self._rows)
+            self._live[rows] = False
+            self._count -= len(rows)
+
+    def get(self, ids: List[str] = None, where: dict = None, limit: int = None, offset: int = None,
+            include: Iterable[str] = ("metadatas", "documents")) -> dict:
+        self._refresh()
+        conditions, params = [], []
+        if ids is not None:
+            if not ids:
+                return self._result([], [], include)
+            rows = list(self._rows_by_id(ids).values())
+            conditions.append(f"row IN ({','.join('?' * len(rows))})" if rows else "0")
+            params.extend(rows)
+        if where:
+            sql, where_params = _where_sql(where)
+            conditions.append(sql)
+            params.extend(where_params)
+        query = "SELECT row, doc_id, document, metadata FROM docs"
+        if conditions:
+            query += " WHERE " + " AND ".join(f"({condition})" for condition in conditions)
+        query += " ORDER BY row"
+        if limit is not None or offset:
+            query += " LIMIT ? OFFSET ?"
+            params.extend([limit if limit is not None else -1, offset or 0])
+        with self._lock:
+            records = self._conn.execute(query, params).fetchall()
+        return self._result(records, [record[0] for record in records], include)
+
+    def query(self, query_embeddings, n_results: int = 10, where: dict = None,
+              include: Iterable[str] = ("metadatas", "documents", "distances")) -> dict:
+        """
+        Exact top-n by cosine similarity for each query embedding (one matrix product per block
+        of rows, then argpartition). With `where`, only the matching rows are scored.
+        """
+        self._refresh()
+        queries = _normalize(np.asarray(query_embeddings, dtype=np.float32))
+        # Best n of each block, then best n overall: the full score matrix is never materialized
+        best_rows = [np.zeros(0, dtype=np.int64) for _ in queries]
+        best_scores = [np.zeros(0, dtype=np.float32) for _ in queries]
+        live = self._live
+        for block_rows, block in self._blocks(where):
+            scores = np.asarray(block, dtype=np.float32) @ queries.T
+            scores[~live[block_rows]] = -np.inf
+            for j in range(len(queries)):
+                top = self._top(scores[:, j], n_results)
+                best_rows[j] = np.concatenate([best_rows[j], block_rows[top]])
+                best_scores[j] = np.concatenate([best_scores[j], scores[top, j]])
+
+        result = {"ids": [], "documents": [], "metadatas": [], "distances": [], "embeddings": []}
+        for row_candidates, score_candidates in zip(best_rows, best_scores):
+            top = self._top(score_candidates, n_results)
+            top = top[np.isfinite(score_candidates[top])]
+            selected = self.get_rows(row_candidates[top].tolist(), include)
+            selected["distances"] = (2 - 2 * score_candidates[top]).tolist()
+            for key in result:
+                result[key].append(selected.get(key))
+        return {key: (value if key in include or key == "ids" else None) for key, value in result.items()}
+
+    def _blocks(self, where: dict = None):
+        # Yields (rows, vectors) blocks of the rows to score: all of them, or those matching `where`
+        matrix, rows = self._matrix, self._rows
+        if matrix is None:
+            return
+        if where:
+            sql, params = _where_sql(where)
+            with self._lock:
+                candidates = np.fromiter(
+                    (row for row, in self._conn.execute(f"SELECT row FROM docs WHERE {sql}", params)), dtype=np.int64)
+            for i in range(0, len(candidates), _SEARCH_BLOCK_ROWS):
+                block_rows = candidates[i:i + _SEARCH_BLOCK_ROWS]
+                yield block_rows, matrix[block_rows]
+        else:
+            for start in range(0, rows, _SEARCH_BLOCK_ROWS):
+                end = min(start + _SEARCH_BLOCK_ROWS, rows)
+                yield np.arange(start, end), matrix[start:end]
+
+    def get_rows(self, rows: List[int], include: Iterable[str]) -> dict:
+        # Records of the given matrix rows, in that order
+        records = {}
+        with self._lock:
+            for i in range(0, len(rows), _SQL_BATCH):
+                batch = rows[i:i + _SQL_BATCH]
+                for record in self._conn.execute(
+                        f"SELECT row, doc_id, document, metadata FROM docs WHERE row IN ({','.join('?' * len(batch))})",
+                        batch):
+                    records[record[0]] = record
+        ordered = [records[row] for row in rows if row in records]
+        return self._result(ordered, [record[0] for record in ordered], include)
+
+    def _result(self, records: list, rows: List[int], include: Iterable[str]) -> dict:
+        return {
+            "ids": [record[1] for record in records],
+            "documents": [record[2] for record in records] if "documents" in include else None,
+            "metadatas": [json.loads(record[3]) if record[3] else None for record in records]
+            if "metadatas" in include else None,
+            "embeddings": np.asarray(self._matrix[rows], dtype=np.float32) if "embeddings" in include and rows
+            else ([] if "embeddings" in include else None),
+        }
+
+    @staticmethod
+    def _top(scores: np.ndarray, n: int) -> np.ndarray:
+        # Indices of the n highest scores, best first
+        if len(scores) > n:
+            top = np.argpartition(-scores, n - 1)[:n]
+        else:
+            top = np.arange(len(scores))
+        return top[np.argsort(-scores[top], kind="stable")]
+
+    def _rows_by_id(self, ids: List[str]) -> dict:
+        rows = {}
+        for i in range(0, len(ids), _SQL_BATCH):
+            batch = ids[i:i + _SQL_BATCH]
+            rows.update(self._conn.execute(
+                f"SELECT doc_id, row FROM docs WHERE doc_id IN ({','.join('?' * len(batch))})", batch))
+        return rows
+
+    def _delete_metadata(self, rows: List[int]):
+        for i in range(0, len(rows), _SQL_BATCH):
+            batch = rows[i:i + _SQL_BATCH]
+            self._conn.execute(f"DELETE FROM doc_metadata WHERE row IN ({','.join('?' * len(batch))})", batch)
+
+    # --- Maintenance ---
+
+    def stats(self) -> dict:
+        self._refresh()
+        return {"documents": self._count, "tombstones": self._rows - self._count, "dimension": self.dimension,
+                "dtype": self.dtype, "capacity": self._capacity}
+
+    def compact(self) -> int:
+        """
+        Rewrites the matrix without the rows of deleted documents. Returns the number of rows
+        reclaimed. Readers in other processes remap the new file on their next call.
+        """
+        with self._lock:
+            self._refresh()
+            live_rows = np.flatnonzero(self._live[:self._rows])
+            reclaimed = self._rows - len(live_rows)
+            if not reclaimed:
+                return 0
+            compacted_path = self.vectors_path + ".compact"
+            compacted = np.memmap(compacted_path, dtype=self.dtype, mode="w+",
+                                  shape=(max(len(live_rows), 1), self.dimension))
+            for i in range(0, len(live_rows), _SEARCH_BLOCK_ROWS):
+                compacted[i:i + _SEARCH_BLOCK_ROWS] = self._matrix[live_rows[i:i + _SEARCH_BLOCK_ROWS]]
+            compacted.flush()
+            del compacted
+
+            # Rows are renumbered in order, so new rows keep their relative position
+            with self._conn:
+                self._conn.execute("CREATE TEMP TABLE row_map (old INTEGER PRIMARY KEY, new INTEGER NOT NULL)")
+                self._conn.executemany("INSERT INTO row_map VALUES (?, ?)",
+                                       ((int(old), new) for new, old in enumerate(live_rows)))
+                self._conn.execute("UPDATE docs SET row = -1 - (SELECT new FROM row_map WHERE old = docs.row)")
+                self._conn.execute("UPDATE docs SET row = -1 - row")
+                self._conn.execute("UPDATE doc_metadata SET row = (SELECT new FROM row_map WHERE old = doc_metadata.row)")
+                self._conn.execute("DROP TABLE row_map")
+                self._commit_write(len(live_rows))
+            self._matrix = None
+            os.replace(compacted_path, self.vectors_path)
+            self._generation = None
+            self._refresh()
+            print(f"Compacted the vector index: {reclaimed} deleted rows reclaimed.")
+            return reclaimed
+
+
+class NumpyVectorStore(LangchainVectorStore):
+    """
+    LangChain vector store over a NumpyIndex: same role as langchain_chroma.Chroma in
+    vector_store.VectorStore (`_collection`, `delete`, `as_retriever`).
+    """
+
+    def __init__(self, persist_directory: str, embedding_function: Embeddings = None, dtype: str = "float32"):
+        self._embedding_function = embedding_function
+        self._collection = NumpyIndex(persist_directory, dtype=dtype)
+
+    @property
+    def embeddings(self):
+        return self._embedding_function
+
+    def add_texts(self, texts: Iterable[str], metadatas: List[dict] = None, *, ids: List[str] = None,
+                  **kwargs) -> List[str]:
+        texts = list(texts)
+        # Dashed, as langchain_chroma: 32 hex characters would pass for content hashes (remove_duplicates)
+        ids = ids or [str(uuid.uuid4()) for _ in texts]
+        self._collection.upsert(ids=ids, embeddings=self._embedding_function.embed_documents(texts),
+                                documents=texts, metadatas=metadatas)
+        return ids
+
+    def delete(self, ids: List[str] = None, **kwargs):
+        self._collection.delete(ids=ids)
+
+    def similarity_search(self, query: str, k: int = 4, filter: dict = None, **kwargs) -> List[LangchainDocument]:
+        return self.similarity_search_by_vector(self._embedding_function.embed_query(query), k=k, filter=filter)
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, filter: dict = None,
+                                    **kwargs) -> List[LangchainDocument]:
+        results = self._collection.query(query_embeddings=[embedding], n_results=k, where=filter,
+                                         include=["documents", "metadatas"])
+        return [LangchainDocument(id=doc_id, page_content=content or "", metadata=metadata or {})
+                for doc_id, content, metadata in zip(results["ids"][0], results["documents"][0],
+                                                     results["metadatas"][0])]
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: List[dict] = None, *,
+                   ids: List[str] = None, persist_directory: str = "numpy_db", **kwargs):
+        store = cls(persist_directory, embedding_function=embedding, **kwargs)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return store
@@ -0,0 +1,116 @@
+import csv
+import sys
+from typing import Iterator, Sequence
+from langchain_core.document_loaders import BaseLoader
+from langchain_core.documents import Document as LangchainDocument
+
+# Columns kept in the text of a product (the dump has ~200, mostly empty for a given product)
+DEFAULT_COLUMNS = (
+    "product_name", "generic_name", "brands", "quantity", "categories_en", "labels_en",
+    "countries_en", "ingredients_text", "allergens", "traces_en", "nutriscore_grade",
+    "nova_group", "ecoscore_grade", "energy-kcal_100g", "fat_100g", "saturated-fat_100g",
+    "carbohydrates_100g", "sugars_100g", "fiber_100g", "proteins_100g", "salt_100g",
+)
+
+# Short labels of the template; columns missing here use their own name
+LABELS = {
+    "generic_name": "Name", "brands": "Brand", "quantity": "Quantity", "categories_en": "Categories",
+    "labels_en": "Labels", "countries_en": "Countries", "ingredients_text": "Ingredients",
+    "allergens": "Allergens", "traces_en": "Traces", "nutriscore_grade": "Nutri-Score",
+    "nova_group": "NOVA", "ecoscore_grade": "Eco-Score",
+}
+
+_NUTRIMENT_SUFFIX = "_100g"
+
+
+def is_open_food_facts_csv(file_path: str) -> bool:
+    """
+    True if the header of the file looks like an Open Food Facts export.
+    """
+    with open(file_path, "r", encoding="utf-8", errors="replace", newline="") as f:
+        header = f.readline()
+    columns = set(header.strip().replace("\t", ",").split(","))
+    return "code" in columns and "product_name" in columns
+
+
+def _raise_field_size_limit():
+    # Some OFF fields (ingredients, images...) exceed the default 128 KB limit of the csv module
+    limit = sys.maxsize
+    while True:
+        try:
+            csv.field_size_limit(limit)
+            return
+        except OverflowError:
+            limit //= 10
+
+
+class OpenFoodFactsLoader(BaseLoader):
+    """
+    Loads an Open Food Facts CSV/TSV export as one compact document per product: only the
+    `columns` allow-list is kept, empty fields are dropped and the values are rendered with a
+    short template instead of a "column: value" dump of every column. The delimiter (tab for
+    the raw dump, comma for data/sample_openfoodfacts.csv) is detected from the header.
+    Barcode, brand, category and Nutri-Score are also stored in the metadata.
+    """
+
+    def __init__(self, file_path: str, columns: Sequence[str] = None, encoding: str = "utf-8"):
+        self.file_path = file_path
+        self.columns = tuple(columns) if columns else DEFAULT_COLUMNS
+        self.encoding = encoding
+
+    def lazy_load(self) -> Iterator[LangchainDocument]:
+        _raise_field_size_limit()
+        with open(self.file_path, "r", encoding=self.encoding, errors="replace", newline="") as f:
+            header = f.readline()
+            f.seek(0)
+            delimiter = "\t" if header.count("\t") > header.count(",") else ","
+            # The raw dump is not quoted: quotes are part of the values
+            reader = csv.DictReader(f, delimiter=delimiter,
+                                    quoting=csv.QUOTE_NONE if delimiter == "\t" else csv.QUOTE_MINIMAL)
+            for row_number, row in enumerate(reader):
+                content = self.format_row(row)
+                if content:
+                    yield LangchainDocument(page_content=content, metadata=self.row_metadata(row, row_number))
+
+    def format_row(self, row: dict) -> str:
+        """
+        Renders the non-empty allowed fields of a row, after the name and the barcode, e.g.:
+        Nutella (3017620422003) - Brand: Ferrero | Categories: Spreads | Nutri-Score: e
+        Per 100g: energy-kcal 539, fat 30.9, sugars 56.3
+        The barcode is always rendered: chunk ids are content hashes, so two products with the
+        same fields would otherwise be stored once, and it makes the barcode a BM25 term.
+        """
+        fields = []
+        nutriments = []
+        for column in self.columns:
+            value = (row.get(column) or "").strip()
+            if not value or column == "product_name":
+                continue
+            if column.endswith(_NUTRIMENT_SUFFIX):
+                nutriments.append(f"{column[:-len(_NUTRIMENT_SUFFIX)]} {value}")
+            else:
+                fields.append(f"{LABELS.get(column, column)}: {value}")
+
+        lines = []
+        name = (row.get("product_name") or "").strip() if "product_name" in self.columns else ""
+        if name or fields:
+            barcode = (row.get("code") or "").strip()
+            title = " ".join(filter(None, [name, f"({barcode})" if barcode else ""]))
+            lines.append(" - ".join(filter(None, [title, " | ".join(fields)])))
+        if nutriments:
+            lines.append("Per 100g: " + ", ".join(nutriments))
+        return "\n".join(lines)
+
+    def row_metadata(self, row: dict, row_number: int) -> dict:
+        metadata = {"source": self.file_path, "row": row_number}
+        barcode = (row.get("code") or "").strip()
+        # Multi-valued fields: first brand, most specific category
+        brand = (row.get("brands") or "").split(",")[0].strip()
+        category = (row.get("main_category_en") or "").strip() or \
+            (row.get("categories_en") or "").split(",")[-1].strip()
+        nutriscore = (row.get("nutriscore_grade") or "").strip().lower()
+        for key, value in (("barcode", barcode), ("brand", brand), ("category", category),
+                           ("nutriscore", nutriscore)):
+            if value:
+                metadata[key] = value
+        return metadata
@@ -1,104 +1,599 @@
 import os
 import shutil
+import time
+import asyncio
+import json
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from document_processor import DocumentProcessor
-from vector_store import VectorStore
-from reranker import Reranker
-from generator import Generator
-from langchain_huggingface import HuggingFaceEmbeddings
+from vector_store import VectorStore, build_where, filter_values, read_store_generation, bump_store_generation
+from generator import Generator, GENERATION_ERROR_PREFIX
+from ingestion_engine import IngestionEngine
+from embedding_cache import CachedEmbeddings
+from semantic_cache import SemanticCache
+from sync_manifest import SyncManifest
+import snapshot
+from metrics import span, trace, run_in_executor, QUERIES, DOCUMENTS_INGESTED
 from langchain_core.documents import Document as LangchainDocument
 
+# Retrieval modes: dense vectors only, or vectors fused with the BM25 index
+RETRIEVAL_MODES = ("vector", "hybrid")
+# EAN-8, UPC-A, EAN-13 and GTIN-14 barcodes, alone in the query
+BARCODE_QUERY = re.compile(r"^\s*(\d{8}|\d{12,14})\s*$")
+
+
+def check_retrieval_mode(mode: str):
+    if mode not in RETRIEVAL_MODES:
+        raise ValueError(f"Unknown retrieval mode '{mode}' (expected one of: {', '.join(RETRIEVAL_MODES)}).")
+
+
 class RAGPipeline:
-    def __init__(self, chroma_db_path: str = "chroma_db", embedding_model_name="BAAI/bge-small-en-v1.5"):
+    # Heavy components, built on first use (or by load_components) in this order
+    COMPONENTS = ("embeddings_model", "vector_store", "reranker", "generator")
+
+    def __init__(self, chroma_db_path: str = "chroma_db", embedding_model_name="BAAI/bge-small-en-v1.5",
+                 ingest_batch_size: int = 256, ingest_workers: int = None,
+                 embedding_cache_path: str = None, embedding_cache_max_entries: int = 1_000_000,
+                 rerank_max_wait_ms: float = None, rerank_max_batch_size: int = 64,
+                 answer_cache_threshold: float = 0.95, answer_cache_ttl_seconds: float = 3600,
+                 answer_cache_max_entries: int = 1024, lazy_load: bool = False,
+                 llm_model_name: str = "mistral", llm_base_url: str = None, off_columns: list = None,
+                 context_max_tokens: int = 2000, vector_backend: str = "chroma", numpy_dtype: str = "float32",
+                 store_check_interval: float = 1.0):
         self.chroma_db_path = chroma_db_path
+        # "chroma" or "numpy" (exact search over a memory-mapped matrix, see numpy_index.py);
+        # chroma_db_path is then the directory of that backend
+        self.vector_backend = vector_backend
+        self.numpy_dtype = numpy_dtype
+        self.embedding_model_name = embedding_model_name
+        self.llm_model_name = llm_model_name
+        self.llm_base_url = llm_base_url
+        # Token budget of the prompt context (merged, deduplicated chunks in rerank order)
+        self.context_max_tokens = context_max_tokens
+        # Number of chunks embedded and written per vector store call during ingestion
+        self.ingest_batch_size = ingest_batch_size
+        # Number of processes loading and chunking files during directory ingestion (None = cores - 1)
+        self.ingest_workers = ingest_workers
+        # Persistent cache keyed by (model, md5 of the chunk): known chunks are never re-embedded.
+        # Stored next to the vector store (not inside it) so it survives wiping the DB.
+        if embedding_cache_path is None:
+            embedding_cache_path = os.path.join(os.path.dirname(os.path.abspath(self.chroma_db_path)),
+                                                "embedding_cache.sqlite3")
+        self.embedding_cache_path = embedding_cache_path
+        self.embedding_cache_max_entries = embedding_cache_max_entries
+        self.rerank_max_wait_ms = rerank_max_wait_ms
+        self.rerank_max_batch_size = rerank_max_batch_size
+
+        # Embeddings model, vector store, reranker and generator are loaded lazily (see _get_component).
+        # Load time of each component, in seconds
+        self.startup_timings = {}
+        self._components = {}
+        self._components_lock = threading.RLock()
+        self.warmed_up = False
+        # Model weights loaded by preload_models (before serve.py forks its workers)
+        self._preloaded_models = {}
+
+        # Generation of the store seen by this process: another process (serve.py's writer) bumps
+        # it after its writes, and this one reloads its view at most every `store_check_interval` s
+        self.store_check_interval = store_check_interval
+        self._store_generation = read_store_generation(self.chroma_db_path)
+        self._store_checked_at = time.monotonic()
+        self._store_lock = threading.Lock()
+
+        # Document Processor (off_columns: columns kept from Open Food Facts CSVs, None = defaults)
+        self.off_columns = off_columns
+        self.document_processor = DocumentProcessor(off_columns=off_columns)
+
+        # Semantic answer cache (near-duplicate questions skip retrieval, rerank and generation)
+        self.answer_cache = SemanticCache(
+            similarity_threshold=answer_cache_threshold,
+            ttl_seconds=answer_cache_ttl_seconds,
+            max_entries=answer_cache_max_entries
+        )
         
-        # 1. Embeddings Model
+        self.initialized = False
+
+        if not lazy_load:
+            self.load_components()
+
+    # 1. Embeddings Model
+    def _load_embedding_weights(self):
+        # Imported here: importing sentence-transformers/torch alone takes seconds
+        from langchain_huggingface import HuggingFaceEmbeddings
+
         model_kwargs = {"device": "cpu"}
         encode_kwargs = {"normalize_embeddings": True}
-        self.embeddings_model = HuggingFaceEmbeddings(
-            model_name=embedding_model_name,
+        return HuggingFaceEmbeddings(
+            model_name=self.embedding_model_name,
             model_kwargs=model_kwargs,
             encode_kwargs=encode_kwargs
         )
-        
-        # 2. Vector Store
-        self.vector_store = VectorStore(
+
+    def _build_embeddings_model(self):
+        base_embeddings_model = self._preloaded_models.get("embeddings") or self._load_embedding_weights()
+        return CachedEmbeddings(
+            base_embeddings_model,
+            model_name=self.embedding_model_name,
+            cache_path=self.embedding_cache_path,
+            max_entries=self.embedding_cache_max_entries
+        )
+
+    # 2. Vector Store
+    def _build_vector_store(self):
+        return VectorStore(
             embeddings_model=self.embeddings_model,
-            persist_directory=self.chroma_db_path
+            persist_directory=self.chroma_db_path,
+            backend=self.vector_backend,
+            numpy_dtype=self.numpy_dtype
         )
-        
-        # 3. Document Processor
-        self.document_processor = DocumentProcessor()
-        
-        # 4. Reranker
-        self.reranker = Reranker()
-        
-        # 5. Generator
-        self.generator = Generator()
-        
-        self.initialized = False
 
-    def initialize(self, initial_data_dir: str = None):
+    # 3. Reranker
+    def _load_reranker_weights(self):
+        from reranker import Reranker
+        return Reranker()
+
+    def _build_reranker(self):
+        from reranker import MicroBatchingReranker
+
+        # With a wait window, concurrent queries share CrossEncoder forward passes (micro-batching)
+        reranker = self._preloaded_models.get("reranker") or self._load_reranker_weights()
+        if self.rerank_max_wait_ms is not None:
+            reranker = MicroBatchingReranker(
+                reranker,
+                max_wait_ms=self.rerank_max_wait_ms,
+                max_batch_size=self.rerank_max_batch_size
+            )
+        return reranker
+
+    # 4. Generator
+    def _build_generator(self):
+        return Generator(llm_model_name=self.llm_model_name, base_url=self.llm_base_url,
+                         context_max_tokens=self.context_max_tokens)
+
+    def _get_component(self, name: str):
+        """
+        Returns a heavy component, building it on first access (thread-safe) and recording its load time.
+        """
+        component = self._components.get(name)
+        if component is None:
+            with self._components_lock:
+                component = self._components.get(name)
+                if component is None:
+                    start = time.perf_counter()
+                    component = getattr(self, f"_build_{name}")()
+                    self.startup_timings[name] = round(time.perf_counter() - start, 3)
+                    print(f"Loaded {name} in {self.startup_timings[name]:.2f}s.")
+                    self._components[name] = component
+        return component
+
+    @property
+    def embeddings_model(self):
+        return self._get_component("embeddings_model")
+
+    @property
+    def vector_store(self):
+        return self._get_component("vector_store")
+
+    @property
+    def reranker(self):
+        return self._get_component("reranker")
+
+    @property
+    def generator(self):
+        return self._get_component("generator")
+
+    def preload_models(self):
+        """
+        Loads the weights of the embedding model and the CrossEncoder, without opening the
+        caches or the vector store and without starting threads. serve.py calls it before
+        forking its workers, which then share these pages (copy-on-write) instead of each
+        loading its own copy.
+        """
+        start = time.perf_counter()
+        self._preloaded_models["embeddings"] = self._load_embedding_weights()
+        self._preloaded_models["reranker"] = self._load_reranker_weights()
+        self.startup_timings["preload_models"] = round(time.perf_counter() - start, 3)
+        print(f"Preloaded models in {self.startup_timings['preload_models']:.2f}s.")
+
+    def load_components(self):
+        """
+        Loads every heavy component that is not loaded yet.
+        """
+        for name in self.COMPONENTS:
+            self._get_component(name)
+
+    def warm_up(self):
+        """
+        Loads all components and runs a tiny embedding and rerank, so that the first real
+        query does not pay for lazy initializations inside the models.
+        """
+        self.load_components()
+        start = time.perf_counter()
+        self.embeddings_model.embed_query("warm up")
+        self.reranker.rerank("warm up", [LangchainDocument(page_content="warm up")])
+        self.startup_timings["warm_up"] = round(time.perf_counter() - start, 3)
+        self.warmed_up = True
+        print(f"Warmed up models in {self.startup_timings['warm_up']:.2f}s.")
+
+    def readiness(self):
+        """
+        Reports which components are loaded, whether models are warmed up and the pipeline
+        initialized, and the per-component startup timings.
+        """
+        components = {name: name in self._components for name in self.COMPONENTS}
+        return {
+            "ready": self.initialized and all(components.values()),
+            "initialized": self.initialized,
+            "warmed_up": self.warmed_up,
+            "components": components,
+            "startup_timings": dict(self.startup_timings),
+        }
+
+    def initialize(self, initial_data_dir: str = None, sync: bool = False):
         """
         Initializes the RAG pipeline. Loads initial documents if a directory is provided.
+        With `sync=True`, the directory is synchronized incrementally instead (see sync_directory),
+        even if the vector store already contains documents.
         """
         if self.initialized:
             print("RAG pipeline already initialized.")
             return
 
         print("Initializing RAG pipeline...")
+        start = time.perf_counter()
         
-        if initial_data_dir and not self.vector_store.collection_count:
+        if initial_data_dir and sync:
+            self.sync_directory(initial_data_dir)
+        elif initial_data_dir and not self.vector_store.collection_count:
             print(f"Vector store is empty. Loading initial documents from {initial_data_dir}...")
-            chunks = self.document_processor.load_and_chunk_directory(initial_data_dir)
-            if chunks:
-                self.vector_store.add_documents(chunks)
-                print(f"Added {len(chunks)} initial documents to vector store.")
+            total_chunks = self.ingest_directory(initial_data_dir)
+            if total_chunks:
+                print(f"Added {total_chunks} initial documents to vector store.")
             else:
                 print("No initial documents found or processed.")
         elif self.vector_store.collection_count:
             print(f"Vector store already contains {self.vector_store.collection_count} documents. Skipping initial document load.")
         
+        indexed = self.vector_store.lexical_index.count()
+        if indexed < self.vector_store.collection_count:
+            print(f"Lexical index covers {indexed} of {self.vector_store.collection_count} documents: "
+                  f"run 'python clean_db.py --rebuild-lexical-index' for hybrid and barcode search.")
+
+        self.startup_timings["initialize"] = round(time.perf_counter() - start, 3)
         self.initialized = True
         print("RAG pipeline initialized successfully.")
 
-    def query(self, query_text: str, top_k: int = 3):
+    def retrieve_and_rerank(self, query_text: str, top_k: int = 3, query_embedding=None, filters: dict = None,
+                            mode: str = "vector"):
         """
-        Runs a single query through the RAG pipeline.
+        Runs the retrieval and reranking stages of a query (CPU-bound: embedding, vector search,
+        CrossEncoder). Returns the top_k documents as dictionaries (content + metadata).
+        An already computed `query_embedding` avoids embedding the query a second time.
+        `filters` (e.g. {"brand": "Ferrero"}, see vector_store.build_where) restrict the search
+        to the matching chunks inside Chroma, so only those are retrieved and reranked.
+        With `mode="hybrid"`, vector and BM25 candidates are fused before reranking.
         """
-        if not self.initialized:
-            raise RuntimeError("RAG pipeline not initialized. Call .initialize() first.")
-
-        print(f"\nProcessing query: '{query_text}'")
-
+        check_retrieval_mode(mode)
         # 1. Retrieve
-        retriever = self.vector_store.as_retriever(search_kwargs={"k": top_k * 2})
-        retrieved_docs = retriever.invoke(query_text)
+        if query_embedding is None:
+            with span("embed_query"):
+                query_embedding = self.embeddings_model.embed_query(query_text)
+        if mode == "hybrid":
+            retrieved_docs = self.vector_store.hybrid_search_by_vectors(
+                [query_text], [query_embedding], k=top_k * 2, where=build_where(filters))[0]
+        else:
+            retrieved_docs = self.vector_store.similarity_search_by_vector(query_embedding, k=top_k * 2,
+                                                                           where=build_where(filters))
         print(f"Retrieved {len(retrieved_docs)} documents.")
 
         if not retrieved_docs:
-            # Modification ici pour renvoyer une structure cohérente même vide
-            return {
-                "answer": self.generator.generate_response(query_text, []),
-                "sources": []
-            }
+            return []
 
         # 2. Rerank
-        reranked_docs = self.reranker.rerank(query_text, retrieved_docs)[:top_k]
+        with span("rerank"):
+            reranked_docs = self.reranker.rerank(query_text, retrieved_docs)[:top_k]
         print(f"Reranked and selected top {len(reranked_docs)} documents.")
         
         # Convert LangchainDocument objects to dictionaries for the generator
         # Cette variable contient déjà ce que vous voulez (content + metadata)
-        docs_for_generator = [{"content": doc.page_content, "metadata": doc.metadata} for doc in reranked_docs]
+        return [{"content": doc.page_content, "metadata": doc.metadata} for doc in reranked_docs]
 
-        # 3. Generate
-        final_response = self.generator.generate_response(query_text, docs_for_generator)
-        
-        # --- MODIFICATION ---
-        # Au lieu de renvoyer juste le texte, on renvoie un dictionnaire
-        return {
-            "answer": final_response,
-            "sources": docs_for_generator
-        }
+    @staticmethod
+    def _cache_key(top_k: int, filters: dict = None, mode: str = "vector"):
+        # Answers are only reused for the same top_k, retrieval mode and filters (in any order)
+        if not filters:
+            return top_k, mode, None
+        normalized = {field: sorted(filter_values(field, value)) for field, value in filters.items()}
+        return top_k, mode, json.dumps(normalized, sort_keys=True)
+
+    def _lookup_or_retrieve(self, query_text: str, top_k: int, filters: dict = None, mode: str = "vector"):
+        """
+        Embeds the query and looks it up in the semantic answer cache. On a miss, runs
+        retrieval and reranking with the same embedding.
+        Barcode queries are looked up directly in the index first: no embedding, cache or rerank.
+        Returns `(query_embedding, cache_generation, cached_result, docs_for_generator)`
+        (`query_embedding` is None after a barcode lookup).
+        """
+        check_retrieval_mode(mode)
+        self.refresh_if_store_changed()
+        barcode = BARCODE_QUERY.match(query_text)
+        if barcode:
+            docs = self.vector_store.get_by_barcode(barcode.group(1), k=top_k, where=build_where(filters))
+            if docs:
+                print(f"Barcode lookup: {len(docs)} documents for {barcode.group(1)}.")
+                return None, None, None, [{"content": doc.page_content, "metadata": doc.metadata} for doc in docs]
+
+        with span("embed_query"):
+            query_embedding = self.embeddings_model.embed_query(query_text)
+        with span("cache_lookup"):
+            cached_result = self.answer_cache.lookup(query_embedding, key=self._cache_key(top_k, filters, mode))
+        if cached_result is not None:
+            print("Semantic cache hit: returning the cached answer.")
+            return query_embedding, None, cached_result, None
+
+        cache_generation = self.answer_cache.generation
+        docs_for_generator = self.retrieve_and_rerank(query_text, top_k, query_embedding=query_embedding,
+                                                      filters=filters, mode=mode)
+        return query_embedding, cache_generation, None, docs_for_generator
+
+    def _cache_answer(self, query_embedding, top_k: int, result: dict, cache_generation: int,
+                      filters: dict = None, mode: str = "vector"):
+        # Barcode lookups (no embedding) are not cached
+        if query_embedding is None:
+            return
+        # Generation failures are not cached, they would be served again for similar queries
+        if not result["answer"].startswith(GENERATION_ERROR_PREFIX):
+            self.answer_cache.put(query_embedding, dict(result, cached=True),
+                                  key=self._cache_key(top_k, filters, mode), generation=cache_generation)
+
+    def get_facets(self, filters: dict):
+        """
+        Number of chunks matching each filter value, and all the filters together
+        (see VectorStore.facet_counts): lookups in the aggregate counts of the metadata index,
+        no embedding, no search.
+        """
+        build_where(filters)  # Validates the filters
+        with span("facets"):
+            return self.vector_store.facet_counts(filters)
+
+    def query(self, query_text: str, top_k: int = 3, filters: dict = None, mode: str = "vector",
+              include_facets: bool = False):
+        """
+        Runs a single query through the RAG pipeline.
+        With `filters`, only the matching chunks are searched; with `include_facets`, the result
+        also includes their facet counts (see get_facets). `mode` is the retrieval mode
+        ("vector" or "hybrid").
+        """
+        if not self.initialized:
+            raise RuntimeError("RAG pipeline not initialized. Call .initialize() first.")
+
+        print(f"\nProcessing query: '{query_text}'")
+
+        with trace() as request_trace:
+            # 0. Semantic cache, then 1. Retrieve + 2. Rerank on a miss
+            query_embedding, cache_generation, cached_result, docs_for_generator = self._lookup_or_retrieve(
+                query_text, top_k, filters, mode)
+            if cached_result is not None:
+                result = cached_result
+            else:
+                # 3. Generate
+                context_stats = {}
+                with span("generate"):
+                    final_response = self.generator.generate_response(query_text, docs_for_generator, context_stats)
+
+                # --- MODIFICATION ---
+                # Au lieu de renvoyer juste le texte, on renvoie un dictionnaire
+                result = {
+                    "answer": final_response,
+                    "sources": docs_for_generator,
+                    "cached": False,
+                    "context_stats": context_stats # Taille du contexte envoyé au LLM et tokens économisés
+                }
+                self._cache_answer(query_embedding, top_k, result, cache_generation, filters, mode)
+            if include_facets and filters:
+                # Not cached with the answer: the counts follow the writes
+                result = dict(result, facets=self.get_facets(filters))
+        QUERIES.inc(kind="single", cached=result["cached"])
+        # Per-request timing breakdown (seconds per stage)
+        return dict(result, timings=request_trace.timings)
+
+    async def aquery(self, query_text: str, top_k: int = 3, executor=None, filters: dict = None,
+                     mode: str = "vector", include_facets: bool = False):
+        """
+        Async version of query. Retrieval and reranking run in `executor` (a bounded thread pool,
+        or the loop's default one) and generation awaits the LLM asynchronously, so the event
+        loop is never blocked.
+        """
+        if not self.initialized:
+            raise RuntimeError("RAG pipeline not initialized. Call .initialize() first.")
+
+        print(f"\nProcessing query: '{query_text}'")
+
+        loop = asyncio.get_running_loop()
+        with trace() as request_trace:
+            query_embedding, cache_generation, cached_result, docs_for_generator = await run_in_executor(
+                loop, executor, self._lookup_or_retrieve, query_text, top_k, filters, mode)
+            if cached_result is not None:
+                result = cached_result
+            else:
+                context_stats = {}
+                with span("generate"):
+                    final_response = await self.generator.agenerate_response(query_text, docs_for_generator,
+                                                                             context_stats)
+                result = {
+                    "answer": final_response,
+                    "sources": docs_for_generator,
+                    "cached": False,
+                    "context_stats": context_stats
+                }
+                self._cache_answer(query_embedding, top_k, result, cache_generation, filters, mode)
+            if include_facets and filters:
+                result = dict(result, facets=await run_in_executor(loop, executor, self.get_facets, filters))
+        QUERIES.inc(kind="single", cached=result["cached"])
+        return dict(result, timings=request_trace.timings)
+
+    async def astream_query(self, query_text: str, top_k: int = 3, executor=None, filters: dict = None,
+                            mode: str = "vector"):
+        """
+        Streaming version of aquery. Yields events as `(event, data)` tuples:
+        first `("sources", docs)` once retrieval and reranking are done, then one
+        `("token", text)` per generated token, and finally `("done", {"timings": ...})`.
+        """
+        if not self.initialized:
+            raise RuntimeError("RAG pipeline not initialized. Call .initialize() first.")
+
+        print(f"\nProcessing streaming query: '{query_text}'")
+
+        loop = asyncio.get_running_loop()
+        with trace() as request_trace:
+            query_embedding, cache_generation, cached_result, docs_for_generator = await run_in_executor(
+                loop, executor, self._lookup_or_retrieve, query_text, top_k, filters, mode)
+            QUERIES.inc(kind="stream", cached=cached_result is not None)
+            if cached_result is not None:
+                # The whole cached answer is sent as a single token
+                yield "sources", cached_result["sources"]
+                yield "token", cached_result["answer"]
+            else:
+                yield "sources", docs_for_generator
+
+                tokens = []
+                failed = False
+                # Includes the time the client takes to consume the tokens
+                with span("generate_stream"):
+                    async for token in self.generator.astream_response(query_text, docs_for_generator):
+                        # A failure mid-stream comes as a last error token, after the tokens already produced
+                        failed = failed or token.startswith(GENERATION_ERROR_PREFIX)
+                        tokens.append(token)
+                        yield "token", token
+                if not failed:
+                    # A truncated answer must not be served to similar questions
+                    self._cache_answer(query_embedding, top_k,
+                                       {"answer": "".join(tokens), "sources": docs_for_generator, "cached": False},
+                                       cache_generation, filters, mode)
+        yield "done", {"timings": request_trace.timings}
+
+    def retrieve_and_rerank_batch(self, query_texts: list, top_k: int = 3, query_embeddings: list = None,
+                                  filters: dict = None, mode: str = "vector"):
+        """
+        Vectorized retrieval and reranking for many queries: one embedding call for all the
+        queries, one multi-vector Chroma query and one CrossEncoder pass over all the pairs.
+        `filters` apply to all the queries. Returns, in input order, the top_k documents
+        (dictionaries) of each query.
+        """
+        check_retrieval_mode(mode)
+        if not query_texts:
+            return []
+
+        # 1. Embed all the queries at once
+        if query_embeddings is None:
+            with span("embed_queries"):
+                query_embeddings = self.embeddings_model.embed_queries(query_texts)
+
+        # 2. Retrieve
+        if mode == "hybrid":
+            retrieved_docs = self.vector_store.hybrid_search_by_vectors(query_texts, query_embeddings, k=top_k * 2,
+                                                                        where=build_where(filters))
+        else:
+            retrieved_docs = self.vector_store.similarity_search_by_vectors(query_embeddings, k=top_k * 2,
+                                                                            where=build_where(filters))
+        print(f"Retrieved documents for {len(query_texts)} queries.")
+
+        # 3. Rerank
+        with span("rerank_batch"):
+            reranked_docs = self.reranker.rerank_batch(query_texts, retrieved_docs)
+        return [
+            [{"content": doc.page_content, "metadata": doc.metadata} for doc in docs[:top_k]]
+            for docs in reranked_docs
+        ]
+
+    def _lookup_or_retrieve_batch(self, query_texts: list, top_k: int, filters: dict = None, mode: str = "vector"):
+        """
+        Batch version of _lookup_or_retrieve: only the queries missing from the answer cache
+        go through batched retrieval and reranking.
+        Returns `(query_embeddings, cache_generation, cached_results, docs_lists)`, where for
+        each query either its cached result or its documents is None.
+        """
+        self.refresh_if_store_changed()
+        with span("embed_queries"):
+            query_embeddings = self.embeddings_model.embed_queries(query_texts) if query_texts else []
+        with span("cache_lookup"):
+            cache_key = self._cache_key(top_k, filters, mode)
+            cached_results = [self.answer_cache.lookup(embedding, key=cache_key) for embedding in query_embeddings]
+        cache_generation = self.answer_cache.generation
+
+        misses = [i for i, cached_result in enumerate(cached_results) if cached_result is None]
+        print(f"Semantic cache: {len(query_texts) - len(misses)} hits out of {len(query_texts)} queries.")
+        docs_lists = [None] * len(query_texts)
+        retrieved = self.retrieve_and_rerank_batch([query_texts[i] for i in misses], top_k,
+                                                   query_embeddings=[query_embeddings[i] for i in misses],
+                                                   filters=filters, mode=mode)
+        for i, docs in zip(misses, retrieved):
+            docs_lists[i] = docs
+        return query_embeddings, cache_generation, cached_results, docs_lists
+
+    def query_batch(self, query_texts: list, top_k: int = 3, max_concurrency: int = 4, filters: dict = None,
+                    mode: str = "vector"):
+        """
+        Runs many queries through the RAG pipeline. Retrieval and reranking are batched,
+        generation runs with at most `max_concurrency` concurrent LLM calls.
+        Results are returned in input order.
+        """
+        if not self.initialized:
+            raise RuntimeError("RAG pipeline not initialized. Call .initialize() first.")
+
+        print(f"\nProcessing batch of {len(query_texts)} queries")
+        query_embeddings, cache_generation, cached_results, docs_lists = self._lookup_or_retrieve_batch(
+            query_texts, top_k, filters, mode)
+        misses = [i for i, docs in enumerate(docs_lists) if docs is not None]
+
+        with span("generate_batch"), ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as pool:
+            answers = list(pool.map(self.generator.generate_response,
+                                    [query_texts[i] for i in misses], [docs_lists[i] for i in misses]))
+
+        return self._merge_batch_results(query_texts, query_embeddings, top_k, cache_generation,
+                                         cached_results, docs_lists, dict(zip(misses, answers)), filters, mode)
+
+    async def aquery_batch(self, query_texts: list, top_k: int = 3, max_concurrency: int = 4, executor=None,
+                           filters: dict = None, mode: str = "vector"):
+        """
+        Async version of query_batch: batched retrieval and reranking run in `executor`,
+        generation awaits the LLM with at most `max_concurrency` calls in flight.
+        """
+        if not self.initialized:
+            raise RuntimeError("RAG pipeline not initialized. Call .initialize() first.")
+
+        print(f"\nProcessing batch of {len(query_texts)} queries")
+        loop = asyncio.get_running_loop()
+        query_embeddings, cache_generation, cached_results, docs_lists = await run_in_executor(
+            loop, executor, self._lookup_or_retrieve_batch, query_texts, top_k, filters, mode)
+        misses = [i for i, docs in enumerate(docs_lists) if docs is not None]
+
+        generation_slots = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def generate(query_text, docs):
+            async with generation_slots:
+                return await self.generator.agenerate_response(query_text, docs)
+
+        with span("generate_batch"):
+            answers = await asyncio.gather(*(generate(query_texts[i], docs_lists[i]) for i in misses))
+        return self._merge_batch_results(query_texts, query_embeddings, top_k, cache_generation,
+                                         cached_results, docs_lists, dict(zip(misses, answers)), filters, mode)
+
+    def _merge_batch_results(self, query_texts, query_embeddings, top_k, cache_generation,
+                             cached_results, docs_lists, answers: dict, filters: dict = None,
+                             mode: str = "vector"):
+        # Rebuilds the results in input order and caches the newly generated answers
+        results = []
+        for i, query_text in enumerate(query_texts):
+            if cached_results[i] is not None:
+                result = cached_results[i]
+            else:
+                result = {"answer": answers[i], "sources": docs_lists[i], "cached": False}
+                self._cache_answer(query_embeddings[i], top_k, result, cache_generation, filters, mode)
+            QUERIES.inc(kind="batch", cached=result["cached"])
+            results.append(dict(result, query=query_text))
+        return results
 
     def add_document_from_file(self, file_path: str):
         """
@@ -108,26 +603,231 @@ class RAGPipeline:
             raise RuntimeError("RAG pipeline not initialized. Call .initialize() first.")
         
         print(f"Adding document from file: {file_path}")
-        chunks = self.document_processor.load_and_chunk_file(file_path)
-        if chunks:
-            self.vector_store.add_documents(chunks)
-            print(f"Added {len(chunks)} chunks from '{file_path}' to vector store.")
+        total_chunks = self.ingest_file_streaming(file_path)
+        if total_chunks:
+            print(f"Added {total_chunks} chunks from '{file_path}' to vector store.")
             return True
         else:
             print(f"No chunks processed from '{file_path}'.")
             return False
 
-    def get_all_indexed_documents(self):
+    def ingest_directory(self, directory_path: str):
+        """
+        Ingests all supported files of a directory with the parallel ingestion engine:
+        files are parsed and chunked in a process pool while batches are embedded and written.
+        Returns the number of chunks added.
+        """
+        cache_stats_before = self.embeddings_model.stats()
+        engine = IngestionEngine(
+            self.vector_store,
+            num_workers=self.ingest_workers,
+            batch_size=self.ingest_batch_size,
+            off_columns=self.off_columns
+        )
+        total_chunks = engine.ingest_directory(directory_path)
+        self._report_embedding_cache(cache_stats_before)
+        if total_chunks:
+            self._on_store_changed()
+        return total_chunks
+
+    def sync_directory(self, directory_path: str):
+        """
+        Incrementally synchronizes the vector store with a directory, using a manifest of the
+        ingested files (path, size, mtime, content hash) stored with the vector store.
+        Only new or modified files are chunked and embedded; the chunks of removed or modified
+        files are deleted by 'source'. Returns a summary dict of what was done.
+        """
+        if not os.path.isdir(directory_path):
+            print(f"Directory not found: {directory_path}")
+            return {"new": 0, "modified": 0, "removed": 0, "unchanged": 0, "failed": 0, "chunks_added": 0,
+                    "chunks_deleted": 0}
+
+        start = time.perf_counter()
+        manifest = SyncManifest(os.path.join(self.chroma_db_path, "sync_manifest.json"), directory_path)
+        file_paths = list(self.document_processor.iter_supported_files(directory_path))
+        new, modified, removed, unchanged = manifest.diff(file_paths)
+        print(f"Sync of {directory_path}: {len(new)} new, {len(modified)} modified, "
+              f"{len(removed)} removed, {len(unchanged)} unchanged files.")
+
+        # 1. Drop the chunks of removed and modified files
+        chunks_deleted = 0
+        for file_path in removed + modified:
+            # Source recorded at ingestion (the directory may have moved since, e.g. snapshot import)
+            chunks_deleted += self.vector_store.delete_by_source(manifest.source(file_path))
+        for file_path in removed:
+            manifest.forget(file_path)
+
+        # 2. (Re-)ingest new and modified files
+        chunks_added = 0
+        to_ingest = new + modified
+        ingested = []
+        if to_ingest:
+            cache_stats_before = self.embeddings_model.stats()
+            engine = IngestionEngine(
+                self.vector_store,
+                num_workers=self.ingest_workers,
+                batch_size=self.ingest_batch_size,
+                off_columns=self.off_columns
+            )
+            chunks_added, ingested = engine.ingest_files(to_ingest)
+            self._report_embedding_cache(cache_stats_before)
+            # A file that failed to load is not recorded: the next sync retries it
+            for file_path in ingested:
+                manifest.record(file_path)
+        manifest.save()
+
+        if chunks_added or chunks_deleted:
+            self._on_store_changed()
+        summary = {
+            "new": len(new),
+            "modified": len(modified),
+            "removed": len(removed),
+            "unchanged": len(unchanged),
+            "failed": len(to_ingest) - len(ingested),
+            "chunks_added": chunks_added,
+            "chunks_deleted": chunks_deleted,
+        }
+        print(f"Sync done in {time.perf_counter() - start:.1f}s: {chunks_added} chunks added, "
+              f"{chunks_deleted} chunks deleted, {len(unchanged)} files skipped.")
+        return summary
+
+    def ingest_file_streaming(self, file_path: str, batch_size: int = None, progress_callback=None,
+                              source: str = None):
+        """
+        Streams a file into the vector store: rows are read lazily, chunked, and written
+        in fixed-size batches so peak memory does not depend on the file size.
+        Prints progress and throughput after each batch, and calls
+        `progress_callback(rows_read, chunks_added)` if given. Returns the number of chunks added.
+        With `source` (e.g. the original name of an uploaded file stored under a temporary path),
+        the chunks get it as 'source' metadata instead of `file_path`, and once the file is
+        ingested, the chunks previously written for that source and not rewritten are deleted.
+        """
+        batch_size = batch_size or self.ingest_batch_size
+        file_name = os.path.basename(file_path)
+        print(f"Streaming ingestion of '{file_path}' (batch size: {batch_size})...")
+
+        cache_stats_before = self.embeddings_model.stats()
+        start = time.perf_counter()
+        total_chunks = 0
+        rows_read = 0
+        # Chunks of a previous version of the source, replaced at the end
+        stale_ids = set(self.vector_store.source_ids(source)) if source else set()
+        for chunks, rows_read in self.document_processor.iter_chunk_batches(file_path, batch_size):
+            if source:
+                for chunk in chunks:
+                    chunk.metadata["source"] = source
+            stale_ids.difference_update(self.vector_store.add_documents(chunks))
+            total_chunks += len(chunks)
+            elapsed = time.perf_counter() - start
+            print(f"[{file_name}] {rows_read} rows, {total_chunks} chunks "
+                  f"({rows_read / elapsed:.1f} rows/s, {total_chunks / elapsed:.1f} chunks/s)")
+            if progress_callback is not None:
+                progress_callback(rows_read, total_chunks)
+
+        elapsed = time.perf_counter() - start
+        if total_chunks:
+            if stale_ids:
+                # Only once the new version is written: a file that fails to load keeps its old chunks
+                self.vector_store._delete_ids(list(stale_ids))
+                print(f"Replaced {len(stale_ids)} chunks of the previous version of '{source}'.")
+            print(f"Finished '{file_name}': {rows_read} rows, {total_chunks} chunks in {elapsed:.1f}s.")
+            DOCUMENTS_INGESTED.inc()
+            self._report_embedding_cache(cache_stats_before)
+            self._on_store_changed()
+        return total_chunks
+
+    def export_snapshot(self, output_dir: str, dtype: str = "float16") -> dict:
+        """
+        Exports the vector store to a snapshot directory (see snapshot.export_snapshot).
+        """
+        return snapshot.export_snapshot(self.vector_store, output_dir, self.embedding_model_name, dtype=dtype)
+
+    def import_snapshot(self, snapshot_dir: str, verify: bool = True) -> dict:
+        """
+        Bulk-loads a snapshot made with the same embedding model, without embedding anything.
+        """
+        report = snapshot.import_snapshot(self.vector_store, snapshot_dir, self.embedding_model_name, verify=verify)
+        if report["imported"]:
+            self._on_store_changed()
+        return report
+
+    def _on_store_changed(self):
+        """
+        Called after every write to the vector store: cached answers may now be stale, here
+        and in the other processes serving the store (see refresh_if_store_changed).
+        """
+        self.answer_cache.invalidate()
+        # Under the lock: refresh_if_store_changed must not see the new generation before it is
+        # recorded as this process's own (and two writing threads must not bump the same value)
+        with self._store_lock:
+            self._store_generation = bump_store_generation(self.chroma_db_path)
+
+    def refresh_if_store_changed(self) -> bool:
+        """
+        Picks up the writes of another process (the generation of the store changed, e.g. after
+        serve.py's writer ingested files): cached answers are dropped at once, and the numpy
+        backend remaps its matrix by itself. Chroma does not support another process writing
+        to its directory while it is open: a Chroma server must be restarted after such writes.
+        Checks at most every `store_check_interval` seconds. Returns True if the store changed.
+        """
+        if time.monotonic() - self._store_checked_at < self.store_check_interval:
+            return False
+        with self._store_lock:
+            self._store_checked_at = time.monotonic()
+            generation = read_store_generation(self.chroma_db_path)
+            if generation == self._store_generation:
+                return False
+            self._store_generation = generation
+            self.answer_cache.invalidate()
+        print(f"Store changed (generation {generation}): cached answers dropped.")
+        if self.vector_backend == "chroma":
+            print("The Chroma store was written by another process: restart this server to see its changes.")
+        return True
+
+    def _report_embedding_cache(self, stats_before: dict):
+        """
+        Prints the embedding cache hits/misses since `stats_before` was taken.
+        """
+        stats = self.embeddings_model.stats()
+        hits = stats["hits"] - stats_before["hits"]
+        misses = stats["misses"] - stats_before["misses"]
+        if hits + misses:
+            print(f"Embedding cache: {hits} hits, {misses} misses "
+                  f"({hits / (hits + misses):.1%} of the chunks skipped the embedding model).")
+
+    def get_stats(self):
+        """
+        Returns runtime statistics of the pipeline components (caches...).
+        """
+        # Components that are not loaded yet are not loaded just to report their stats
+        stats = {
+            "answer_cache": self.answer_cache.stats()
+        }
+        embeddings_model = self._components.get("embeddings_model")
+        if embeddings_model is not None:
+            stats["embedding_cache"] = embeddings_model.stats()
+        reranker = self._components.get("reranker")
+        if reranker is not None and hasattr(reranker, "stats"):
+            # Only the micro-batching reranker has stats
+            stats["reranker"] = reranker.stats()
+        return stats
+
+    def get_indexed_documents_page(self, limit: int = 100, cursor: str = None, include_content: bool = True):
         """
-        Retrieves basic information about all documents currently indexed in the vector store.
+        Returns one page of the indexed documents as `(documents, next_cursor)`.
+        Without content, only ids and metadata are read from the vector store.
+        """
+        if not self.initialized:
+            raise RuntimeError("RAG pipeline not initialized. Call .initialize() first.")
+
+        return self.vector_store.get_page(limit=limit, cursor=cursor, include_content=include_content)
+
+    def iter_indexed_documents(self, include_content: bool = True, batch_size: int = 1000):
+        """
+        Iterates over all the indexed documents, one page of `batch_size` at a time.
         """
         if not self.initialized:
             raise RuntimeError("RAG pipeline not initialized. Call .initialize() first.")
-        
-        all_docs = self.vector_store.get_all_documents()
-        # Convert LangchainDocument objects to a serializable format for the API
-        return [
-            {"page_content": doc.page_content, "metadata": doc.metadata}
-            for doc in all_docs
-        ]
 
+        for records in self.vector_store.scan(batch_size=batch_size, include_content=include_content):
+            yield from records
@@ -1,26 +1,163 @@
 from sentence_transformers import CrossEncoder
 from langchain_core.documents import Document as LangchainDocument
+from concurrent.futures import Future
 from typing import List
+import queue
+import threading
+import time
 
 class Reranker:
     def __init__(self, model_name="cross-encoder/ms-marco-TinyBERT-L-2"):
         self.model = CrossEncoder(model_name)
 
+    def score_pairs(self, sentence_pairs: List[List[str]]) -> List[float]:
+        """
+        Scores (query, document_content) pairs with the cross-encoder in one forward pass.
+        """
+        if not sentence_pairs:
+            return []
+        return [float(score) for score in self.model.predict(sentence_pairs)] # Conversion explicite en float Python
+
+    @staticmethod
+    def apply_scores(documents: List[LangchainDocument], scores: List[float]) -> List[LangchainDocument]:
+        # Add scores to document metadata and sort
+        for doc, score in zip(documents, scores):
+            doc.metadata['rerank_score'] = score
+
+        documents.sort(key=lambda x: x.metadata['rerank_score'], reverse=True)
+
+        return documents
+
     def rerank(self, query: str, documents: List[LangchainDocument]) -> List[LangchainDocument]:
         if not documents:
             return []
 
         # Create pairs of (query, document_content) for the cross-encoder
         sentence_pairs = [[query, doc.page_content] for doc in documents]
-        
+
         # Predict scores
-        scores = self.model.predict(sentence_pairs)
-        
-        # Add scores to document metadata and sort
-        for doc, score in zip(documents, scores):
-            # doc.metadata['rerank_score'] = score
-            doc.metadata['rerank_score'] = float(score) # Conversion explicite en float Python
-        
-        documents.sort(key=lambda x: x.metadata['rerank_score'], reverse=True)
-        
-        return documents
\ No newline at end of file
+        scores = self.score_pairs(sentence_pairs)
+
+        return self.apply_scores(documents, scores)
+
+    def rerank_batch(self, queries: List[str], documents_lists: List[List[LangchainDocument]]) -> List[List[LangchainDocument]]:
+        """
+        Reranks the documents of several queries with a single CrossEncoder pass over all pairs.
+        """
+        sentence_pairs = [[query, doc.page_content]
+                          for query, documents in zip(queries, documents_lists)
+                          for doc in documents]
+        scores = self.score_pairs(sentence_pairs)
+
+        reranked = []
+        offset = 0
+        for documents in documents_lists:
+            reranked.append(self.apply_scores(documents, scores[offset:offset + len(documents)]))
+            offset += len(documents)
+        return reranked
+
+
+class MicroBatchingReranker:
+    """
+    Reranking service for concurrent traffic: the (query, document) pairs of concurrent
+    rerank() calls are collected for up to `max_wait_ms` (or until `max_batch_size` pairs
+    are pending) and scored in a single CrossEncoder forward pass. Each caller then gets
+    its own documents back, sorted. Exposes the same rerank() interface as Reranker.
+    """
+
+    def __init__(self, reranker: Reranker, max_wait_ms: float = 5.0, max_batch_size: int = 64):
+        self.reranker = reranker
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_batch_size = max_batch_size
+
+        self._requests = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._requests_scored = 0
+        self._pairs_scored = 0
+        self._max_batch_pairs = 0
+        self._queue_delay_total = 0.0
+        self._queue_delay_max = 0.0
+
+        self._worker = threading.Thread(target=self._run, name="reranker-batcher", daemon=True)
+        self._worker.start()
+
+    def rerank(self, query: str, documents: List[LangchainDocument]) -> List[LangchainDocument]:
+        if not documents:
+            return []
+
+        sentence_pairs = [[query, doc.page_content] for doc in documents]
+        future = Future()
+        self._requests.put((sentence_pairs, future, time.perf_counter()))
+        scores = future.result()
+        return self.reranker.apply_scores(documents, scores)
+
+    def rerank_batch(self, queries: List[str], documents_lists: List[List[LangchainDocument]]) -> List[List[LangchainDocument]]:
+        # Already a large batch: scored directly, without going through the wait window
+        return self.reranker.rerank_batch(queries, documents_lists)
+
+    def _run(self):
+        carry_over = None
+        while True:
+            first = carry_over if carry_over is not None else self._requests.get()
+            carry_over = None
+            batch = [first]
+            batch_pairs = len(first[0])
+
+            # Collect more requests until the wait window closes or the batch is full
+            deadline = time.perf_counter() + self.max_wait
+            while batch_pairs < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self._requests.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if batch_pairs + len(request[0]) > self.max_batch_size:
+                    # Does not fit: it opens the next batch
+                    carry_over = request
+                    break
+                batch.append(request)
+                batch_pairs += len(request[0])
+
+            self._score_batch(batch, batch_pairs)
+
+    def _score_batch(self, batch, batch_pairs: int):
+        started = time.perf_counter()
+        all_pairs = [pair for sentence_pairs, _, _ in batch for pair in sentence_pairs]
+        try:
+            scores = self.reranker.score_pairs(all_pairs)
+        except Exception as e:
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+
+        offset = 0
+        for sentence_pairs, future, _ in batch:
+            future.set_result(scores[offset:offset + len(sentence_pairs)])
+            offset += len(sentence_pairs)
+
+        delays = [started - enqueued_at for _, _, enqueued_at in batch]
+        with self._stats_lock:
+            self._batches += 1
+            self._requests_scored += len(batch)
+            self._pairs_scored += batch_pairs
+            self._max_batch_pairs = max(self._max_batch_pairs, batch_pairs)
+            self._queue_delay_total += sum(delays)
+            self._queue_delay_max = max(self._queue_delay_max, max(delays))
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "max_wait_ms": self.max_wait * 1000.0,
+                "max_batch_size": self.max_batch_size,
+                "batches": self._batches,
+                "requests": self._requests_scored,
+                "pairs": self._pairs_scored,
+                "avg_batch_pairs": self._pairs_scored / self._batches if self._batches else 0.0,
+                "avg_requests_per_batch": self._requests_scored / self._batches if self._batches else 0.0,
+                "max_batch_pairs": self._max_batch_pairs,
+                "avg_queue_delay_ms": 1000.0 * self._queue_delay_total / self._requests_scored if self._requests_scored else 0.0,
+                "max_queue_delay_ms": 1000.0 * self._queue_delay_max,
+            }
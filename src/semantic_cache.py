@@ -0,0 +1,104 @@
+import threading
+import time
+import itertools
+from collections import OrderedDict
+import numpy as np
+
+
+class SemanticCache:
+    """
+    Answer cache matching queries by embedding similarity: a query hits when a cached query
+    with the same key (e.g. top_k) has a cosine similarity >= `similarity_threshold`, so
+    "is nutella vegan" and "Is Nutella vegan?" share one entry.
+    Entries expire after `ttl_seconds` and the least recently used ones are evicted beyond
+    `max_entries`. invalidate() drops everything when the underlying store changes.
+    """
+
+    def __init__(self, similarity_threshold: float = 0.95, ttl_seconds: float = 3600, max_entries: int = 1024):
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # entry id -> (embedding, key, result, created_at)
+        self._ids = itertools.count()
+        self._generation = 0
+        # Stacked embeddings of the entries, rebuilt lazily after insertions/evictions
+        self._matrix = None
+        self._matrix_ids = []
+
+    @property
+    def generation(self) -> int:
+        """
+        Changes on every invalidate(). Take it before computing an answer and pass it to put():
+        answers computed against a store that changed meanwhile are not cached.
+        """
+        return self._generation
+
+    def lookup(self, embedding, key=None):
+        """
+        Returns the cached result of the most similar query with the same key, or None.
+        """
+        query = self._normalize(embedding)
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            if self._entries:
+                if self._matrix is None:
+                    self._matrix_ids = list(self._entries.keys())
+                    self._matrix = np.stack([self._entries[i][0] for i in self._matrix_ids])
+                similarities = self._matrix @ query
+                for index in np.argsort(-similarities):
+                    if similarities[index] < self.similarity_threshold:
+                        break
+                    entry_id = self._matrix_ids[index]
+                    if self._entries[entry_id][1] == key:
+                        self._entries.move_to_end(entry_id)
+                        self.hits += 1
+                        return self._entries[entry_id][2]
+            self.misses += 1
+            return None
+
+    def put(self, embedding, result, key=None, generation: int = None):
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._entries[next(self._ids)] = (self._normalize(embedding), key, result, time.time())
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._matrix = None
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._matrix = None
+
+    def _expire(self, now: float):
+        expired = [entry_id for entry_id, entry in self._entries.items()
+                   if now - entry[3] > self.ttl_seconds]
+        for entry_id in expired:
+            del self._entries[entry_id]
+        if expired:
+            self._matrix = None
+
+    @staticmethod
+    def _normalize(embedding):
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "similarity_threshold": self.similarity_threshold,
+                "ttl_seconds": self.ttl_seconds,
+            }
@@ -0,0 +1,231 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+from itertools import islice
+
+import numpy as np
+
+SNAPSHOT_FORMAT_VERSION = 1
+VECTOR_DTYPES = ("float32", "float16", "int8")
+MANIFEST_FILE = "manifest.json"
+# Files of the vector store copied with the snapshot when present
+SYNC_MANIFEST_FILE = "sync_manifest.json"
+
+_HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def file_sha256(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def quantize(embeddings: np.ndarray, dtype: str):
+    """
+    Converts float32 embeddings to the snapshot dtype. Returns `(vectors, scales)`: for int8,
+    each row is scaled by max(|x|) / 127 and `scales` holds that factor per row (None otherwise).
+    """
+    if dtype == "int8":
+        scales = np.abs(embeddings).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        vectors = np.round(embeddings / scales[:, None]).astype(np.int8)
+        return vectors, scales.astype(np.float32)
+    return embeddings.astype(dtype), None
+
+
+def dequantize(vectors: np.ndarray, scales: np.ndarray = None) -> np.ndarray:
+    """
+    Converts snapshot vectors back to float32. float16 and int8 rows are L2-normalized again
+    (the embeddings model normalizes them): the rounding error must not change the norms,
+    hence the cosine/IP scores and the answer cache thresholds.
+    """
+    if vectors.dtype == np.float32:
+        return np.array(vectors)
+    vectors = vectors.astype(np.float32)
+    if scales is not None:
+        vectors = vectors * scales[:, None]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def export_snapshot(vector_store, output_dir: str, embedding_model: str, dtype: str = "float16",
+                    batch_size: int = 5000) -> dict:
+    """
+    Writes the whole collection (ids, documents, metadata and embeddings) to `output_dir`:
+        vectors.npy       embeddings as a (count, dimension) float32/float16/int8 array (np.load(mmap_mode="r"))
+        scales.npy        int8 only: dequantization factor of each row
+        ids.jsonl, documents.jsonl, metadatas.jsonl    one JSON value per line, in the order of vectors.npy
+        manifest.json     embedding model, dimension, count, dtype and sha256 of every file
+    The snapshot is written next to `output_dir` and renamed at the end, so a partial export is
+    never mistaken for a complete one. Ingestion must not run during the export (the size of
+    vectors.npy is the count at the start). Returns the manifest.
+    """
+    if dtype not in VECTOR_DTYPES:
+        raise ValueError(f"Unknown vector dtype '{dtype}' (expected one of: {', '.join(VECTOR_DTYPES)}).")
+    if os.path.exists(output_dir):
+        raise FileExistsError(f"Snapshot directory already exists: {output_dir}")
+
+    start = time.perf_counter()
+    collection = vector_store.vector_store._collection
+    count = collection.count()
+    tmp_dir = output_dir.rstrip(os.sep) + ".partial"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    print(f"Exporting {count} documents to {output_dir} ({dtype} vectors)...")
+
+    try:
+        vectors = scales = None
+        dimension = 0
+        written = 0
+        after = None
+        with open(os.path.join(tmp_dir, "ids.jsonl"), "w", encoding="utf-8") as ids_file, \
+                open(os.path.join(tmp_dir, "documents.jsonl"), "w", encoding="utf-8") as documents_file, \
+                open(os.path.join(tmp_dir, "metadatas.jsonl"), "w", encoding="utf-8") as metadatas_file:
+            while written < count:
+                # Pages by id (see VectorStore.get_page): one index seek per page
+                page_ids = vector_store.metadata_index.page_ids(after=after, limit=batch_size)
+                if not page_ids:
+                    break
+                after = page_ids[-1]
+                page = collection.get(ids=page_ids, include=["embeddings", "documents", "metadatas"])
+                if not page["ids"]:
+                    continue
+                if written + len(page["ids"]) > count:
+                    break
+                embeddings = np.asarray(page["embeddings"], dtype=np.float32)
+                if vectors is None:
+                    # Arrays written in place, one page at a time (the collection never sits in memory)
+                    dimension = embeddings.shape[1]
+                    vectors = np.lib.format.open_memmap(os.path.join(tmp_dir, "vectors.npy"), mode="w+",
+                                                        dtype=dtype, shape=(count, dimension))
+                    if dtype == "int8":
+                        scales = np.lib.format.open_memmap(os.path.join(tmp_dir, "scales.npy"), mode="w+",
+                                                           dtype=np.float32, shape=(count,))
+                end = written + len(page["ids"])
+                page_vectors, page_scales = quantize(embeddings, dtype)
+                vectors[written:end] = page_vectors
+                if scales is not None:
+                    scales[written:end] = page_scales
+                for doc_id, content, metadata in zip(page["ids"], page["documents"], page["metadatas"]):
+                    ids_file.write(json.dumps(doc_id) + "\n")
+                    documents_file.write(json.dumps(content or "", ensure_ascii=False) + "\n")
+                    metadatas_file.write(json.dumps(metadata or None, ensure_ascii=False) + "\n")
+                written = end
+                print(f"Exported {written}/{count} documents.")
+
+        if written != count:
+            raise RuntimeError(f"The collection changed during the export ({written} of {count} documents read).")
+        for array in (vectors, scales):
+            if array is not None:
+                array.flush()
+        del vectors, scales
+
+        sync_manifest = os.path.join(vector_store.persist_directory, SYNC_MANIFEST_FILE)
+        if os.path.exists(sync_manifest):
+            shutil.copyfile(sync_manifest, os.path.join(tmp_dir, SYNC_MANIFEST_FILE))
+
+        manifest = {
+            "format_version": SNAPSHOT_FORMAT_VERSION,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "embedding_model": embedding_model,
+            "dimension": dimension,
+            "count": count,
+            "dtype": dtype,
+            "collection_metadata": collection.metadata,
+            "files": {
+                name: {"sha256": file_sha256(os.path.join(tmp_dir, name)),
+                       "bytes": os.path.getsize(os.path.join(tmp_dir, name))}
+                for name in sorted(os.listdir(tmp_dir))
+            },
+        }
+        with open(os.path.join(tmp_dir, MANIFEST_FILE), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.rename(tmp_dir, output_dir)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    size_mb = sum(entry["bytes"] for entry in manifest["files"].values()) / (1024 * 1024)
+    print(f"Snapshot of {count} documents written to {output_dir} ({size_mb:.1f} MB) "
+          f"in {time.perf_counter() - start:.1f}s.")
+    return manifest
+
+
+def read_manifest(snapshot_dir: str, verify: bool = True) -> dict:
+    """
+    Reads the manifest of a snapshot. With `verify`, the sha256 of every file is checked.
+    Raises ValueError if the snapshot is incomplete, corrupted or of an unknown format.
+    """
+    manifest_path = os.path.join(snapshot_dir, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        raise ValueError(f"Not a snapshot (no {MANIFEST_FILE}): {snapshot_dir}")
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+        raise ValueError(f"Unsupported snapshot format version: {manifest.get('format_version')}")
+    if verify:
+        for name, entry in manifest["files"].items():
+            path = os.path.join(snapshot_dir, name)
+            if not os.path.exists(path) or file_sha256(path) != entry["sha256"]:
+                raise ValueError(f"Snapshot file '{name}' is missing or corrupted (sha256 mismatch).")
+    return manifest
+
+
+def import_snapshot(vector_store, snapshot_dir: str, embedding_model: str = None, batch_size: int = 5000,
+                    verify: bool = True) -> dict:
+    """
+    Bulk-loads a snapshot written by export_snapshot into the vector store (and its BM25 index),
+    without the embeddings model: vectors are read from the memory-mapped arrays one batch at a
+    time. Documents already in the store are overwritten (same ids). The vector store's sync
+    manifest is restored if it has none, so the data directory is not re-ingested at startup.
+    Raises ValueError if the snapshot was made with another model than `embedding_model`.
+    Returns a report dict.
+    """
+    start = time.perf_counter()
+    manifest = read_manifest(snapshot_dir, verify=verify)
+    if embedding_model and manifest["embedding_model"] != embedding_model:
+        raise ValueError(f"Snapshot embeddings come from '{manifest['embedding_model']}', "
+                         f"but this store uses '{embedding_model}'.")
+
+    count = manifest["count"]
+    print(f"Importing {count} documents from {snapshot_dir} ({manifest['dtype']} vectors)...")
+    imported = 0
+    if count:
+        vectors = np.load(os.path.join(snapshot_dir, "vectors.npy"), mmap_mode="r")
+        scales = (np.load(os.path.join(snapshot_dir, "scales.npy"), mmap_mode="r")
+                  if manifest["dtype"] == "int8" else None)
+        with open(os.path.join(snapshot_dir, "ids.jsonl"), "r", encoding="utf-8") as ids_file, \
+                open(os.path.join(snapshot_dir, "documents.jsonl"), "r", encoding="utf-8") as documents_file, \
+                open(os.path.join(snapshot_dir, "metadatas.jsonl"), "r", encoding="utf-8") as metadatas_file:
+            rows = zip(ids_file, documents_file, metadatas_file)
+            while True:
+                batch = list(islice(rows, batch_size))
+                if not batch:
+                    break
+                end = imported + len(batch)
+                embeddings = dequantize(vectors[imported:end], scales[imported:end] if scales is not None else None)
+                vector_store.upsert_embeddings(
+                    ids=[json.loads(doc_id) for doc_id, _, _ in batch],
+                    embeddings=embeddings,
+                    documents=[json.loads(content) for _, content, _ in batch],
+                    metadatas=[json.loads(metadata) for _, _, metadata in batch]
+                )
+                imported = end
+                print(f"Imported {imported}/{count} documents.")
+        if imported != count:
+            raise ValueError(f"Snapshot is truncated: {imported} of {count} documents.")
+
+    sync_manifest = os.path.join(snapshot_dir, SYNC_MANIFEST_FILE)
+    target = os.path.join(vector_store.persist_directory, SYNC_MANIFEST_FILE)
+    if os.path.exists(sync_manifest) and not os.path.exists(target):
+        shutil.copyfile(sync_manifest, target)
+
+    report = {"imported": imported, "embedding_model": manifest["embedding_model"],
+              "dtype": manifest["dtype"], "seconds": round(time.perf_counter() - start, 3)}
+    print(f"Imported {imported} documents in {report['seconds']}s.")
+    return report
@@ -0,0 +1,97 @@
+import hashlib
+import json
+import os
+
+_HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def file_md5(file_path: str) -> str:
+    # Streamed, so large CSVs are never read in memory at once
+    digest = hashlib.md5()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class SyncManifest:
+    """
+    Records the files ingested into the vector store (path -> size, mtime, md5 of the content)
+    so that a directory can be synchronized incrementally: only new or changed files are
+    re-ingested, and the chunks of removed files are deleted.
+    Paths are keyed relative to the synchronized directory, so a manifest copied with a
+    snapshot still matches on a node where the checkout lives elsewhere. Each entry also keeps
+    the path its chunks were written with (their 'source'), used to delete them.
+    """
+
+    def __init__(self, manifest_path: str, directory_path: str):
+        self.manifest_path = manifest_path
+        self.directory_path = os.path.abspath(directory_path)
+        self.files = {}
+        if os.path.exists(manifest_path):
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                files = json.load(f).get("files", {})
+            for key, entry in files.items():
+                if os.path.isabs(key):
+                    # Manifest written with absolute paths: their chunks keep that source
+                    entry.setdefault("source", key)
+                    key = self._key(key)
+                self.files[key] = entry
+
+    def _key(self, file_path: str) -> str:
+        return os.path.relpath(os.path.abspath(file_path), self.directory_path).replace(os.sep, "/")
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory_path, *key.split("/"))
+
+    def diff(self, file_paths: list):
+        """
+        Compares the files currently in the directory with the manifest.
+        Returns `(new, modified, removed, unchanged)` lists of paths.
+        Size and mtime are checked first; the content is only hashed when they differ,
+        so a touched but identical file (e.g. a fresh checkout) counts as unchanged.
+        """
+        new, modified, unchanged = [], [], []
+        present = set()
+        for file_path in file_paths:
+            key = self._key(file_path)
+            present.add(key)
+            entry = self.files.get(key)
+            if entry is None:
+                new.append(file_path)
+                continue
+            stat = os.stat(file_path)
+            if entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+                unchanged.append(file_path)
+            elif entry["size"] == stat.st_size and entry["md5"] == file_md5(file_path):
+                entry["mtime"] = stat.st_mtime
+                unchanged.append(file_path)
+            else:
+                modified.append(file_path)
+
+        # Only the files of this directory can have been removed from it
+        removed = [self._path(key) for key in self.files if not key.startswith("../") and key not in present]
+        return new, modified, removed, unchanged
+
+    def source(self, file_path: str) -> str:
+        """
+        Path the chunks of a recorded file were written with (`file_path` if not recorded).
+        """
+        entry = self.files.get(self._key(file_path))
+        return entry.get("source", file_path) if entry else file_path
+
+    def record(self, file_path: str):
+        stat = os.stat(file_path)
+        self.files[self._key(file_path)] = {"size": stat.st_size, "mtime": stat.st_mtime,
+                                            "md5": file_md5(file_path), "source": file_path}
+
+    def forget(self, file_path: str):
+        self.files.pop(self._key(file_path), None)
+
+    def save(self):
+        # Written to a temporary file first so that a crash never leaves a truncated manifest
+        os.makedirs(os.path.dirname(os.path.abspath(self.manifest_path)), exist_ok=True)
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"files": self.files}, f, indent=1)
+        os.replace(tmp_path, self.manifest_path)
@@ -3,96 +3,511 @@ from langchain_core.embeddings import Embeddings
 from langchain_core.documents import Document as LangchainDocument
 from typing import List
 import hashlib  # <--- AJOUT : Nécessaire pour le hachage
+import os
+import time
+from metrics import span, CHUNKS_INGESTED
+from lexical_index import LexicalIndex
+from metadata_index import MetadataIndex, encode_cursor, decode_cursor
+
+# Storage engines of the vectors: Chroma (HNSW), or an exact memory-mapped NumPy matrix (numpy_index.py)
+VECTOR_BACKENDS = ("chroma", "numpy")
+DEFAULT_PERSIST_DIRECTORIES = {"chroma": "chroma_db", "numpy": "numpy_db"}
+
+# Marker file of a store directory, bumped after every write (see bump_store_generation)
+STORE_GENERATION_FILE = "store_generation"
+
+# Metadata fields accepted in query filters (set by the loaders, see off_loader.py)
+FILTER_FIELDS = ("source", "brand", "category", "nutriscore", "barcode")
+
+
+def normalize_filter_value(field: str, value) -> str:
+    # Values as the loaders store them: stripped, Nutri-Score grades lowercase ("A" -> "a")
+    value = str(value).strip()
+    return value.lower() if field == "nutriscore" else value
+
+
+def build_where(filters: dict = None):
+    """
+    Converts query filters, e.g. {"brand": "Ferrero", "nutriscore": ["a", "b"]}, into a Chroma
+    `where` clause: a value must be equal, a list means any of its values, and all the fields
+    must match. Values are normalized (see normalize_filter_value). Returns None without filters.
+    Raises ValueError on an unknown field or an empty value.
+    """
+    clauses = []
+    for field, value in (filters or {}).items():
+        if field not in FILTER_FIELDS:
+            raise ValueError(f"Unknown filter field '{field}' (expected one of: {', '.join(FILTER_FIELDS)}).")
+        values = filter_values(field, value)
+        clauses.append({field: {"$in": values}} if len(values) > 1 else {field: {"$eq": values[0]}})
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def filter_values(field: str, value) -> list:
+    # Normalized, distinct values of a filter (a value or a list of values)
+    values = value if isinstance(value, (list, tuple)) else [value]
+    if not values:
+        raise ValueError(f"Empty list of values for filter '{field}'.")
+    normalized = []
+    for v in values:
+        v = "" if v is None else normalize_filter_value(field, v)
+        if not v:
+            raise ValueError(f"Empty value for filter '{field}'.")
+        if v not in normalized:
+            normalized.append(v)
+    return normalized
+
+
+def read_store_generation(persist_directory: str) -> int:
+    """
+    Generation of the store: other processes serving the same directory compare it with the
+    one they loaded to know when to reload (new vectors, stale cached answers).
+    """
+    try:
+        with open(os.path.join(persist_directory, STORE_GENERATION_FILE), "r", encoding="utf-8") as f:
+            return int(f.read().strip() or 0)
+    except (OSError, ValueError):
+        return 0
+
+
+def bump_store_generation(persist_directory: str) -> int:
+    # Written to a temporary file and renamed: readers never see a partial value
+    generation = read_store_generation(persist_directory) + 1
+    os.makedirs(persist_directory, exist_ok=True)
+    path = os.path.join(persist_directory, STORE_GENERATION_FILE)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        f.write(str(generation))
+    os.replace(path + ".tmp", path)
+    return generation
+
+
+def reciprocal_rank_fusion(result_lists: List[List[LangchainDocument]], k: int, rrf_k: int = 60) -> List[LangchainDocument]:
+    """
+    Merges ranked lists of documents (e.g. vector and lexical results) by reciprocal rank
+    fusion: each document scores sum(1 / (rrf_k + rank)) over the lists it appears in.
+    Documents are identified by their id. Returns the k best, best first.
+    """
+    scores = {}
+    documents = {}
+    for results in result_lists:
+        for rank, doc in enumerate(results):
+            scores[doc.id] = scores.get(doc.id, 0.0) + 1.0 / (rrf_k + rank + 1)
+            documents.setdefault(doc.id, doc)
+    best = sorted(scores, key=scores.get, reverse=True)[:k]
+    return [documents[doc_id] for doc_id in best]
+
 
 class VectorStore:
-    def __init__(self, embeddings_model: Embeddings, persist_directory: str = "chroma_db"):
+    def __init__(self, embeddings_model: Embeddings = None, persist_directory: str = "chroma_db",
+                 backend: str = "chroma", numpy_dtype: str = "float32"):
+        # embeddings_model peut être None pour les opérations de maintenance (ex. dédoublonnage),
+        # qui n'ont pas besoin de charger le modèle.
         self.embeddings_model = embeddings_model
         self.persist_directory = persist_directory
-        self.vector_store = Chroma(
-            persist_directory=self.persist_directory,
-            embedding_function=self.embeddings_model
-        )
+        if backend not in VECTOR_BACKENDS:
+            raise ValueError(f"Unknown vector backend '{backend}' (expected one of: {', '.join(VECTOR_BACKENDS)}).")
+        self.backend = backend
+        if backend == "numpy":
+            # Same `_collection` API as Chroma: the methods below work unchanged with both backends
+            from numpy_index import NumpyVectorStore
+            self.vector_store = NumpyVectorStore(
+                persist_directory=self.persist_directory,
+                embedding_function=self.embeddings_model,
+                dtype=numpy_dtype
+            )
+        else:
+            self.vector_store = Chroma(
+                persist_directory=self.persist_directory,
+                embedding_function=self.embeddings_model
+            )
+        # Index BM25 tenu à jour avec la collection (recherche hybride, recherche par code-barres)
+        os.makedirs(self.persist_directory, exist_ok=True)
+        self.lexical_index = LexicalIndex(os.path.join(self.persist_directory, "lexical_index.sqlite3"))
+        # Ids et champs filtrables : pagination par clé (get_page, scan)
+        self.metadata_index = MetadataIndex(os.path.join(self.persist_directory, "metadata_index.sqlite3"),
+                                            FILTER_FIELDS)
+        if not self.metadata_index.count() and self.collection_count:
+            # Base créée avant l'index : construit une fois depuis la collection
+            self.rebuild_metadata_index()
 
     # --- MODIFICATION DE CETTE MÉTHODE POUR PRÉVENIR LES DOUBLONS ---
     def add_documents(self, documents: List[LangchainDocument]):
         """
         Adds a list of Langchain Document objects to the ChromaDB collection.
-        Uses content hash as ID to prevent duplicates.
+        Uses content hash as ID to prevent duplicates. Returns the ids written.
         """
         if not documents:
-            return
+            return []
         
         # Générer des IDs uniques basés sur le contenu du document
         # Si le même contenu est ajouté à nouveau, il écrasera l'existant (ou sera ignoré) au lieu de créer un doublon.
         ids = [hashlib.md5(doc.page_content.encode('utf-8')).hexdigest() for doc in documents]
-        
-        self.vector_store.add_documents(documents=documents, ids=ids)
+
+        # Chroma refuse les IDs dupliqués dans un même appel : on ne garde que la première occurrence
+        # (fréquent en ingestion par lots, ex. lignes CSV identiques dans le même batch).
+        unique = {}
+        for doc_id, doc in zip(ids, documents):
+            unique.setdefault(doc_id, doc)
+        ids = list(unique.keys())
+        documents = list(unique.values())
+
+        # Embedding et écriture séparés pour mesurer chaque étape
+        with span("ingest_embed"):
+            embeddings = self.embeddings_model.embed_documents([doc.page_content for doc in documents])
+        self.upsert_embeddings(ids, embeddings, [doc.page_content for doc in documents],
+                               [doc.metadata for doc in documents])
+        CHUNKS_INGESTED.inc(len(ids))
         print(f"Added {len(documents)} documents to ChromaDB and persisted.")
+        return ids
+
+    def upsert_embeddings(self, ids: List[str], embeddings, documents: List[str], metadatas: List[dict]):
+        """
+        Writes already embedded documents to the collection and the BM25 index (used by
+        add_documents and by snapshot imports, which do not run the embeddings model).
+        """
+        with span("ingest_write"):
+            self.vector_store._collection.upsert(
+                ids=ids,
+                embeddings=embeddings,
+                documents=documents,
+                # Chroma refuse les métadonnées vides : None à la place
+                metadatas=[metadata or None for metadata in metadatas]
+            )
+        with span("ingest_lexical"):
+            self.lexical_index.add(ids, documents)
+            self.metadata_index.add(ids, metadatas, merge=self.backend == "chroma")
 
     def as_retriever(self, search_type="similarity", search_kwargs=None):
         if search_kwargs is None:
             search_kwargs = {"k": 5}
         return self.vector_store.as_retriever(search_type=search_type, search_kwargs=search_kwargs)
 
-    def get_all_documents(self) -> List[LangchainDocument]:
-        all_docs_data = self.vector_store.get()
-        documents = []
-        # Vérification de sécurité si la liste est vide
-        if not all_docs_data['ids']:
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 5, where: dict = None) -> List[LangchainDocument]:
+        """
+        Returns the k nearest documents of an already computed query embedding.
+        """
+        return self.similarity_search_by_vectors([embedding], k=k, where=where)[0]
+
+    def similarity_search_by_vectors(self, embeddings: List[List[float]], k: int = 5,
+                                     where: dict = None) -> List[List[LangchainDocument]]:
+        """
+        Runs one multi-vector query against the collection and returns, for each embedding,
+        its k nearest documents. With a `where` clause (see build_where), the metadata filter
+        is applied by Chroma during the search: the k documents all match it.
+        """
+        if not embeddings:
             return []
-            
-        for i in range(len(all_docs_data['ids'])):
-            # Parfois 'documents' peut être None dans Chroma si on ne demande que les embeddings, 
-            # mais .get() par défaut renvoie tout.
-            content = all_docs_data['documents'][i] if all_docs_data['documents'] else ""
-            meta = all_docs_data['metadatas'][i] if all_docs_data['metadatas'] else {}
-            
-            doc = LangchainDocument(
-                page_content=content,
-                metadata=meta
+        if not self.collection_count:
+            return [[] for _ in embeddings]
+
+        with span("retrieve"):
+            results = self.vector_store._collection.query(
+                query_embeddings=embeddings,
+                n_results=k,
+                where=where,
+                include=["documents", "metadatas"]
             )
-            documents.append(doc)
-        return documents
+        return [
+            [LangchainDocument(id=doc_id, page_content=content or "", metadata=meta or {})
+             for doc_id, content, meta in zip(ids, contents, metadatas)]
+            for ids, contents, metadatas in zip(results["ids"], results["documents"], results["metadatas"])
+        ]
+
+    def get_documents(self, ids: List[str], where: dict = None) -> List[LangchainDocument]:
+        """
+        Fetches documents by id, in the order of `ids`. With `where`, only the matching ones are returned.
+        """
+        if not ids:
+            return []
+        page = self.vector_store._collection.get(ids=list(ids), where=where, include=["documents", "metadatas"])
+        found = {
+            doc_id: LangchainDocument(id=doc_id, page_content=content or "", metadata=meta or {})
+            for doc_id, content, meta in zip(page["ids"], page["documents"], page["metadatas"])
+        }
+        return [found[doc_id] for doc_id in ids if doc_id in found]
+
+    def lexical_search(self, query: str, k: int = 5, where: dict = None) -> List[LangchainDocument]:
+        """
+        Returns the k best documents for the query according to the BM25 index (no embedding).
+        """
+        with span("lexical_search"):
+            # Some candidates may not match the filters: more are fetched
+            hits = self.lexical_index.search(query, k=k * 4 if where else k)
+            return self.get_documents([doc_id for doc_id, _ in hits], where=where)[:k]
+
+    def hybrid_search_by_vectors(self, queries: List[str], embeddings: List[List[float]], k: int = 5,
+                                 where: dict = None) -> List[List[LangchainDocument]]:
+        """
+        Hybrid retrieval: for each query, its k nearest documents and its k best BM25 documents
+        are merged by reciprocal rank fusion into k candidates.
+        """
+        vector_results = self.similarity_search_by_vectors(embeddings, k=k, where=where)
+        return [
+            reciprocal_rank_fusion([vector_docs, self.lexical_search(query, k=k, where=where)], k=k)
+            for query, vector_docs in zip(queries, vector_results)
+        ]
+
+    def get_by_barcode(self, barcode: str, k: int = 5, where: dict = None) -> List[LangchainDocument]:
+        """
+        Exact lookup of a barcode, without embedding: first in the 'barcode' metadata (Open Food
+        Facts loader), then as a term of the BM25 index (e.g. chunks of a generic CSV loader).
+        """
+        with span("barcode_lookup"):
+            barcode_where = {"barcode": {"$eq": barcode}}
+            page = self.vector_store._collection.get(
+                where={"$and": [barcode_where, where]} if where else barcode_where,
+                limit=k, include=["documents", "metadatas"])
+            documents = [
+                LangchainDocument(id=doc_id, page_content=content or "", metadata=meta or {})
+                for doc_id, content, meta in zip(page["ids"], page["documents"], page["metadatas"])
+            ]
+        return documents or self.lexical_search(barcode, k=k, where=where)
+
+    def delete_by_source(self, source: str, batch_size: int = 5000) -> int:
+        """
+        Deletes all the chunks whose 'source' metadata is `source`. Returns the number deleted.
+        Note: ids are content hashes, so a chunk shared by several files is stored once, with
+        the source of the last file that wrote it.
+        """
+        ids = self.source_ids(source)
+        self._delete_ids(ids, batch_size=batch_size)
+        return len(ids)
+
+    def source_ids(self, source: str) -> List[str]:
+        # Ids of the chunks whose 'source' metadata is `source`
+        return self.vector_store._collection.get(where={"source": source}, include=[])["ids"]
+
+    def get_page(self, limit: int = 100, cursor: str = None, include_content: bool = True, where: dict = None):
+        """
+        Returns one page of the collection as `(records, next_cursor)`, in id order. Records are
+        dicts with 'id', 'metadata' and, if `include_content`, 'page_content'. Pass `next_cursor`
+        back to get the following page; it is None after the last page.
+        The cursor is opaque for callers (it encodes the last id of the page, see MetadataIndex):
+        each page is one index seek, and writes between two pages do not shift the next ones.
+        Raises ValueError on an invalid cursor.
+        """
+        after = decode_cursor(cursor) if cursor else None
+        page_ids = self.metadata_index.page_ids(after=after, limit=limit, where=where)
+        records = []
+        if page_ids:
+            include = ["metadatas", "documents"] if include_content else ["metadatas"]
+            page = self.vector_store._collection.get(ids=page_ids, include=include)
+            # Chroma does not return them in the requested order; ids deleted in the meantime are skipped
+            found = {record["id"]: record for record in self._page_records(page, include_content)}
+            records = [found[doc_id] for doc_id in page_ids if doc_id in found]
+        next_cursor = encode_cursor(page_ids[-1]) if len(page_ids) == limit else None
+        return records, next_cursor
+
+    def scan(self, batch_size: int = 1000, include_content: bool = True, where: dict = None):
+        """
+        Iterates over the whole collection page by page, yielding lists of at most `batch_size`
+        records (see get_page). Only one page is held in memory at a time.
+        """
+        cursor = None
+        while True:
+            records, cursor = self.get_page(limit=batch_size, cursor=cursor,
+                                            include_content=include_content, where=where)
+            if records:
+                yield records
+            if cursor is None:
+                return
+
+    @staticmethod
+    def _page_records(page: dict, include_content: bool) -> List[dict]:
+        records = []
+        for i, doc_id in enumerate(page['ids']):
+            # Parfois 'documents' peut être None dans Chroma si on ne demande que les métadonnées
+            record = {
+                "id": doc_id,
+                "metadata": (page['metadatas'][i] if page.get('metadatas') else None) or {}
+            }
+            if include_content:
+                record["page_content"] = (page['documents'][i] if page.get('documents') else None) or ""
+            records.append(record)
+        return records
 
     @property
     def collection_count(self) -> int:
         return self.vector_store._collection.count()
 
+    def count(self, where: dict = None) -> int:
+        """
+        Number of chunks matching a `where` clause (see build_where), counted by SQLite on the
+        field indexes of the metadata index: the collection itself is not read.
+        """
+        if where is None:
+            return self.collection_count
+        return self.metadata_index.count(where)
+
+    def facet_counts(self, filters: dict) -> dict:
+        """
+        For each filter field and (normalized) value, the number of chunks matching it alone,
+        plus under 'matched' the number matching all the filters together, e.g.
+        {"brand": {"Ferrero": 120}, "nutriscore": {"a": 800, "b": 650}, "matched": 35}.
+        Each value is one lookup in the aggregate table of the metadata index; 'matched' is a
+        sum of those for a single field, an indexed COUNT otherwise.
+        """
+        facets = {}
+        for field, value in filters.items():
+            facets[field] = {v: self.metadata_index.value_count(field, v) for v in filter_values(field, value)}
+        if len(facets) == 1:
+            facets["matched"] = sum(next(iter(facets.values())).values())
+        else:
+            facets["matched"] = self.count(build_where(filters))
+        return facets
+
     # --- AJOUT DE CETTE NOUVELLE MÉTHODE ---
-    def remove_duplicates(self):
+    def remove_duplicates(self, batch_size: int = 5000, delete_batch_size: int = 1000, dry_run: bool = False) -> dict:
         """
         Scans the existing database and removes duplicate documents based on content hash.
+        The collection is read page by page and only a 16-byte md5 digest per unique document
+        is kept in memory. Content is only fetched for documents whose id is not already the
+        md5 of their content (ids written by add_documents are). Duplicates are deleted in
+        batches of `delete_batch_size`; with `dry_run`, nothing is deleted.
+        Does not need the embeddings model. Returns a report dict.
         """
-        print("Scanning vector store for duplicates...")
-        # Récupère tous les documents existants
-        all_docs = self.vector_store.get()
-        
-        if not all_docs['ids']:
-            print("Vector store is empty.")
-            return
+        print(f"Scanning vector store for duplicates{' (dry run)' if dry_run else ''}...")
+        start = time.perf_counter()
+        collection = self.vector_store._collection
 
-        ids = all_docs['ids']
-        documents = all_docs['documents']
-        
         unique_hashes = set()
         ids_to_delete = []
-        
-        for i, doc_content in enumerate(documents):
-            # Crée un hash unique du contenu
-            if doc_content:
-                doc_hash = hashlib.md5(doc_content.encode('utf-8')).hexdigest()
-            else:
-                continue # Ignore les documents vides
-
-            if doc_hash in unique_hashes:
-                # Si on a déjà vu ce hash, c'est un doublon
-                ids_to_delete.append(ids[i])
-            else:
-                unique_hashes.add(doc_hash)
-        
+        report = {"scanned": 0, "unique": 0, "duplicates": 0, "deleted": 0, "empty": 0, "dry_run": dry_run}
+        after = None
+        while True:
+            # Pages by id: deleting the duplicates already seen does not shift the next pages
+            ids = self.metadata_index.page_ids(after=after, limit=batch_size)
+            if not ids:
+                break
+            after = ids[-1]
+
+            # Content is only needed for ids that are not content hashes (e.g. legacy random ids)
+            other_ids = [doc_id for doc_id in ids if not _is_content_hash(doc_id)]
+            contents = {}
+            if other_ids:
+                page = collection.get(ids=other_ids, include=["documents"])
+                contents = dict(zip(page['ids'], page['documents']))
+
+            for doc_id in ids:
+                report["scanned"] += 1
+                if doc_id in contents:
+                    doc_content = contents[doc_id]
+                    # Crée un hash unique du contenu
+                    if not doc_content:
+                        report["empty"] += 1
+                        continue # Ignore les documents vides
+                    doc_hash = hashlib.md5(doc_content.encode('utf-8')).digest()
+                else:
+                    doc_hash = bytes.fromhex(doc_id)
+
+                if doc_hash in unique_hashes:
+                    # Si on a déjà vu ce hash, c'est un doublon
+                    ids_to_delete.append(doc_id)
+                else:
+                    unique_hashes.add(doc_hash)
+
+            if not dry_run and len(ids_to_delete) >= delete_batch_size:
+                self._delete_ids(ids_to_delete)
+                report["deleted"] += len(ids_to_delete)
+                ids_to_delete = []
+            elif dry_run:
+                report["duplicates"] += len(ids_to_delete)
+                ids_to_delete = []
+            print(f"Scanned {report['scanned']} documents, {len(unique_hashes)} unique so far.")
+            if len(ids) < batch_size:
+                break
+
         if ids_to_delete:
-            print(f"Found {len(ids_to_delete)} duplicates. Deleting...")
-            self.vector_store.delete(ids=ids_to_delete)
-            print(f"Successfully removed {len(ids_to_delete)} duplicate documents.")
+            self._delete_ids(ids_to_delete)
+            report["deleted"] += len(ids_to_delete)
+
+        report["unique"] = len(unique_hashes)
+        if not dry_run:
+            report["duplicates"] = report["deleted"]
+        report["seconds"] = round(time.perf_counter() - start, 3)
+
+        if not report["duplicates"]:
+            print("No duplicates found.")
+        elif dry_run:
+            print(f"Found {report['duplicates']} duplicates (dry run, nothing deleted).")
         else:
-            print("No duplicates found.")
\ No newline at end of file
+            print(f"Successfully removed {report['deleted']} duplicate documents.")
+        return report
+
+    def rebuild_lexical_index(self, batch_size: int = 5000) -> int:
+        """
+        Rebuilds the BM25 index from the collection (e.g. a collection created before the index
+        existed). Reads the collection page by page, without the embeddings model.
+        Returns the number of documents indexed.
+        """
+        self.lexical_index.clear()
+        indexed = 0
+        for records in self.scan(batch_size=batch_size):
+            indexed += self.lexical_index.add([record["id"] for record in records],
+                                              [record["page_content"] for record in records])
+            print(f"Indexed {indexed} documents for lexical search.")
+        return indexed
+
+    def rebuild_metadata_index(self, batch_size: int = 5000) -> int:
+        """
+        Rebuilds the metadata index from the collection (e.g. a collection created before the
+        index existed), without the embeddings model. Chroma only pages by offset, which skips
+        records when others are deleted meanwhile: the ids are paged by id from the BM25 index,
+        kept in sync by the same write paths, and their metadata fetched by id. A store older
+        than both indexes is read once by offset. Returns the number of documents indexed.
+        """
+        self.metadata_index.clear()
+        collection = self.vector_store._collection
+        indexed = 0
+        for ids in self._id_pages(batch_size):
+            page = collection.get(ids=ids, include=["metadatas"])
+            # Ids deleted since they were listed are not returned
+            self.metadata_index.add(page["ids"], [metadata or {} for metadata in page["metadatas"]])
+            indexed += len(page["ids"])
+            print(f"Indexed {indexed} documents in the metadata index.")
+        return indexed
+
+    def _id_pages(self, batch_size: int):
+        # Ids of the collection, in pages of `batch_size`, for rebuild_metadata_index
+        if self.lexical_index.count() == self.collection_count:
+            after = None
+            while True:
+                ids = self.lexical_index.page_ids(after=after, limit=batch_size)
+                if ids:
+                    yield ids
+                if len(ids) < batch_size:
+                    return
+                after = ids[-1]
+        print("The lexical index does not cover the collection: reading it by offset "
+              "(do not write to the store meanwhile).")
+        offset = 0
+        while True:
+            ids = self.vector_store._collection.get(limit=batch_size, offset=offset, include=[])["ids"]
+            if ids:
+                yield ids
+            if len(ids) < batch_size:
+                return
+            offset += len(ids)
+
+    def compact(self) -> int:
+        """
+        Reclaims the space of deleted documents (numpy backend; Chroma manages its own files).
+        Returns the number of rows reclaimed.
+        """
+        if self.backend != "numpy":
+            print("Compaction only applies to the numpy backend.")
+            return 0
+        return self.vector_store._collection.compact()
+
+    def _delete_ids(self, ids: List[str], batch_size: int = 5000):
+        # Single deletion path of the store, in bounded batches
+        for i in range(0, len(ids), batch_size):
+            self.vector_store.delete(ids=ids[i:i + batch_size])
+            self.lexical_index.delete(ids[i:i + batch_size])
+            self.metadata_index.delete(ids[i:i + batch_size])
+
+
+def _is_content_hash(doc_id: str) -> bool:
+    # ids written by add_documents are the md5 hex digest of the content
+    return len(doc_id) == 32 and all(c in "0123456789abcdef" for c in doc_id)
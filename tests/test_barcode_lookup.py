@@ -0,0 +1,65 @@
+import csv
+import os
+import sys
+
+import pytest
+from langchain_core.embeddings import Embeddings
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from document_processor import DocumentProcessor
+from vector_store import VectorStore
+
+# Same product (name, brand, category, grade) under several barcodes, and one plain row
+PRODUCTS = [
+    ("3017620422003", "Nutella", "Ferrero", "Spreads", "e"),
+    ("3017620425035", "Nutella", "Ferrero", "Spreads", "e"),
+    ("3017620429484", "Nutella", "Ferrero", "Spreads", "e"),
+    ("5449000000996", "Coca-Cola", "Coca-Cola", "Sodas", "e"),
+    ("5449000131805", "Coca-Cola", "Coca-Cola", "Sodas", "e"),
+    ("3033710065967", "Cruesli chocolat", "Quaker", "Breakfast cereals", "c"),
+]
+
+
+class FakeEmbeddings(Embeddings):
+    # Barcode lookups do not embed anything: any fixed-size vector will do
+    def embed_documents(self, texts):
+        return [[float(len(text)), 1.0, 0.5] for text in texts]
+
+    def embed_query(self, text):
+        return [float(len(text)), 1.0, 0.5]
+
+
+@pytest.fixture
+def off_csv(tmp_path):
+    path = tmp_path / "products.csv"
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["code", "product_name", "brands", "categories_en", "nutriscore_grade"])
+        writer.writerows(PRODUCTS)
+    return str(path)
+
+
+@pytest.mark.parametrize("backend", ["chroma", "numpy"])
+def test_every_barcode_of_the_file_is_found(tmp_path, off_csv, backend):
+    vector_store = VectorStore(FakeEmbeddings(), persist_directory=str(tmp_path / "store"), backend=backend)
+    vector_store.add_documents(DocumentProcessor().load_and_chunk_file(off_csv))
+
+    assert vector_store.collection_count == len(PRODUCTS)
+    for barcode, name, *_ in PRODUCTS:
+        documents = vector_store.get_by_barcode(barcode)
+        assert [doc.metadata["barcode"] for doc in documents] == [barcode]
+        assert documents[0].page_content.startswith(f"{name} ({barcode})")
+
+
+def test_barcode_without_metadata_is_found_by_its_term(tmp_path, off_csv):
+    vector_store = VectorStore(FakeEmbeddings(), persist_directory=str(tmp_path / "store"), backend="numpy")
+    chunks = DocumentProcessor().load_and_chunk_file(off_csv)
+    for chunk in chunks:
+        # As chunks of a generic CSV loader: the barcode is only in the text
+        chunk.metadata.pop("barcode")
+    vector_store.add_documents(chunks)
+
+    for barcode, *_ in PRODUCTS:
+        documents = vector_store.get_by_barcode(barcode, k=1)
+        assert [doc.metadata["row"] for doc in documents] == [[p[0] for p in PRODUCTS].index(barcode)]
@@ -0,0 +1,27 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from context_builder import ContextBuilder
+
+
+def doc(content, source="a.txt", **metadata):
+    return {"content": content, "metadata": dict(metadata, source=source)}
+
+
+def test_budget_cut_is_not_counted_as_saved():
+    _, stats = ContextBuilder(max_tokens=100).build([doc(" ".join(["word"] * 400))])
+
+    assert stats["truncated"]
+    assert stats["estimated_tokens_saved"] == 0
+    assert stats["estimated_tokens_dropped"] > 400
+
+
+def test_repeated_chunks_are_counted_as_saved():
+    text = "Nutella is a hazelnut spread with sugar and palm oil. " * 4
+    _, stats = ContextBuilder().build([doc(text), doc(text, source="b.txt")])
+
+    assert stats["passages"] == 1
+    assert stats["estimated_tokens_saved"] > 0
+    assert stats["estimated_tokens_dropped"] == 0
@@ -0,0 +1,42 @@
+import io
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from ingestion_jobs import IngestionJobManager, JobQueueFullError
+
+
+def test_concurrent_submits_respect_the_queue_limit(tmp_path):
+    # No worker started: submitted jobs stay queued
+    manager = IngestionJobManager(None, str(tmp_path / "jobs.sqlite3"), str(tmp_path / "files"), max_queued_jobs=3)
+    barrier = threading.Barrier(12)
+    outcomes = []
+
+    def submit():
+        barrier.wait()
+        try:
+            manager.submit([("a.txt", io.BytesIO(b"text"))])
+            outcomes.append("queued")
+        except JobQueueFullError:
+            outcomes.append("rejected")
+
+    threads = [threading.Thread(target=submit) for _ in range(12)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert outcomes.count("queued") == 3
+    assert manager.queued_jobs() == 3
+    # Rejected jobs do not leave their files behind
+    assert len(os.listdir(tmp_path / "files")) == 3
+
+
+def test_submit_without_files_is_rejected(tmp_path):
+    manager = IngestionJobManager(None, str(tmp_path / "jobs.sqlite3"), str(tmp_path / "files"))
+    with pytest.raises(ValueError):
+        manager.submit([])
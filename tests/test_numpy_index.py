@@ -0,0 +1,28 @@
+import os
+import sys
+
+from langchain_core.embeddings import Embeddings
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from vector_store import VectorStore
+
+
+class FakeEmbeddings(Embeddings):
+    def embed_documents(self, texts):
+        return [[float(len(text)), 1.0, 0.5] for text in texts]
+
+    def embed_query(self, text):
+        return [float(len(text)), 1.0, 0.5]
+
+
+def test_duplicates_added_without_ids_are_removed(tmp_path):
+    vector_store = VectorStore(FakeEmbeddings(), persist_directory=str(tmp_path / "store"), backend="numpy")
+    # Through the LangChain API: random ids, not content hashes
+    ids = vector_store.vector_store.add_texts(["same text", "same text", "other text"])
+    vector_store.metadata_index.add(ids, [{}] * len(ids))
+
+    report = vector_store.remove_duplicates()
+
+    assert report["deleted"] == 1
+    assert vector_store.collection_count == 2
@@ -0,0 +1,37 @@
+import csv
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from off_loader import OpenFoodFactsLoader
+
+COLUMNS = ["code", "product_name", "brands", "categories_en", "nutriscore_grade"]
+
+
+def write_csv(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+    return str(path)
+
+
+def test_products_differing_only_by_barcode_stay_distinct(tmp_path):
+    path = write_csv(tmp_path / "off.csv", [
+        {"code": "3017620422003", "product_name": "Nutella", "brands": "Ferrero",
+         "categories_en": "Spreads", "nutriscore_grade": "e"},
+        {"code": "3017620425035", "product_name": "Nutella", "brands": "Ferrero",
+         "categories_en": "Spreads", "nutriscore_grade": "e"},
+    ])
+    documents = OpenFoodFactsLoader(path).load()
+
+    assert [doc.metadata["barcode"] for doc in documents] == ["3017620422003", "3017620425035"]
+    assert documents[0].page_content.startswith("Nutella (3017620422003) - Brand: Ferrero")
+    # Chunk ids are md5(page_content): the two products must not share one
+    assert documents[0].page_content != documents[1].page_content
+
+
+def test_row_with_only_a_barcode_is_skipped(tmp_path):
+    path = write_csv(tmp_path / "off.csv", [{"code": "3017620422003"}])
+    assert OpenFoodFactsLoader(path).load() == []
@@ -0,0 +1,58 @@
+import os
+import shutil
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from snapshot import export_snapshot, import_snapshot
+from sync_manifest import SyncManifest
+from vector_store import VectorStore
+
+
+def unit_vectors(count, dimension=16, seed=0):
+    vectors = np.random.default_rng(seed).normal(size=(count, dimension)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+@pytest.mark.parametrize("dtype", ["float16", "int8"])
+def test_imported_vectors_are_normalized(tmp_path, dtype):
+    source = VectorStore(persist_directory=str(tmp_path / "source"), backend="numpy")
+    ids = [f"{i:032x}" for i in range(50)]
+    source.upsert_embeddings(ids, unit_vectors(50), [f"doc {i}" for i in range(50)], [{"source": "a.txt"}] * 50)
+    export_snapshot(source, str(tmp_path / "snapshot"), "model", dtype=dtype)
+
+    target = VectorStore(persist_directory=str(tmp_path / "target"), backend="chroma")
+    assert import_snapshot(target, str(tmp_path / "snapshot"), "model")["imported"] == 50
+    embeddings = np.asarray(target.vector_store._collection.get(include=["embeddings"])["embeddings"])
+    np.testing.assert_allclose(np.linalg.norm(embeddings, axis=1), 1.0, rtol=1e-5)
+
+
+def test_sync_manifest_matches_a_moved_directory(tmp_path):
+    data = tmp_path / "node1" / "data"
+    (data / "sub").mkdir(parents=True)
+    (data / "a.txt").write_text("first file")
+    (data / "sub" / "b.txt").write_text("second file")
+    (data / "d.txt").write_text("fourth file")
+    manifest = SyncManifest(str(tmp_path / "sync_manifest.json"), str(data))
+    for path in (data / "a.txt", data / "sub" / "b.txt", data / "d.txt"):
+        manifest.record(str(path))
+    manifest.save()
+
+    # Same files in another checkout, with new mtimes
+    moved = tmp_path / "node2" / "data"
+    shutil.copytree(data, moved)
+    (moved / "sub" / "b.txt").write_text("second file, edited")
+    os.remove(moved / "a.txt")
+    (moved / "c.txt").write_text("third file")
+    os.utime(moved / "d.txt", (1, 1))
+    manifest = SyncManifest(str(tmp_path / "sync_manifest.json"), str(moved))
+    paths = [str(moved / "sub" / "b.txt"), str(moved / "c.txt"), str(moved / "d.txt")]
+    new, modified, removed, unchanged = manifest.diff(paths)
+
+    assert (new, modified, removed, unchanged) == ([str(moved / "c.txt")], [str(moved / "sub" / "b.txt")],
+                                                   [str(moved / "a.txt")], [str(moved / "d.txt")])
+    # The chunks of the first node are deleted by the source they were written with
+    assert manifest.source(str(moved / "a.txt")) == str(data / "a.txt")